@@ -1,9 +1,23 @@
 #/bin/python
 
 import sys
+import os
+import json
+import struct
+import zlib
+import tempfile
+import mmap
+import weakref
 from copy import copy, deepcopy
+from collections import OrderedDict
+from contextlib import contextmanager, ExitStack
+from functools import lru_cache
 import datetime
+import threading
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
 import databank_util as util
+import databank_stats as stats
 
 #--------------------------------------------------------------------
 #  Method to get the primary name for a particular metadata
@@ -22,7 +36,13 @@ import databank_util as util
 #    (meta='kind',     name='length')      ->  'na'   (no match)
 #    (meta='kind',     name='meters')      ->  'na'   (no match)
 #    (meta='interval', name='sup')         ->  'na'   (no match)
+#
+#  Results are remembered by _primaryName (up to _PRIMARY_NAME_CACHE 
+#  of them), so asking for the same (meta, name) pair again is a 
+#  single dictionary lookup.
 #--------------------------------------------------------------------
+_PRIMARY_NAME_CACHE = 1024
+
 def getPrimaryName(meta=None, name=None):
     if not meta:
         raise Exception('Missing "meta=" for getPrimaryName()')
@@ -33,24 +53,18 @@ def getPrimaryName(meta=None, name=None):
         raise Exception('Invalid "meta=" for getPrimaryName()')
     if not isinstance(name, str):
         raise Exception('Invalid "name=" for getPrimaryName()')
-        
-    obj = None
+    return _primaryName(meta, name)
+
+@lru_cache(maxsize=_PRIMARY_NAME_CACHE)
+def _primaryName(meta, name):
+    pname = 'na'
     try:
-        if meta.lower() == 'kind':
-            obj = DataKind(name)
-        if meta.lower() == 'units':
-            obj = DataUnits(name)
-        if meta.lower() == 'interval':
-            obj = DataInterval(name)
-        if meta.lower() == 'location':  
-            obj = DataLocation(name)
-
-        if obj:
-            return obj.primaryName()
-        else:
-            return 'na'
+        cls = _metaClasses.get(meta.lower())
+        if cls:
+            pname = cls.primaryNameFromString(name)
     except:
-        return 'na'
+        pname = 'na'
+    return pname
 
 
 #-----------------------------------------------------------------------------
@@ -90,13 +104,26 @@ def getPrimaryName(meta=None, name=None):
 #
 #  BaseMeta should never be used directly. Please always use one of the
 #  derived subclasses.
+#
+#  When a subclass is defined, __init_subclass__ builds a dictionary
+#  (_lookup) that maps every lowercase/stripped input string to its row
+#  in _inputStrings.  If the same string shows up in more than one row,
+#  the first row wins, which is what the old linear search did.
 #-----------------------------------------------------------------------------
 class BaseMeta():
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        lookup = {}
+        for i, names in enumerate(cls._inputStrings):
+            for name in names:
+                lookup.setdefault(name.lower().strip(), i)
+        cls._lookup = lookup
+
     def __init__(self, initval):
         if initval:
-            if isinstance(initval, str):
-                self.myValue = self.intValueFromString(initval)
-            else:
+            try:
+                self.myValue = self.codeFromEntry(initval)
+            except:
                 self.myValue = 0
         else:
             self.myValue = 0
@@ -163,19 +190,38 @@ class BaseMeta():
     #  metadata value by finding the matching entry in _inputStrings.
     #  If unable to find any match, returns 0 (undefined).
     #
-    def intValueFromString(self, string):
-        j = -1
-        s = string.lower().strip()
-        for i in range(len(self._inputStrings)):
-            if j < 0:
-                try:
-                    for k in range(len(self._inputStrings[i])):
-                        t = self._inputStrings[i][k].lower().strip()
-                        if t == s:
-                            return i
-                except:
-                    pass
-        return 0
+    @classmethod
+    def intValueFromString(cls, string):
+        return cls._lookup.get(string.lower().strip(), 0)
+
+    #---------------------------------------------------
+    #  Primary name for a string, without creating an object.
+    #  e.g. DataKind.primaryNameFromString('runoff') -> 'run'
+    #
+    @classmethod
+    def primaryNameFromString(cls, string):
+        return cls._inputStrings[cls.intValueFromString(string)][0]
+
+    #---------------------------------------------------
+    #  Metadata codes.  The code for a value is simply its row number
+    #  in _inputStrings (0 = undefined), so it is a small int that can
+    #  be compared and hashed without doing any string work.
+    #  codeFromEntry() accepts either a string (any of the input
+    #  strings) or an int code.  Anything else, including an int that
+    #  is out of range, raises a ValueError.
+    #
+    @classmethod
+    def codeFromEntry(cls, entry):
+        if isinstance(entry, str):
+            return cls.intValueFromString(entry)
+        if isinstance(entry, (int, np.integer)) and not isinstance(entry, bool):
+            if 0 <= entry < len(cls._inputStrings):
+                return int(entry)
+        raise ValueError('Invalid ' + cls.__name__ + ' specifier')
+
+    @classmethod
+    def nameFromCode(cls, code):
+        return cls._inputStrings[code][0]
 
 #--------------------------------------------------------------------------------
 """The DataKind class contains the defined data kinds (a.k.a types) and their 
@@ -389,6 +435,241 @@ class DataLocation(BaseMeta):
         ('stl',   'StLawrence',     'St. Lawrence River')
     )
 
+#--------------------------------------------------------------------------------
+#  Map the meta= names used by getPrimaryName() to the metadata classes.
+#--------------------------------------------------------------------------------
+_metaClasses = {
+    'kind':     DataKind,
+    'units':    DataUnits,
+    'interval': DataInterval,
+    'location': DataLocation,
+}
+
+#--------------------------------------------------------------------------------
+#  Build a property that exposes a metadata code attribute (e.g. dataKindCode)
+#  as its primary name string (e.g. dataKind).  Assigning to the property
+#  accepts a string or an int code and stores the resolved code.
+#--------------------------------------------------------------------------------
+def _metaProperty(metaclass, codeattr):
+    def getter(self):
+        return metaclass._inputStrings[getattr(self, codeattr)][0]
+    def setter(self, value):
+        if value:
+            setattr(self, codeattr, metaclass.codeFromEntry(value))
+        else:
+            setattr(self, codeattr, 0)
+    return property(getter, setter)
+
+#--------------------------------------------------------------------------------
+#  A float64 array with spare room at both ends, so that a DataSeries can
+#  grow at either end without copying all of its values every time.
+#  view is the part in use.  Everything outside of it is always NaN, so
+#  growing just moves the ends of view.  When there isn't enough room, 
+#  the values are moved to a new array with spare room of a quarter of 
+#  the new length at each end, which makes adding k values O(k) amortized.
+#--------------------------------------------------------------------------------
+class _ValueBuffer(object):
+    def __init__(self, values):
+        n = len(values)
+        spare = max(16, n // 4)
+        self._buf = np.full(n + 2*spare, np.nan)
+        self._lo = spare
+        self._hi = spare + n
+        self._buf[self._lo:self._hi] = values
+        self.view = self._buf[self._lo:self._hi]
+
+    def grow(self, front, back):
+        if front > self._lo or back > len(self._buf) - self._hi:
+            n = self._hi - self._lo
+            spare = max(16, (n + front + back) // 4)
+            newbuf = np.full(n + front + back + 2*spare, np.nan)
+            lo = spare + front
+            newbuf[lo:lo+n] = self._buf[self._lo:self._hi]
+            self._buf = newbuf
+            self._lo = lo
+            self._hi = lo + n
+        self._lo -= front
+        self._hi += back
+        self.view = self._buf[self._lo:self._hi]
+        return self.view
+
+    @property
+    def capacity(self):
+        return len(self._buf)
+
+
+#--------------------------------------------------------------------------------
+#  Copy each fragment (a DataSeries) into its place in values, whose first
+#  period is the one containing first, using one of the overlap precedence
+#  rules described in DataSeries.assemble().  covered is an optional 
+#  (i, j) range of values that already holds data; for 'first', that data
+#  wins over all of the fragments.
+#--------------------------------------------------------------------------------
+def _scatter_fragments(values, first, fragments, intvl, precedence,
+                       covered=None):
+    if precedence == 'last':
+        for ds in fragments:
+            i = util.period_offset(first, ds.startDate, intvl)
+            values[i:i+len(ds)] = ds.dataArray
+    elif precedence == 'nonmissing':
+        for ds in fragments:
+            i = util.period_offset(first, ds.startDate, intvl)
+            vals = ds.dataArray
+            ok = ~np.isnan(vals)
+            values[i:i+len(ds)][ok] = vals[ok]
+    elif precedence == 'first':
+        done = np.zeros(len(values), dtype=bool)
+        if covered:
+            done[covered[0]:covered[1]] = True
+        for ds in fragments:
+            i = util.period_offset(first, ds.startDate, intvl)
+            j = i + len(ds)
+            new = ~done[i:j]
+            values[i:j][new] = ds.dataArray[new]
+            done[i:j] = True
+    else:
+        raise Exception('Invalid precedence specified: ' + str(precedence))
+
+
+#--------------------------------------------------------------------------------
+#  The number of periods from ds.startDate through ds.endDate, after 
+#  checking that ds has exactly that many values.  The deposit and merge
+#  routines call this before they change anything, so a bad series can't
+#  be stored, or leave the stored one half-merged.
+#--------------------------------------------------------------------------------
+def _check_length(ds, intvl, caller):
+    if util.MISSING_DATE in (ds.startDate, ds.endDate):
+        raise Exception('Invalid data in call to ' + caller + '(): '
+                        + 'missing start or end date')
+    n = util.num_periods(ds.startDate, ds.endDate, intvl)
+    if len(ds) != n:
+        raise Exception('Invalid data in call to ' + caller + '(): ' 
+                        + str(len(ds)) + ' values for ' + str(n) 
+                        + ' periods from ' + str(ds.startDate) 
+                        + ' to ' + str(ds.endDate))
+    return n
+
+
+#--------------------------------------------------------------------------------
+#  ds, with its values copied if they are a view of a larger array (e.g.
+#  the group arrays in DataVault.deposit_many), so that storing ds does
+#  not keep the rest of that array alive.
+#--------------------------------------------------------------------------------
+def _own_values(ds):
+    vals = ds.dataArray
+    if vals.base is not None:
+        ds.dataArray = vals.copy()
+    return ds
+
+
+#--------------------------------------------------------------------------------
+#  The runs of missing values in a series of n values.  Run k covers
+#  values starts[k] through ends[k]-1; runs are sorted and never touch
+#  each other.  cum[k] is the total length of the runs before run k, so
+#  any count of missing values is a pair of binary searches.
+#  An index is never changed once it is built; splice() makes a new one.
+#--------------------------------------------------------------------------------
+class _GapIndex(object):
+    def __init__(self, starts, ends, n):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends   = np.asarray(ends, dtype=np.int64)
+        self.n      = n
+        self.cum    = np.zeros(len(self.starts) + 1, dtype=np.int64)
+        np.cumsum(self.ends - self.starts, out=self.cum[1:])
+
+    @classmethod
+    def build(thisclass, values):
+        m = np.isnan(values).view(np.int8)
+        d = np.diff(m, prepend=np.int8(0), append=np.int8(0))
+        return thisclass(np.flatnonzero(d == 1), np.flatnonzero(d == -1),
+                         len(values))
+
+    def __len__(self):
+        return len(self.starts)
+
+    #
+    #  Number of missing values in values[i:j].  Anything outside of
+    #  0..n counts as missing.
+    #
+    def missing(self, i, j):
+        if j <= i:
+            return 0
+        outside = max(0, min(j, 0) - i) + max(0, j - max(i, self.n))
+        i = min(max(i, 0), self.n)
+        j = min(max(j, 0), self.n)
+        if j <= i:
+            return outside
+        k1 = int(np.searchsorted(self.ends, i, side='right'))
+        k2 = int(np.searchsorted(self.starts, j, side='left'))
+        if k2 <= k1:
+            return outside
+        m = int(self.cum[k2] - self.cum[k1])
+        m -= max(0, i - int(self.starts[k1]))
+        m -= max(0, int(self.ends[k2-1]) - j)
+        return m + outside
+
+    #
+    #  Index of the first and last values that are not missing, or
+    #  None if they all are.
+    #
+    def first_present(self):
+        if len(self.starts) and self.starts[0] == 0:
+            if self.ends[0] == self.n:
+                return None
+            return int(self.ends[0])
+        return 0 if self.n else None
+
+    def last_present(self):
+        if len(self.ends) and self.ends[-1] == self.n:
+            if self.starts[-1] == 0:
+                return None
+            return int(self.starts[-1]) - 1
+        return self.n - 1 if self.n else None
+
+    #
+    #  The index after a merge: these values were extended by front
+    #  missing values at the start and by missing values at the end to
+    #  make n values in all, and then values[i:i+len] were overwritten
+    #  by values whose index is new.
+    #
+    def splice(self, front, n, i, new):
+        j = i + new.n
+        starts = self.starts + front
+        ends   = self.ends + front
+        pieces_s = []
+        pieces_e = []
+        if front > 0:
+            pieces_s.append([0])
+            pieces_e.append([front])
+        pieces_s.append(starts)
+        pieces_e.append(ends)
+        if front + self.n < n:
+            pieces_s.append([front + self.n])
+            pieces_e.append([n])
+        starts = np.concatenate(pieces_s).astype(np.int64)
+        ends   = np.concatenate(pieces_e).astype(np.int64)
+
+        #
+        #  Keep the old runs outside of i..j, cut at i and j, and put the
+        #  new runs in between.
+        #
+        left  = starts < i
+        right = ends > j
+        starts = np.concatenate((starts[left], new.starts + i,
+                                 np.maximum(starts[right], j)))
+        ends   = np.concatenate((np.minimum(ends[left], i), new.ends + i,
+                                 ends[right]))
+
+        #
+        #  Runs that now touch are joined.
+        #
+        if len(starts) > 1:
+            apart = starts[1:] != ends[:-1]
+            starts = starts[np.concatenate(([True], apart))]
+            ends   = ends[np.concatenate((apart, [True]))]
+        return _GapIndex(starts, ends, n)
+
+
 #--------------------------------------------------------------------------------
 #  Define the dataseries class that stores a single timeseries of data along with
 #  its metadata.
@@ -417,57 +698,68 @@ class DataSeries(object):
 
     Annual start/end dates are always January 1 and December 31 of the respective
     years.
+
+    The data values are stored in a contiguous numpy float64 array, with
+    missing values stored as NaN.  That array is available as dataArray.
+    For compatibility, dataVals still looks like the old list of floats
+    (missing values are util.MISSING_REAL), and the DataSeries itself can
+    be indexed, sliced, iterated and measured with len() just like that
+    list.  Note that dataVals builds a new list every time it is used, so
+    code that wants speed should use dataArray.
+
+    The metadata is held as small int codes (dataKindCode, dataUnitsCode,
+    dataIntervalCode, dataLocationCode), which are the row numbers in the
+    matching _inputStrings tuples.  dataKind, dataUnits, dataInterval and
+    dataLocation give the primary name strings for those codes, and can be
+    assigned either a string or a code.
     """
 
+    dataKind     = _metaProperty(DataKind,     'dataKindCode')
+    dataUnits    = _metaProperty(DataUnits,    'dataUnitsCode')
+    dataInterval = _metaProperty(DataInterval, 'dataIntervalCode')
+    dataLocation = _metaProperty(DataLocation, 'dataLocationCode')
+
     def __init__(self, kind=None, units=None, intvl=None, loc=None,
                        first=None, last=None, values=None):
-        self.dataKind     = 'na'
-        self.dataUnits    = 'na'
-        self.dataInterval = 'na'
-        self.dataLocation = 'na'
+        self.dataKindCode     = 0
+        self.dataUnitsCode    = 0
+        self.dataIntervalCode = 0
+        self.dataLocationCode = 0
         self.startDate    = util.MISSING_DATE
         self.endDate      = util.MISSING_DATE
-        self.dataVals     = []
+        self._values      = util.to_array(None)
+        self._buffer      = None
+        self._spill       = None
+        self._gaps        = None
                        
         #
         #  Handle metadata initialization
-        #  They are all specified with text strings.
+        #  They are specified with text strings or metadata codes, and
+        #  are resolved to codes here, once.
         #
         if kind:
             try:
-                self.dataKind = getPrimaryName(meta='kind', name=kind)
+                self.dataKindCode = DataKind.codeFromEntry(kind)
             except:
                 raise Exception('Invalid kind specifier in DataSeries init')
-        else:
-            self.dataKind = 'na'
 
         if units:
             try:
-                self.dataUnits = getPrimaryName(meta='units', name=units)
+                self.dataUnitsCode = DataUnits.codeFromEntry(units)
             except:
                 raise Exception('Invalid units specifier in DataSeries init')
-        else:
-            self.dataUnits = 'na'
 
         if intvl:
             try:
-                self.dataInterval = getPrimaryName(meta='interval', name=intvl)
-                if isinstance(intvl, str):
-                    self.dataInterval = DataInterval(intvl).primaryName()
+                self.dataIntervalCode = DataInterval.codeFromEntry(intvl)
             except:
                 raise Exception('Invalid interval specifier in DataSeries init')
-        else:
-            self.dataInterval = 'na'
 
         if loc:            
             try:
-                self.dataLocation = getPrimaryName(meta='location', name=loc)
-                if isinstance(loc, str):
-                    self.dataLocation = DataLocation(loc).primaryName()
+                self.dataLocationCode = DataLocation.codeFromEntry(loc)
             except:
                 raise Exception('Invalid location specifier in DataSeries init')
-        else:
-            self.dataLocation = 'na'
 
         if first:
             self.startDate = util.date_from_entry(first)
@@ -479,10 +771,8 @@ class DataSeries(object):
         else:
             self.endDate = util.MISSING_DATE
 
-        if values:
+        if values is not None:
             self.dataVals = values
-        else:
-            self.dataVals = []
             
         #
         #  Future enhancement: compute the required number of values
@@ -490,6 +780,123 @@ class DataSeries(object):
         #  compare that to the number of entries in the values list.
         #
 
+    #---------------------------------------------------------------------
+    #  dataArray is the stored float64 array (NaN = missing).  Assigning
+    #  an array to it adopts that array without making a copy.
+    #  dataVals is the same values as a list, with MISSING_REAL for
+    #  missing.  The list is built anew on every access, so don't index
+    #  it in a loop (ds.dataVals[i] copies the whole series each time);
+    #  index the series itself (ds[i]) or use dataArray instead.
+    #  Assigning a list (or array) to dataVals always makes a copy.
+    #---------------------------------------------------------------------
+    @property
+    def dataArray(self):
+        if self._values is None:
+            return self._spill_values()
+        return self._values
+
+    @dataArray.setter
+    def dataArray(self, values):
+        self._values = util.to_array(values, copy=False)
+        self._gaps = None
+
+    @property
+    def dataVals(self):
+        return util.to_list(self.dataArray)
+
+    @dataVals.setter
+    def dataVals(self, values):
+        self._values = util.to_array(values)
+        self._gaps = None
+
+    #---------------------------------------------------------------------
+    #  Return an independent copy of this DataSeries (metadata and values).
+    #
+    def copy(self):
+        ds = DataSeries(kind=self.dataKindCode, units=self.dataUnitsCode,
+                        intvl=self.dataIntervalCode, loc=self.dataLocationCode,
+                        first=self.startDate, last=self.endDate)
+        ds.dataArray = self.dataArray.copy()
+        ds._gaps = self._gaps
+        return ds
+
+    #---------------------------------------------------------------------
+    #  A DataVault with a memory budget replaces a cold series with one
+    #  whose values are in its spill file (see DataVault._spill_series).
+    #  For that series _values is None and _spill is 
+    #     (spill file, offset, number of values, None)
+    #  When it is reloaded, the values are memory-mapped, and the 4th 
+    #  item is the mapped array, so that an unchanged series can be 
+    #  spilled again without being rewritten.
+    #
+    def _spill_values(self):
+        f, offset, n, view = self._spill
+        return f.map(offset, n)
+
+    #---------------------------------------------------------------------
+    #  Add front missing values before the start of the data and back
+    #  missing values after the end, growing the values in place when
+    #  possible (see _ValueBuffer).  The buffer is only used while 
+    #  _values is still its view; if anyone has assigned new values
+    #  since, or the values are read-only, a new buffer is made.
+    #  The dates are left for the caller to adjust.
+    #
+    def _make_room(self, front, back):
+        writeable = self._values.flags.writeable
+        if front == 0 and back == 0 and writeable:
+            return
+        buf = self._buffer
+        if buf is None or buf.view is not self._values or not writeable:
+            buf = self._buffer = _ValueBuffer(self._values)
+        self._values = buf.grow(front, back)
+
+    #---------------------------------------------------------------------
+    #  Boolean array that is True wherever a value is missing.
+    #
+    def missingMask(self):
+        return np.isnan(self.dataArray)
+
+    #---------------------------------------------------------------------
+    #  The index of the runs of missing values (see _GapIndex).  It is
+    #  built the first time it is needed and then kept up to date by
+    #  the merge routines, so code that changes the values in place
+    #  any other way must set _gaps to None.
+    #
+    def gapIndex(self):
+        gaps = self._gaps
+        if gaps is None:
+            gaps = self._gaps = _GapIndex.build(self.dataArray)
+        return gaps
+
+    #
+    #  After values[i:i+len(newData)] were overwritten by newData, having
+    #  first been extended by front missing values at the start.
+    #
+    def _splice_gaps(self, front, i, newData):
+        if self._gaps is not None:
+            self._gaps = self._gaps.splice(front, len(self._values), i,
+                                           newData.gapIndex())
+
+    #---------------------------------------------------------------------
+    #  List-style access to the values.  Missing values come back as
+    #  util.MISSING_REAL, exactly as they did from the old list.
+    #
+    def __len__(self):
+        if self._values is None:
+            return self._spill[2]
+        return len(self._values)
+
+    def __getitem__(self, i):
+        v = self.dataArray[i]
+        if isinstance(v, np.ndarray):
+            return util.to_list(v)
+        if np.isnan(v):
+            return util.MISSING_REAL
+        return float(v)
+
+    def __iter__(self):
+        return iter(self.dataVals)
+
     #---------------------------------------------------------------------
     def printSummary(self):
         print('Summary of DataSeries...')
@@ -532,21 +939,21 @@ class DataSeries(object):
         """
         #
         #  Compare the metadata values.  Reminder -- these are the
-        #  2- or 3-character strings, all lowercase.
+        #  int metadata codes.
         #
-        if newData.dataKind != self.dataKind:
+        if newData.dataKindCode != self.dataKindCode:
             print('Error. Mismatched data kinds in DataSeries.add_data')
             raise TypeError('Invalid attempt to add data to a DataSeries')
 
-        if newData.dataUnits != self.dataUnits:
+        if newData.dataUnitsCode != self.dataUnitsCode:
             print('Error. Mismatched data units in DataSeries.add_data')
             raise TypeError('Invalid attempt to add data to a DataSeries')
 
-        if newData.dataInterval != self.dataInterval:
+        if newData.dataIntervalCode != self.dataIntervalCode:
             print('Error. Mismatched intervals in DataSeries.add_data')
             raise TypeError('Invalid attempt to add data to a DataSeries')
 
-        if newData.dataLocation != self.dataLocation:
+        if newData.dataLocationCode != self.dataLocationCode:
             print('Error. Mismatched locations in DataSeries.add_data')
             raise TypeError('Invalid attempt to add data to a DataSeries')
 
@@ -564,22 +971,149 @@ class DataSeries(object):
         #
         #  Call the appropriate merge routine
         #
-        if newData.dataInterval == getPrimaryName(meta='interval', name='dly'):
+        if newData.dataInterval == 'dy':
             try:
-                self.mrg_daily_data(newData)
+                ok = self.mrg_daily_data(newData)
             except:
                 raise Exception('Error attempting to merge daily data.')
-        elif newData.dataInterval == getPrimaryName(meta='interval', name='monthly'):
+        elif newData.dataInterval == 'mn':
             try:
-                self.mrg_monthly_data(newData)
+                ok = self.mrg_monthly_data(newData)
             except:
                 raise Exception('Error attempting to merge monthly data.')
+        elif newData.dataInterval == 'wk':
+            try:
+                ok = self.mrg_weekly_data(newData)
+            except:
+                raise Exception('Error attempting to merge weekly data.')
+        elif newData.dataInterval == 'qm':
+            try:
+                ok = self.mrg_qtrmonthly_data(newData)
+            except:
+                raise Exception('Error attempting to merge quarter-monthly data.')
+        elif newData.dataInterval == 'yr':
+            try:
+                ok = self.mrg_annual_data(newData)
+            except:
+                raise Exception('Error attempting to merge annual data.')
         else:
             print('Unable to merge data because interval is invalid.')
             return False
 
+        return ok
+
+    #---------------------------------------------------------------------
+    def add_data_many(self, newData, precedence='last'):
+        """Add a list of continuous timeseries of data to the stored data.
+
+        With the default precedence ('last'), the effect is the same as
+        calling add_data() for each one in turn (so later ones overwrite
+        earlier ones where they overlap), but the merged values are built
+        with a single allocation.  See assemble() for the other
+        precedence rules; the stored data counts as the first fragment.
+
+        On success, it returns True.
+        If there is a problem, it returns False.
+        """
+        newData = list(newData)
+        for nd in newData:
+            if (nd.dataKindCode != self.dataKindCode
+                  or nd.dataUnitsCode != self.dataUnitsCode
+                  or nd.dataIntervalCode != self.dataIntervalCode
+                  or nd.dataLocationCode != self.dataLocationCode):
+                print('Error. Mismatched metadata in DataSeries.add_data_many')
+                raise TypeError('Invalid attempt to add data to a DataSeries')
+            if (nd.startDate == util.MISSING_DATE 
+                  or nd.endDate == util.MISSING_DATE):
+                print("Missing date specification in call to add_data_many().")
+                return False
+
+        intvl = self.dataInterval
+        if intvl not in ('dy', 'wk', 'qm', 'mn', 'yr'):
+            print('Unable to merge data because interval is invalid.')
+            return False
+        for nd in newData:
+            _check_length(nd, intvl, 'add_data_many')
+            if nd.startDate != util.period_start(nd.startDate, 0, intvl):
+                print("Invalid start date in call to add_data_many().  "
+                      "Must be the first day of a period.")
+                return False
+
+        #
+        #  Make room for everything at once, then copy each series into 
+        #  its place.
+        #
+        mrgStart = min([self.startDate] + [ds.startDate for ds in newData])
+        mrgEnd   = max([self.endDate] + [ds.endDate for ds in newData])
+        front = util.period_offset(mrgStart, self.startDate, intvl)
+        covered = (front, front + len(self))
+        self._make_room(front, util.period_offset(self.endDate, mrgEnd, intvl))
+        _scatter_fragments(self._values, mrgStart, newData, intvl, 
+                           precedence, covered=covered)
+
+        #
+        #  With 'last', each fragment simply replaces what it covers, so
+        #  the gap index can be spliced one fragment at a time.
+        #
+        gaps = self._gaps
+        if precedence == 'last' and gaps is not None:
+            for k, ds in enumerate(newData):
+                i = util.period_offset(mrgStart, ds.startDate, intvl)
+                gaps = gaps.splice(front if k == 0 else 0, len(self._values),
+                                   i, ds.gapIndex())
+            self._gaps = gaps
+        else:
+            self._gaps = None
+
+        self.startDate = mrgStart
+        self.endDate = mrgEnd
         return True
 
+    #---------------------------------------------------------------------
+    @classmethod
+    def assemble(thisclass, fragments, precedence='last'):
+        """Build one DataSeries from a list of fragments of the same series.
+
+        The fragments must all have the same kind, units, interval and
+        location, but may be in any order, and may overlap or leave gaps
+        (which are missing).  The union of their dates is worked out
+        first and the values are allocated once, so the cost is linear
+        in the total amount of data.  Where fragments overlap:
+           'last'        the later fragment in the list wins
+           'first'       the earlier fragment in the list wins
+           'nonmissing'  the later fragment wins, except that a missing
+                         value never replaces a value that isn't missing
+        """
+        fragments = list(fragments)
+        if not fragments:
+            raise Exception('No fragments given to DataSeries.assemble()')
+        f0 = fragments[0]
+        for nd in fragments:
+            if (nd.dataKindCode != f0.dataKindCode
+                  or nd.dataUnitsCode != f0.dataUnitsCode
+                  or nd.dataIntervalCode != f0.dataIntervalCode
+                  or nd.dataLocationCode != f0.dataLocationCode):
+                print('Error. Mismatched metadata in DataSeries.assemble')
+                raise TypeError('Invalid attempt to assemble a DataSeries')
+            if (nd.startDate == util.MISSING_DATE 
+                  or nd.endDate == util.MISSING_DATE):
+                raise Exception('Missing date specification in call to '
+                              + 'DataSeries.assemble()')
+
+        intvl = f0.dataInterval
+        for nd in fragments:
+            _check_length(nd, intvl, 'DataSeries.assemble')
+        first = min(ds.startDate for ds in fragments)
+        last  = max(ds.endDate for ds in fragments)
+        values = np.full(util.num_periods(first, last, intvl), np.nan)
+        _scatter_fragments(values, first, fragments, intvl, precedence)
+
+        ds = thisclass(kind=f0.dataKindCode, units=f0.dataUnitsCode,
+                       intvl=f0.dataIntervalCode, loc=f0.dataLocationCode,
+                       first=first, last=last)
+        ds.dataArray = values
+        return ds
+
     #---------------------------------------------------------------------
     def mrg_daily_data(self, newData):
         """Merge an update set of continuous daily data to the stored data.
@@ -587,7 +1121,7 @@ class DataSeries(object):
         class methods.
         It overwrites any old values in the period of the new
         data, but preserves existing values outside that period.
-        The dates and data list are modified in place.
+        The dates and data values are modified in place.
 
         On success, it returns True.
         If there is a problem, it returns False.
@@ -603,46 +1137,7 @@ class DataSeries(object):
             print("Missing end date specification in call to merge_daily_data().")
             return False
 
-        #
-        #  Determine the new date extents.
-        #  Just save these values for now
-        #
-        mrgStart = min(self.startDate, newData.startDate)
-        mrgEnd   = max(self.endDate,   newData.endDate)
-
-        #
-        #  create a template list of the new size, filled with missing data values
-        #
-        ndays = mrgEnd.toordinal() - mrgStart.toordinal() + 1
-        mrgData = [util.MISSING_REAL] * ndays
-
-        #
-        #  replace the appropriate slice of mrgData with the old data
-        #  Don't forget that the end index is always 1 past the desired end
-        #
-        i = self.startDate.toordinal() - mrgStart.toordinal()
-        j = self.endDate.toordinal() - mrgStart.toordinal() + 1
-        m = 0
-        n = self.endDate.toordinal() - self.startDate.toordinal() + 1
-        mrgData[i:j] = self.dataVals[m:n]
-
-        #
-        #  replace the appropriate slice of mrgData with the new data
-        #  Don't forget that the end index is always 1 past the desired end
-        #
-        i = newData.startDate.toordinal() - mrgStart.toordinal()
-        j = newData.endDate.toordinal() - mrgStart.toordinal() + 1
-        m = 0
-        n = newData.endDate.toordinal() - newData.startDate.toordinal() + 1
-        mrgData[i:j] = newData.dataVals[m:n]
-
-        #
-        #  replace/overwrite old object values with the new ones
-        #
-        self.startDate = mrgStart
-        self.endDate = mrgEnd
-        self.dataVals = mrgData
-        return True
+        return self._mrg_periods(newData)
 
     #---------------------------------------------------------------------
     def mrg_monthly_data(self, newData):
@@ -651,7 +1146,7 @@ class DataSeries(object):
         class methods.
         It overwrites any old values in the period of the new
         data, but preserves existing values outside that period.
-        The dates and data list are modified in place.
+        The dates and data values are modified in place.
 
         On success, it returns True.
         If there is a problem, it returns False.
@@ -671,125 +1166,586 @@ class DataSeries(object):
             print("Invalid start date for monthly data.  Must be 1.")
             return False
 
-        d = last_day_of_month(newData.endDate)
-        if newData.day != d.day:
+        d = util.last_day_of_month(newData.endDate)
+        if newData.endDate.day != d.day:
             print("Invalid end date for monthly data.  Must be last day of the month.")
             return False
 
-        #
-        #  Determine the new date extents.
-        #  Just save these values for now
-        #
-        mrgStart = min(self.startDate, newData.startDate)
-        mrgEnd = max(self.endDate,   newData.endDate)
+        return self._mrg_periods(newData)
 
-        #
-        #  create a template list of the new size, filled with missing data values
-        #
-        mons = ((mrgEnd.year - mrgStart.year)*12
-                + (mrgEnd.month - mrgStart.month) + 1)
-        mrgData = [util.MISSING_REAL] * mons
+    #---------------------------------------------------------------------
+    def mrg_weekly_data(self, newData):
+        """Merge an update set of continuous weekly data to the stored data.
+        Weeks begin on Friday (see util.getFridayDate), so the start date
+        must be a Friday.  Otherwise, the same as mrg_monthly_data().
+        """
+        if not self._mrg_dates_ok(newData, 'mrg_weekly_data'):
+            return False
+
+        if newData.startDate.weekday() != 4:
+            print("Invalid start date for weekly data.  Must be a Friday.")
+            return False
+
+        return self._mrg_periods(newData)
+
+    #---------------------------------------------------------------------
+    def mrg_qtrmonthly_data(self, newData):
+        """Merge an update set of continuous quarter-monthly data to the 
+        stored data.  The start and end dates must be the first and last
+        days of quarter-months (see util.getQtrMonthStartEnd).  Otherwise,
+        the same as mrg_monthly_data().
+        """
+        if not self._mrg_dates_ok(newData, 'mrg_qtrmonthly_data'):
+            return False
+
+        sd = newData.startDate
+        ed = newData.endDate
+        if sd.day != util.getQtrMonthStartEnd(year=sd.year, month=sd.month,
+                        qtr=util.qtr_of_date(sd))[0]:
+            print("Invalid start date for quarter-monthly data.  "
+                  "Must be the first day of a quarter-month.")
+            return False
+        if ed.day != util.getQtrMonthStartEnd(year=ed.year, month=ed.month,
+                        qtr=util.qtr_of_date(ed))[1]:
+            print("Invalid end date for quarter-monthly data.  "
+                  "Must be the last day of a quarter-month.")
+            return False
+
+        return self._mrg_periods(newData)
+
+    #---------------------------------------------------------------------
+    def mrg_annual_data(self, newData):
+        """Merge an update set of continuous annual data to the stored data.
+        The start date must be January 1 and the end date December 31.
+        Otherwise, the same as mrg_monthly_data().
+        """
+        if not self._mrg_dates_ok(newData, 'mrg_annual_data'):
+            return False
+
+        if (newData.startDate.month, newData.startDate.day) != (1, 1):
+            print("Invalid start date for annual data.  Must be Jan 1.")
+            return False
+        if (newData.endDate.month, newData.endDate.day) != (12, 31):
+            print("Invalid end date for annual data.  Must be Dec 31.")
+            return False
+
+        return self._mrg_periods(newData)
+
+    #---------------------------------------------------------------------
+    #  Shared by the merge routines above.
+    #
+    def _mrg_dates_ok(self, newData, caller):
+        if newData.startDate == util.MISSING_DATE:
+            print("Missing start date specification in call to " + caller + "().")
+            return False
+        if newData.endDate == util.MISSING_DATE:
+            print("Missing end date specification in call to " + caller + "().")
+            return False
+        return True
+
+    #---------------------------------------------------------------------
+    #  Merge newData in place, for any interval, using util.period_offset()
+    #  for the index arithmetic.  This is the body of all of the merge
+    #  routines above.
+    #
+    def _mrg_periods(self, newData):
+        intvl = self.dataInterval
+        mrgStart = min(self.startDate, newData.startDate)
+        mrgEnd   = max(self.endDate,   newData.endDate)
 
         #
-        #  replace the appropriate slice of mrgData with the old data
-        #  Don't forget that the end index is always 1 past the desired end
+        #  Nothing is changed until the new data is known to fit its dates.
         #
-        sd = self.startDate
-        ed = self.endDate
-        i = (sd.year - mrgStart.year)*12 + (sd.month - mrgStart.month)
-        j = (ed.year - mrgEnd.year)*12 + (ed.month - mrgEnd.month) + 1
-        m = 0
-        n = (ed.year - sd.year)*12 + (ed.month - sd.month) + 1
-        mrgData[i:j] = self.dataVals[m:n]
+        n = _check_length(newData, intvl, 'add_data')
 
         #
-        #  replace the appropriate slice of mrgData with the new data
-        #  Don't forget that the end index is always 1 past the desired end
+        #  extend the stored values (in place, if there is room) with 
+        #  missing data values to cover the new extents
         #
-        sd = newData.startDate
-        ed = newData.endDate
-        i = (sd.year - mrgStart.year)*12 + (sd.month - mrgStart.month)
-        j = (ed.year - mrgEnd.year)*12 + (ed.month - mrgEnd.month) + 1
-        m = 0
-        n = (ed.year - sd.year)*12 + (ed.month - sd.month) + 1
-        mrgData[i:j] = newData.dataVals[m:n]
+        front = util.period_offset(mrgStart, self.startDate, intvl)
+        back  = util.period_offset(self.endDate, mrgEnd, intvl)
+        self._make_room(front, back)
 
         #
-        #  replace/overwrite old object values with the new ones
+        #  overwrite the appropriate slice with the new data
         #
-        self.startdate = mrgStart
-        self.enddate = mrgEnd
-        self.dataVals = mrgData
+        i = util.period_offset(mrgStart, newData.startDate, intvl)
+        self._values[i:i+n] = newData.dataArray[0:n]
+        self._splice_gaps(front, i, newData)
 
+        self.startDate = mrgStart
+        self.endDate = mrgEnd
         return True
 
 
 #--------------------------------------------------------------------------------
-#  Define the DataVault class that stores a bunch of DataSeries objects and will
-#  be used as the repository for GLRRM data.
-#
-#  When a dataset is stored into the vault, the data values will be "normalized" 
-#  to a specific set of units. When data is withdrawn, the values will be 
-#  converted into whatever was requested. When this conversion requires a lake
-#  area to be used (e.g. when converting from cms -> mm) we will use the 
-#  coordinated lake areas by default. The caller will have the option to specify
-#  an alternate area.
-#  *** MODELERS BEWARE ***
-#  If you use this functionality to specify an alternative lake area, please be
-#  certain that you are consistent, and ALWAYS use it.  As you can imagine, if
-#  you were to store values converted via coordinated areas (no area specified), 
-#  then withdraw them using an alternative area, then store them again using 
-#  the coordinated area (no area specified) -- You will end up changing the 
-#  data values in the vault in a way you don't intend.
-#  
-#  Normalized units are:
-#    precipitation      cubic meters per second
-#    runoff             cubic meters per second
-#    evaporation        cubic meters per second
-#    net basin supply   cubic meters per second
-#    mean level         meters
-#    bom level          meters
-#    eom level          meters
-#    flow               cubic meters per second
-#    consumptive use    cubic meters per second
-#    ice-weed ret       cubic meters per second
-#
-#  Note that lake levels are stored using a generic elevation without any
-#  consideration of IGLD55, IGLD85, etc.  For now, it is the responsibility
-#  of the model to account for any IGLD conversion issues.
+#  Define the DataMatrix class that holds several timeseries that share one
+#  interval, one set of units and one time axis.  This is what
+#  DataVault.withdraw_many() returns.
 #--------------------------------------------------------------------------------
-class DataVault(object):
+class DataMatrix(object):
+    """A set of timeseries aligned on a common time axis.
+
+    dataArray is a 2-D numpy float64 array with one row per series and one
+    column per period (series x time).  Missing values are NaN, including
+    any period that a series does not cover.  Row r holds the series for
+    dataKinds[r] at dataLocations[r].  All rows are in dataUnits and have
+    the interval dataInterval.
+
+    startDate and endDate follow the DataSeries convention (first day of
+    the first period, last day of the last period).  dates is the shared
+    date index: the first day of each period, as a numpy datetime64 array.
+    """
 
-    #--------------------------------
-    #  Specify the coordinated lake surface areas, in sq meters
-    #  To be very clear, these are the lake areas only, and do not
-    #  include upstream channels.
-    #  Also, Lake Huron is the entire Lake Huron area, including Georgian Bay.
-    #--------------------------------
-    _coordLakeArea = (
-        ('su', 8.21e10),
-        ('mi', 5.78e10),
-        ('hu', 5.96e10),
-        ('sc', 1.11e09),
-        ('er', 2.57e10),
-        ('on', 1.90e10),
-        ('mh', 1.17e11),
-    )
-    def getLakeArea(self, loc=None):
-        if not loc: return None
-        try:
-            s = DataLocation(loc).primaryName().lower()
-            for t in self. _coordLakeArea:
-                if t[0].lower() == s: 
-                    return t[1]
-            return None
-        except:
-            return None
-    
-    #--------------------------------
-    #  Specify the normalized units to use for each kind
-    #--------------------------------
-    _normalizedUnits = (
+    def __init__(self, kinds=None, units=None, intvl=None, locs=None,
+                       first=None, last=None, values=None):
+        self.dataKinds     = list(kinds) if kinds else []
+        self.dataLocations = list(locs) if locs else []
+        self.dataUnits     = units
+        self.dataInterval  = intvl
+        self.startDate     = first
+        self.endDate       = last
+        self.dataArray     = values
+        self._dates        = None
+
+    #---------------------------------------------------------------------
+    @property
+    def dates(self):
+        if self._dates is None:
+            self._dates = util.period_dates(self.startDate,
+                                            self.dataArray.shape[1],
+                                            self.dataInterval)
+        return self._dates
+
+    #---------------------------------------------------------------------
+    #  Row number for a kind/location pair, e.g. rowIndex(loc='sup').
+    #  If kind (or loc) is omitted, the first row that matches the other
+    #  one is returned.  Returns None if there is no match.
+    #
+    def rowIndex(self, kind=None, loc=None):
+        k = getPrimaryName(meta='kind', name=kind) if kind else None
+        l = getPrimaryName(meta='location', name=loc) if loc else None
+        for r in range(len(self.dataKinds)):
+            if k and self.dataKinds[r] != k:
+                continue
+            if l and self.dataLocations[r] != l:
+                continue
+            return r
+        return None
+
+    #---------------------------------------------------------------------
+    #  Pull one row out as a DataSeries.
+    #
+    def row(self, r):
+        ds = DataSeries(kind=self.dataKinds[r], units=self.dataUnits,
+                        intvl=self.dataInterval, loc=self.dataLocations[r],
+                        first=self.startDate, last=self.endDate)
+        ds.dataArray = self.dataArray[r].copy()
+        return ds
+
+
+#--------------------------------------------------------------------------------
+#  Define the DataSeriesView class, a read-only, unit-converting view of part
+#  of a series that is stored in the vault.  This is what 
+#  DataVault.withdraw(lazy=True) returns.
+#--------------------------------------------------------------------------------
+class DataSeriesView(object):
+    """A read-only view of stored vault data in the requested units.
+
+    No values are copied or converted when the view is created.  Instead,
+    the unit conversion (including the per-period seconds for rate <->
+    linear/cubic conversions) is applied when an element or a slice is
+    accessed.  Indexing works just like a DataSeries: an int index gives 
+    a float (util.MISSING_REAL if missing) and a slice gives a list.
+
+    materialize() converts the whole view into a regular DataSeries.
+    dataArray and dataVals do the same thing for the values only.
+    """
+
+    dataKind     = _metaProperty(DataKind,     'dataKindCode')
+    dataUnits    = _metaProperty(DataUnits,    'dataUnitsCode')
+    dataInterval = _metaProperty(DataInterval, 'dataIntervalCode')
+    dataLocation = _metaProperty(DataLocation, 'dataLocationCode')
+
+    def __init__(self, ds, units=None, first=None, last=None, area=None):
+        self.dataKindCode     = ds.dataKindCode
+        self.dataUnitsCode    = DataUnits.codeFromEntry(units)
+        self.dataIntervalCode = ds.dataIntervalCode
+        self.dataLocationCode = ds.dataLocationCode
+        self.startDate = first
+        self.endDate   = last
+
+        intvl = ds.dataInterval
+        i, j = util.trimIndices(ds.startDate, first, last, intvl)
+        self._base = ds.dataArray[i:j]
+        self._base.flags.writeable = False
+        self._oldunits = ds.dataUnits
+        self._area = area
+
+        #
+        #  Most conversions use the same factor for every period, so 
+        #  work it out once.  Rate <-> linear/cubic conversions for 
+        #  intervals longer than a week depend on the number of days
+        #  in each period, so those are worked out on access.
+        #
+        d = first if first <= last else ds.startDate
+        f = util.conversionFactors(oldunits=self._oldunits, 
+                newunits=self.dataUnits, area=area, intvl=intvl,
+                first=d, last=d, n=1)
+        if f is None:
+            raise Exception('Invalid conversion specified; ' + self._oldunits
+                          + ' to ' + self.dataUnits)
+        self._factor = None
+        if not util.period_dependent(self._oldunits, self.dataUnits, intvl):
+            self._factor = f[0]
+
+    #---------------------------------------------------------------------
+    #  Conversion factors for elements i through j-1 of the view.
+    #
+    def _factors(self, i, j):
+        if self._factor is not None:
+            return self._factor
+        intvl = self.dataInterval
+        d = util.period_start(self.startDate, i, intvl)
+        return util.conversionFactors(oldunits=self._oldunits,
+                newunits=self.dataUnits, area=self._area, intvl=intvl,
+                first=d, last=util.period_end(d, j-i-1, intvl), n=j-i)
+
+    #---------------------------------------------------------------------
+    def __len__(self):
+        return len(self._base)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self._base))
+            if step < 0 or start >= stop:
+                n = len(self._base)
+                return util.to_list((self._base * self._factors(0, n))[i])
+            vals = self._base[start:stop] * self._factors(start, stop)
+            return util.to_list(vals[::step])
+        n = len(self._base)
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError('DataSeriesView index out of range')
+        v = self._base[i] * (self._factor if self._factor is not None
+                             else self._factors(i, i+1)[0])
+        if np.isnan(v):
+            return util.MISSING_REAL
+        return float(v)
+
+    def __iter__(self):
+        return iter(self.dataVals)
+
+    def __setitem__(self, i, value):
+        raise TypeError('DataSeriesView is read-only')
+
+    #---------------------------------------------------------------------
+    #  Give the view its own copy of the values it reads, so that it 
+    #  keeps them when the stored series is about to be changed in place
+    #  (see DataVault._detach_views).
+    #
+    def _detach(self):
+        base = self._base.copy()
+        base.flags.writeable = False
+        self._base = base
+
+    #---------------------------------------------------------------------
+    def materialize(self):
+        ds = DataSeries(kind=self.dataKindCode, units=self.dataUnitsCode,
+                        intvl=self.dataIntervalCode, loc=self.dataLocationCode,
+                        first=self.startDate, last=self.endDate)
+        ds.dataArray = self._base * self._factors(0, len(self._base))
+        return ds
+
+    @property
+    def dataArray(self):
+        return self.materialize().dataArray
+
+    @property
+    def dataVals(self):
+        return util.to_list(self.dataArray)
+
+
+#--------------------------------------------------------------------------------
+#  A reader/writer lock for DataVault(threadsafe=True).  Any number of 
+#  threads may hold it for reading at once; a writer gets it alone.  
+#  Waiting writers are served before new readers, so a steady stream of
+#  withdrawals can't starve a deposit.  It is not reentrant.
+#--------------------------------------------------------------------------------
+class _RWLock(object):
+    def __init__(self):
+        self._cond    = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer  = False
+        self._waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def reading(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def writing(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+#--------------------------------------------------------------------------------
+#  Stands in for both _RWLock and threading.Lock when a DataVault is not
+#  threadsafe, so the vault code can lock unconditionally.
+#--------------------------------------------------------------------------------
+class _NoLock(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def reading(self):
+        return self
+
+    def writing(self):
+        return self
+
+
+#--------------------------------------------------------------------------------
+#  The file that a DataVault with a memory budget spills cold series to.
+#  Series are only ever appended, never rewritten, so a spilled series
+#  stays valid for as long as the file exists, and one file can be shared
+#  by a vault and its forks.  The file is removed when the last of them is
+#  garbage collected, unless the caller named it.
+#--------------------------------------------------------------------------------
+class _SpillFile(object):
+    def __init__(self, path=None):
+        remove = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix='databank', suffix='.spill')
+            os.close(fd)
+        self.path  = path
+        self._file = open(path, 'wb')
+        self._size = 0                   # in values
+        self._lock = threading.Lock()
+        weakref.finalize(self, _SpillFile._cleanup, self._file, path, remove)
+
+    @staticmethod
+    def _cleanup(f, path, remove):
+        f.close()
+        if remove:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def write(self, values):
+        with self._lock:
+            offset = self._size
+            self._file.write(values.astype('<f8', copy=False).tobytes())
+            self._file.flush()
+            self._size += len(values)
+        return offset
+
+    def map(self, offset, n):
+        if n == 0:
+            return np.empty(0)
+        return np.asarray(np.memmap(self.path, dtype='<f8', mode='r', 
+                                    offset=offset*8, shape=(n,)))
+
+
+#--------------------------------------------------------------------------------
+#  True if values are held in this process's own memory, as opposed to
+#  being memory-mapped from a file or in a shared memory block.  The
+#  arrays from attach() are on the block's mmap.mmap, and those from
+#  load() and the spill file on an np.memmap, so walk the base chain.
+#--------------------------------------------------------------------------------
+def _in_memory(values):
+    b = values
+    while b is not None:
+        if isinstance(b, (np.memmap, memoryview, mmap.mmap)):
+            return False
+        b = getattr(b, 'base', None)
+    return True
+
+
+#--------------------------------------------------------------------------------
+#  The saved contents of a DataVault, from DataVault.snapshot().  It only
+#  holds references to the stored series; see DataVault.fork().
+#--------------------------------------------------------------------------------
+class VaultSnapshot(object):
+    def __init__(self, vault):
+        self.vault = dict(vault)
+
+    def __len__(self):
+        return len(self.vault)
+
+
+#--------------------------------------------------------------------------------
+#  Open an existing shared memory block without handing it to this process's
+#  resource tracker, which would otherwise destroy the block when the process
+#  exits, even though other processes are still using it.  Only the process
+#  that created the block (see SharedVaultCatalog.unlink) should do that.
+#--------------------------------------------------------------------------------
+def _open_shared_block(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+#--------------------------------------------------------------------------------
+#  The whole of a shared memory block as one float64 array.  It holds on to
+#  the SharedMemory object, which unmaps the block when it is collected.
+#  Every array that attach() builds is a view of it, so the block stays
+#  mapped for as long as any of them (or any view of those, such as a
+#  withdraw(lazy=True) result) is still in use, even after the vault that
+#  attached it is gone.
+#--------------------------------------------------------------------------------
+class _SharedBlock(np.ndarray):
+    pass
+
+def _shared_block_array(shm):
+    block = np.ndarray((shm.size // 8,), dtype=np.float64, buffer=shm.buf)
+    block = block.view(_SharedBlock)
+    block._shm = shm
+    return block
+
+
+#--------------------------------------------------------------------------------
+#  Describes the contents of a DataVault that has been copied into shared
+#  memory by DataVault.share().  It is small and picklable, so it can be
+#  passed to worker processes, which call DataVault.attach(catalog).
+#
+#  entries holds one tuple per series:
+#     (vault key, units code, start date ordinal, end date ordinal,
+#      offset into the block in values, number of values)
+#
+#  The process that called share() owns the block.  It should call 
+#  close() and unlink() once the workers are finished.
+#--------------------------------------------------------------------------------
+class SharedVaultCatalog(object):
+    def __init__(self, name, entries, shm=None):
+        self.name    = name
+        self.entries = entries
+        self._shm    = shm
+
+    def __getstate__(self):
+        return {'name': self.name, 'entries': self.entries, '_shm': None}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+
+    def unlink(self):
+        if self._shm is not None:
+            #
+            #  An attach() in a forked child shares our resource tracker
+            #  and takes the block off its list, so put it back first.
+            #
+            resource_tracker.register(self._shm._name, 'shared_memory')
+            self._shm.unlink()
+            self._shm = None
+
+
+#--------------------------------------------------------------------------------
+#  Define the DataVault class that stores a bunch of DataSeries objects and will
+#  be used as the repository for GLRRM data.
+#
+#  When a dataset is stored into the vault, the data values will be "normalized" 
+#  to a specific set of units. When data is withdrawn, the values will be 
+#  converted into whatever was requested. When this conversion requires a lake
+#  area to be used (e.g. when converting from cms -> mm) we will use the 
+#  coordinated lake areas by default. The caller will have the option to specify
+#  an alternate area.
+#  *** MODELERS BEWARE ***
+#  If you use this functionality to specify an alternative lake area, please be
+#  certain that you are consistent, and ALWAYS use it.  As you can imagine, if
+#  you were to store values converted via coordinated areas (no area specified), 
+#  then withdraw them using an alternative area, then store them again using 
+#  the coordinated area (no area specified) -- You will end up changing the 
+#  data values in the vault in a way you don't intend.
+#  
+#  Normalized units are:
+#    precipitation      cubic meters per second
+#    runoff             cubic meters per second
+#    evaporation        cubic meters per second
+#    net basin supply   cubic meters per second
+#    mean level         meters
+#    bom level          meters
+#    eom level          meters
+#    flow               cubic meters per second
+#    consumptive use    cubic meters per second
+#    ice-weed ret       cubic meters per second
+#
+#  Note that lake levels are stored using a generic elevation without any
+#  consideration of IGLD55, IGLD85, etc.  For now, it is the responsibility
+#  of the model to account for any IGLD conversion issues.
+#--------------------------------------------------------------------------------
+class DataVault(object):
+
+    #--------------------------------
+    #  Specify the coordinated lake surface areas, in sq meters
+    #  To be very clear, these are the lake areas only, and do not
+    #  include upstream channels.
+    #  Also, Lake Huron is the entire Lake Huron area, including Georgian Bay.
+    #--------------------------------
+    _coordLakeArea = (
+        ('su', 8.21e10),
+        ('mi', 5.78e10),
+        ('hu', 5.96e10),
+        ('sc', 1.11e09),
+        ('er', 2.57e10),
+        ('on', 1.90e10),
+        ('mh', 1.17e11),
+    )
+    _coordLakeAreaCode = dict((DataLocation.intValueFromString(t[0]), t[1])
+                              for t in _coordLakeArea)
+
+    def getLakeArea(self, loc=None):
+        if not loc: return None
+        try:
+            return self._coordLakeAreaCode.get(DataLocation.codeFromEntry(loc))
+        except:
+            return None
+    
+    #--------------------------------
+    #  Specify the normalized units to use for each kind
+    #--------------------------------
+    _normalizedUnits = (
         ('prc', 'cms'),
         ('run', 'cms'),
         ('evp', 'cms'),
@@ -801,6 +1757,10 @@ class DataVault(object):
         ('con', 'cms'),
         ('icw', 'cms')
     )
+    _normalizedUnitsCode = dict((DataKind.intValueFromString(t[0]),
+                                 DataUnits.intValueFromString(t[1]))
+                                for t in _normalizedUnits)
+
     def getNormalizedUnits(self, kind=None):
         if kind:
             if isinstance(kind, str):
@@ -819,9 +1779,111 @@ class DataVault(object):
     
     
     #--------------------------------------------------------
-    def __init__(self):
+    #--------------------------------------------------------
+    #  cache_size is the number of converted withdraw() results to keep
+    #  in an LRU cache.  The default (0) turns the cache off.
+    #
+    #  threadsafe=True makes it safe for several threads to share the
+    #  vault.  Each series gets its own reader/writer lock, so any
+    #  number of withdrawals can run at once, and a deposit only holds
+    #  up users of the series it is changing.  A withdrawal always sees
+    #  a series either entirely before or entirely after a deposit.
+    #  Without it (the default) there is no locking overhead at all.
+    #
+    #  memory_budget is the most memory, in bytes, that the stored 
+    #  values may use.  When a deposit takes the vault over budget, the
+    #  least recently used series (withdrawn or deposited) are written
+    #  to a spill file (spill_path, or a temporary file by default) and 
+    #  dropped from memory.  The next withdrawal of a spilled series 
+    #  memory-maps it back in, which doesn't count against the budget.
+    #  spillStats() reports how much of this has gone on.  The default
+    #  (None) is no budget.
+    #--------------------------------------------------------
+    def __init__(self, cache_size=0, threadsafe=False, memory_budget=None,
+                 spill_path=None):
         self.vault = {}               # the dictionary object
 
+        #
+        #  Secondary indexes.  Each one maps a metadata code to the set
+        #  of vault keys that have that kind/interval/location.  They
+        #  are maintained by _store() and used by find().
+        #
+        self._byKind     = {}
+        self._byInterval = {}
+        self._byLocation = {}
+
+        #
+        #  The withdraw() cache.  _cache maps a normalized request
+        #  (vault key, units code, first, last) to the converted values,
+        #  oldest first.  _cacheKeys maps each vault key to the set of 
+        #  cache entries built from it, so a deposit can drop them.
+        #
+        self._cacheSize   = max(0, int(cache_size or 0))
+        self._cache       = OrderedDict()
+        self._cacheKeys   = {}
+        self.cacheHits    = 0
+        self.cacheMisses  = 0
+
+        #
+        #  Copy-on-write bookkeeping.  A vault can share its DataSeries
+        #  objects with forks and snapshots (see fork()).  _owned is the
+        #  set of keys whose series belong to this vault alone and may
+        #  be modified in place.  Any other series is copied before
+        #  deposit() changes it.  _overlays is the set of keys whose
+        #  series are such copies (only used by memory_report()).
+        #  _views maps a key to the (weak) set of lazy withdrawals that
+        #  share its stored values; see _detach_views().
+        #
+        self._owned    = set()
+        self._overlays = set()
+        self._views    = {}
+
+        #
+        #  Locks.  _lock guards the vault dictionary, the indexes and
+        #  _owned; it is held for writing only while series are being
+        #  added or replaced.  _keyLocks holds the per-series locks, 
+        #  made on demand by _key_lock().  _mutex guards the cache and 
+        #  _keyLocks.  A thread that needs both a series lock and _lock
+        #  always takes the series lock first.
+        #
+        self._threadsafe = bool(threadsafe)
+        if self._threadsafe:
+            self._lock  = _RWLock()
+            self._mutex = threading.Lock()
+        else:
+            self._lock  = _NoLock()
+            self._mutex = _NoLock()
+        self._keyLocks = {}
+
+        #
+        #  The shared memory block that the series are on, if this
+        #  vault came from attach().
+        #
+        self._shm = None
+
+        #
+        #  The open journal file, if any (see open_journal()).
+        #
+        self._journal     = None
+        self._journalSync = False
+
+        #
+        #  Memory budget.  _lru has every key that has been withdrawn
+        #  or deposited, least recently used first.  _sizes has the
+        #  resident bytes of each stored series, as last counted by
+        #  _count(), and _residentBytes is their total, so a deposit
+        #  can tell whether the vault is over budget without measuring
+        #  every series.
+        #
+        self._budget      = memory_budget
+        self._spillPath   = spill_path
+        self._spillFile   = None
+        self._lru         = OrderedDict()
+        self._sizes       = {}
+        self._residentBytes = 0
+        self.spillCount   = 0
+        self.reloadCount  = 0
+
     #-------------------------------------------------------------------
     #  Construct a lookup key for our dictionary from EITHER:
     #    1) The metadata in a DataSeries object, if ds is provided.
@@ -829,70 +1891,845 @@ class DataVault(object):
     #    2) The specific kind, interval, location specified.
     #  If ds is given, kind, intvl, loc will be ignored.
     #
-    #  Returns a text string that looks like this:
-    #    kind_intvl_loc
-    #  where:
-    #     kind  = the character string defined as the first entry in the
-    #             _inputStrings tuple for this data kind. e.g. For runoff data,
-    #             the _inputStrings tuple is ('run', 'runf', 'runoff').  We will
-    #             use 'run' as the kind string.  Typically, this will be a
-    #             3-character string, but it is not required. We will just use
-    #             that very first entry in the tuple. Keep in mind that this
-    #             implicitly assumes the entry is unique, which is required
-    #             anyway.
-    #     intvl = the character string defined as the first entry in the
-    #             _inputStrings tuple for this data interval. Same
-    #             story as the data kind.
-    #     loc   = the character string defined as the first entry in the
-    #             _inputStrings tuple for this location. Same story as kind/intvl.
+    #  Returns a tuple of metadata codes that looks like this:
+    #    (kind, intvl, loc)
+    #  where each entry is the row number of the matching entry in the
+    #  _inputStrings tuple for that kind of metadata (see 
+    #  BaseMeta.codeFromEntry).  kind, intvl and loc may each be given
+    #  as any valid input string or as a code.
     #
     #  For example, if the function call looks like:
     #     myVault._construct_vault_key(kind='runoff', intvl='daily', loc='ont')
     #  then the kind/intvl/loc values will turn into 'run'/'dy'/'on', and the
-    #  resulting lookup key will be 'run_dy_on'.
+    #  resulting lookup key will be (2, 1, 6).  _vault_key_name() turns that
+    #  back into the readable 'run_dy_on'.
     #
     #-------------------------------------------------------------------
     @classmethod
     def _construct_vault_key(thisclass, ds=None, kind=None, 
                              intvl=None, loc=None):
-        if ds:
-            kstr = ds.dataKind
-            istr = ds.dataInterval
-            lstr = ds.dataLocation
-            return kstr + '_' + istr + '_' + lstr
+        if ds is not None:
+            return (ds.dataKindCode, ds.dataIntervalCode, ds.dataLocationCode)
 
         #
         #  If all 3 items are specified, e.g.
         #     _construct_vault_key(kind='nbs', intvl='daily', loc='erie')
-        #  First create temporary metadata objects for each, then
-        #  get the correct lookup name for each.
+        #  resolve each one to its metadata code.
         #
         if kind and intvl and loc:
-            kobj = DataKind(kind)
-            iobj = DataInterval(intvl)
-            lobj = DataLocation(loc)
-            
-            kstr = kobj.primaryName()
-            istr = iobj.primaryName()
-            lstr = lobj.primaryName()
-            return kstr + '_' + istr + '_' + lstr
+            return (DataKind.codeFromEntry(kind),
+                    DataInterval.codeFromEntry(intvl),
+                    DataLocation.codeFromEntry(loc))
 
         raise ValueError('Missing DataSeries information in _construct_vault_key')
 
+    #-------------------------------------------------------------------
+    @classmethod
+    def _vault_key_name(thisclass, key):
+        return (DataKind.nameFromCode(key[0]) + '_'
+              + DataInterval.nameFromCode(key[1]) + '_'
+              + DataLocation.nameFromCode(key[2]))
+
+    #-------------------------------------------------------------------
+    #  Put a DataSeries into the vault dictionary under key.  Every 
+    #  insertion into self.vault should go through here so that the
+    #  secondary indexes stay current.
+    #-------------------------------------------------------------------
+    def _store(self, key, ds):
+        if key not in self.vault:
+            self._byKind.setdefault(key[0], set()).add(key)
+            self._byInterval.setdefault(key[1], set()).add(key)
+            self._byLocation.setdefault(key[2], set()).add(key)
+        self.vault[key] = ds
+        self._owned.add(key)
+        self._count(key)
+
+    #-------------------------------------------------------------------
+    #  The reader/writer lock for one series.
+    #-------------------------------------------------------------------
+    def _key_lock(self, key):
+        if not self._threadsafe:
+            return self._lock
+        with self._mutex:
+            lock = self._keyLocks.get(key)
+            if lock is None:
+                lock = self._keyLocks[key] = _RWLock()
+            return lock
+
+    #-------------------------------------------------------------------
+    #  Multi-process support.
+    #
+    #  share() copies every stored (normalized) series into a single
+    #  shared memory block and returns a SharedVaultCatalog for it.
+    #  In a worker process, DataVault.attach(catalog) builds a vault 
+    #  whose series are read-only numpy arrays on that block, so no data
+    #  is copied, no matter how many workers there are.  e.g.
+    #     catalog = vault.share()
+    #     with multiprocessing.Pool() as pool:
+    #         pool.map(run_member, [(catalog, m) for m in members])
+    #     catalog.close()
+    #     catalog.unlink()
+    #  and in run_member():
+    #     v = DataVault.attach(catalog)
+    #
+    #  withdraw(lazy=True) reads straight from the block.  A deposit in 
+    #  a worker goes into a private copy of that one series (just as it
+    #  does after fork()), so workers never see each other's deposits
+    #  and the shared data never changes.
+    #-------------------------------------------------------------------
+    def share(self):
+        with self._lock.writing():
+            items = sorted(self.vault.items())
+        total = sum(len(ds) for key, ds in items)
+        shm = shared_memory.SharedMemory(create=True, size=max(8, total*8))
+        block = np.ndarray((total,), dtype=np.float64, buffer=shm.buf)
+        entries = []
+        offset = 0
+        for key, ds in items:
+            with self._key_lock(key).reading():
+                n = len(ds)
+                block[offset:offset+n] = ds.dataArray
+                entries.append((key, ds.dataUnitsCode, 
+                                ds.startDate.toordinal(), 
+                                ds.endDate.toordinal(), offset, n))
+            offset += n
+        del block
+        return SharedVaultCatalog(shm.name, entries, shm)
+
+    @classmethod
+    def attach(thisclass, catalog, cache_size=0, threadsafe=False):
+        v = thisclass(cache_size=cache_size, threadsafe=threadsafe)
+        v._shm = _open_shared_block(catalog.name)
+        block = _shared_block_array(v._shm)
+        for key, uc, first, last, offset, n in catalog.entries:
+            vals = block[offset:offset+n].view(np.ndarray)
+            vals.flags.writeable = False
+            ds = DataSeries(kind=key[0], units=uc, intvl=key[1], loc=key[2],
+                    first=datetime.date.fromordinal(first),
+                    last=datetime.date.fromordinal(last))
+            ds.dataArray = vals
+            v._store(key, ds)
+        v._owned = set()
+        return v
+
+    #-------------------------------------------------------------------
+    #  Binary save/load, for fast warm starts.
+    #
+    #  save(path) writes the whole vault to one file:
+    #     8 bytes     the magic string b'GLDBVLT1'
+    #     8 bytes     length of the catalog, little-endian unsigned int
+    #     catalog     JSON; one entry per series with its primary kind,
+    #                 interval, location and units names, its start and
+    #                 end dates, and where its values are in the data
+    #     padding     zero bytes, up to a multiple of 8
+    #     data        all of the normalized values, little-endian float64
+    #
+    #  DataVault.load(path) reads it back.  With use_mmap=True (the 
+    #  default) the values are memory-mapped read-only, so loading costs
+    #  next to nothing and pages are only read as series are used.  A 
+    #  deposit into a mapped series copies it first (as after fork()), so
+    #  the file is never changed.  With use_mmap=False everything is read
+    #  into memory.  path may be a string or a pathlib.Path.  The vault itself is unchanged by any of this; it is
+    #  still an in-memory object.
+    #-------------------------------------------------------------------
+    _fileMagic = b'GLDBVLT1'
+
+    def save(self, path):
+        with self._lock.writing():
+            items = sorted(self.vault.items())
+        self._write_file(path, items)
+
+    #-------------------------------------------------------------------
+    #  Write items, a sorted list of (key, series), to a vault file.  
+    #  With lock=False the caller must already hold _lock for writing,
+    #  which keeps every deposit out.
+    #-------------------------------------------------------------------
+    def _write_file(self, path, items, lock=True):
+        entries = []
+        offset = 0
+        for key, ds in items:
+            entries.append({'kind': ds.dataKind, 'interval': ds.dataInterval,
+                            'location': ds.dataLocation, 'units': ds.dataUnits,
+                            'start': ds.startDate.isoformat(),
+                            'end': ds.endDate.isoformat(),
+                            'offset': offset, 'count': len(ds)})
+            offset += len(ds)
+        catalog = json.dumps({'version': 1, 'series': entries}).encode('utf-8')
+        pad = -(16 + len(catalog)) % 8
+
+        #
+        #  Write to a temporary file and rename it, so a failure can 
+        #  never leave a half-written file under the real name.
+        #
+        tmppath = os.fspath(path) + '.tmp'
+        with open(tmppath, 'wb') as f:
+            f.write(self._fileMagic)
+            f.write(struct.pack('<Q', len(catalog)))
+            f.write(catalog)
+            f.write(b'\0' * pad)
+            for key, ds in items:
+                if lock:
+                    with self._key_lock(key).reading():
+                        f.write(ds.dataArray.astype('<f8', copy=False).tobytes())
+                else:
+                    f.write(ds.dataArray.astype('<f8', copy=False).tobytes())
+        os.replace(tmppath, path)
+
+    @classmethod
+    def load(thisclass, path, use_mmap=True, cache_size=0, threadsafe=False,
+             journal=None):
+        path = os.fspath(path)
+        with open(path, 'rb') as f:
+            if f.read(8) != thisclass._fileMagic:
+                raise Exception('Not a DataVault file: ' + path)
+            n = struct.unpack('<Q', f.read(8))[0]
+            catalog = json.loads(f.read(n).decode('utf-8'))
+        if catalog.get('version') != 1:
+            raise Exception('Unsupported DataVault file version in ' + path)
+        entries = catalog['series']
+        dataoffset = 16 + n + (-(16 + n) % 8)
+        total = sum(e['count'] for e in entries)
+
+        if total == 0:
+            data = np.empty(0)
+        elif use_mmap:
+            data = np.memmap(path, dtype='<f8', mode='r', 
+                             offset=dataoffset, shape=(total,))
+        else:
+            data = np.fromfile(path, dtype='<f8', count=total, 
+                               offset=dataoffset)
+
+        v = thisclass(cache_size=cache_size, threadsafe=threadsafe)
+        for e in entries:
+            vals = data[e['offset']:e['offset']+e['count']]
+            if use_mmap:
+                vals = np.asarray(vals)
+            ds = DataSeries(kind=e['kind'], units=e['units'], 
+                    intvl=e['interval'], loc=e['location'],
+                    first=e['start'], last=e['end'])
+            ds.dataArray = vals
+            v._store(type(v)._construct_vault_key(ds), ds)
+        if use_mmap:
+            v._owned = set()
+        if journal:
+            v.open_journal(journal)
+        return v
+
+    #-------------------------------------------------------------------
+    #  The journal.
+    #
+    #  open_journal(path) starts an append-only log of every deposit.
+    #  Each record holds the series' primary kind, interval, location
+    #  and units names, its start and end dates, and the new values in
+    #  the normalized units, so it costs about as much as the deposit
+    #  itself, whatever the size of the vault.  Any records already in
+    #  the file are first replayed onto the vault (replay=False skips
+    #  that).  A normal restart is then:
+    #     v = DataVault.load('base.dbv', journal='base.jrn')
+    #  and compact('base.dbv') now and again folds the journal into 
+    #  the saved file and empties the journal.
+    #
+    #  Records are written through to the operating system at once.  
+    #  sync=True also forces each one to disk, which is much slower.
+    #  If the last record is incomplete (e.g. a crash mid-write) it is
+    #  dropped when the journal is replayed.
+    #
+    #  The file starts with the magic string b'GLDBJRN1'.  Each record
+    #  is then:
+    #     4 bytes     length of the payload, little-endian unsigned int
+    #     4 bytes     CRC32 of the payload
+    #     payload     4 name lengths (1 byte each), the 4 names (ascii),
+    #                 start and end date ordinals (4 bytes each), the
+    #                 number of values (4 bytes), the values (float64)
+    #-------------------------------------------------------------------
+    _journalMagic = b'GLDBJRN1'
+
+    def open_journal(self, path, replay=True, sync=False):
+        self.close_journal()
+        good = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            good = self._replay_journal(path, replay)
+        f = open(path, 'r+b' if good else 'wb')
+        if good:
+            f.truncate(good)
+            f.seek(good)
+        else:
+            f.write(self._journalMagic)
+            f.flush()
+        self._journal     = f
+        self._journalSync = sync
+
+    def close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    #-------------------------------------------------------------------
+    #  Save the whole vault to path (see save()) and empty the journal.
+    #-------------------------------------------------------------------
+    def compact(self, path):
+        if self._journal is None:
+            raise Exception('DataVault.compact() requires an open journal')
+        with self._lock.writing():
+            self._write_file(path, sorted(self.vault.items()), lock=False)
+            with self._mutex:
+                self._journal.seek(len(self._journalMagic))
+                self._journal.truncate()
+                self._journal.flush()
+                if self._journalSync:
+                    os.fsync(self._journal.fileno())
+
+    #-------------------------------------------------------------------
+    #  Write the journal record for tds, if the journal is open.
+    #-------------------------------------------------------------------
+    def _journal_append(self, tds):
+        if self._journal is None:
+            return
+        names = [n.encode('ascii') for n in (tds.dataKind, tds.dataInterval,
+                                             tds.dataLocation, tds.dataUnits)]
+        payload = (struct.pack('<4B', *[len(n) for n in names]) 
+                 + b''.join(names)
+                 + struct.pack('<iiI', tds.startDate.toordinal(),
+                               tds.endDate.toordinal(), len(tds))
+                 + tds.dataArray.astype('<f8', copy=False).tobytes())
+        rec = struct.pack('<II', len(payload), zlib.crc32(payload)) + payload
+        with self._mutex:
+            self._journal.write(rec)
+            self._journal.flush()
+            if self._journalSync:
+                os.fsync(self._journal.fileno())
+
+    #-------------------------------------------------------------------
+    #  Read the journal at path, depositing each record if replay is 
+    #  True.  Returns the file length up to the end of the last good 
+    #  record (0 if it isn't a journal at all).
+    #-------------------------------------------------------------------
+    def _replay_journal(self, path, replay=True):
+        with open(path, 'rb') as f:
+            buf = f.read()
+        if buf[:8] != self._journalMagic:
+            raise Exception('Not a DataVault journal: ' + path)
+        pos = 8
+        while pos + 8 <= len(buf):
+            n, crc = struct.unpack_from('<II', buf, pos)
+            payload = buf[pos+8:pos+8+n]
+            if len(payload) < n or zlib.crc32(payload) != crc:
+                print('Warning: incomplete record at the end of journal '
+                      + path + ' was dropped.')
+                break
+            if replay:
+                lens = struct.unpack_from('<4B', payload, 0)
+                names = []
+                i = 4
+                for m in lens:
+                    names.append(payload[i:i+m].decode('ascii'))
+                    i += m
+                first, last, count = struct.unpack_from('<iiI', payload, i)
+                i += 12
+                tds = DataSeries(kind=names[0], intvl=names[1], 
+                        loc=names[2], units=names[3],
+                        first=datetime.date.fromordinal(first),
+                        last=datetime.date.fromordinal(last))
+                tds.dataArray = np.frombuffer(payload, dtype='<f8', 
+                                              count=count, offset=i).copy()
+                self._deposit_normalized(
+                        type(self)._construct_vault_key(tds), tds)
+            pos += 8 + n
+        return pos
+
+    #-------------------------------------------------------------------
+    #  Memory budget support (see __init__).
+    #
+    #  _resident(key) is how the vault gets at a stored series that it
+    #  is about to use.  It marks the key as recently used and, if the
+    #  series was spilled, replaces it with a memory-mapped copy.  The
+    #  swap is made holding _lock for writing, so pass locked=True if 
+    #  the caller already holds _lock.
+    #-------------------------------------------------------------------
+    def _resident(self, key, locked=False):
+        ds = self.vault[key]
+        if self._budget is None:
+            return ds
+        with self._mutex:
+            self._lru.pop(key, None)
+            self._lru[key] = True
+        if ds._values is None:
+            if locked:
+                ds = self._reload(key)
+            else:
+                with self._lock.writing():
+                    ds = self._reload(key)
+        return ds
+
+    #
+    #  Replace the spilled series for key with a memory-mapped one.  The
+    #  caller holds _lock for writing.  Another thread may have already
+    #  reloaded it while this one waited for the lock.
+    #
+    def _reload(self, key):
+        ds = self.vault[key]
+        if ds._values is not None:
+            return ds
+        f, offset, n, view = ds._spill
+        rds = DataSeries(kind=ds.dataKindCode, units=ds.dataUnitsCode,
+                         intvl=ds.dataIntervalCode, 
+                         loc=ds.dataLocationCode,
+                         first=ds.startDate, last=ds.endDate)
+        rds._values = f.map(offset, n)
+        rds._spill = (f, offset, n, rds._values)
+        rds._gaps = ds._gaps
+        self.vault[key] = rds
+        self._count(key)
+        with self._mutex:
+            self.reloadCount += 1
+        return rds
+
+    #-------------------------------------------------------------------
+    #  Bytes of this process's memory that a stored series is using.
+    #-------------------------------------------------------------------
+    @staticmethod
+    def _series_bytes(ds):
+        if ds._values is None or not _in_memory(ds._values):
+            return 0
+        if ds._buffer is not None and ds._buffer.view is ds._values:
+            return ds._buffer.capacity * 8
+        return ds._values.nbytes
+
+    #-------------------------------------------------------------------
+    #  Bring the running total of resident bytes up to date for key,
+    #  after its stored series has been replaced or changed in place.
+    #-------------------------------------------------------------------
+    def _count(self, key):
+        n = self._series_bytes(self.vault[key])
+        with self._mutex:
+            self._residentBytes += n - self._sizes.get(key, 0)
+            self._sizes[key] = n
+
+    #-------------------------------------------------------------------
+    #  Replace the series for key with one whose values are in the 
+    #  spill file.  The stored object itself is never changed, since it
+    #  may be shared with a fork, or in use by another thread.
+    #-------------------------------------------------------------------
+    def _spill_series(self, key, ds):
+        if ds._spill is not None and ds._spill[3] is ds._values:
+            f, offset, n, view = ds._spill
+        else:
+            if self._spillFile is None:
+                self._spillFile = _SpillFile(self._spillPath)
+            f = self._spillFile
+            offset = f.write(ds._values)
+            n = len(ds._values)
+        sds = DataSeries(kind=ds.dataKindCode, units=ds.dataUnitsCode,
+                         intvl=ds.dataIntervalCode, loc=ds.dataLocationCode,
+                         first=ds.startDate, last=ds.endDate)
+        sds._values = None
+        sds._spill = (f, offset, n, None)
+        sds._gaps = ds._gaps
+        self.vault[key] = sds
+        self._count(key)
+        self.spillCount += 1
+
+    #-------------------------------------------------------------------
+    #  Spill series, least recently used first, until the vault is
+    #  within its memory budget.  Keys that have never been used are 
+    #  the coldest of all.  Within budget, this only looks at the 
+    #  running total; every series is measured again only when the 
+    #  vault is over budget.
+    #-------------------------------------------------------------------
+    def _enforce_budget(self):
+        if self._budget is None or self._residentBytes <= self._budget:
+            return
+        with self._lock.writing():
+            self._recount()
+            if self._residentBytes <= self._budget:
+                return
+            with self._mutex:
+                order = ([k for k in self.vault if k not in self._lru]
+                         + [k for k in self._lru if k in self.vault])
+            for key in order:
+                if self._residentBytes <= self._budget:
+                    break
+                if self._sizes[key] > 0:
+                    self._spill_series(key, self.vault[key])
+
+    #-------------------------------------------------------------------
+    #  Measure every stored series again and reset the running total.
+    #  The caller holds _lock for writing.
+    #-------------------------------------------------------------------
+    def _recount(self):
+        sizes = dict((key, self._series_bytes(ds)) 
+                     for key, ds in self.vault.items())
+        with self._mutex:
+            self._sizes = sizes
+            self._residentBytes = sum(sizes.values())
+
+    #-------------------------------------------------------------------
+    #  Report on the memory budget.
+    #-------------------------------------------------------------------
+    def spillStats(self):
+        with self._lock.reading():
+            spilled = sum(1 for ds in self.vault.values() if ds._values is None)
+            return {'spills': self.spillCount, 'reloads': self.reloadCount,
+                    'resident_bytes': self._residentBytes, 
+                    'budget': self._budget,
+                    'spilled_series': spilled}
+
+    #-------------------------------------------------------------------
+    #  How much memory each stored series costs, in bytes.
+    #
+    #  Returns a dictionary:
+    #     'series'       one entry per vault key name (e.g. 'run_dy_on')
+    #     'by_kind'      the same breakdown, totalled by kind
+    #     'by_location'  ...by location
+    #     'by_interval'  ...by interval
+    #     'total'        ...for the whole vault
+    #  and each entry breaks the bytes down into:
+    #     'values'    values that belong to this vault alone, including
+    #                 any spare room kept for growth
+    #     'overlay'   private copies of series that were shared with a 
+    #                 fork or a snapshot, made when they were deposited
+    #                 into
+    #     'shared'    values shared with a fork or snapshot (so they are
+    #                 counted again in the report for each of those)
+    #     'mapped'    values memory-mapped from a file (load() or the
+    #                 spill file) or in a shared memory block, which the
+    #                 operating system pages in and out as needed
+    #     'metadata'  the DataSeries object, its attributes, its key and
+    #                 index entries
+    #     'cache'     withdraw() results cached for this series
+    #     'total'     everything except 'mapped', i.e. this process's
+    #                 memory
+    #-------------------------------------------------------------------
+    def memory_report(self):
+        fields = ('values', 'overlay', 'shared', 'mapped', 'metadata', 
+                  'cache', 'total')
+        report = {'series': {}, 'by_kind': {}, 'by_location': {}, 
+                  'by_interval': {}, 'total': dict.fromkeys(fields, 0)}
+
+        with self._mutex:
+            cached = {}
+            for key, ckeys in self._cacheKeys.items():
+                cached[key] = sum(self._cache[c].nbytes + sys.getsizeof(c) 
+                                  for c in ckeys)
+
+        with self._lock.reading():
+            for key, ds in sorted(self.vault.items()):
+                r = dict.fromkeys(fields, 0)
+                vals = ds._values
+                if vals is None:
+                    r['mapped'] = 8 * len(ds)
+                elif not _in_memory(vals):
+                    r['mapped'] = vals.nbytes
+                elif key in self._overlays and key in self._owned:
+                    r['overlay'] = self._series_bytes(ds)
+                elif key in self._owned:
+                    r['values'] = self._series_bytes(ds)
+                else:
+                    r['shared'] = self._series_bytes(ds)
+
+                meta = (sys.getsizeof(ds) + sys.getsizeof(ds.__dict__)
+                        + sys.getsizeof(ds.startDate) 
+                        + sys.getsizeof(ds.endDate)
+                        + sys.getsizeof(key) + 3*8)
+                for a in (vals, ds._buffer and ds._buffer._buf):
+                    if a is not None:
+                        meta += sys.getsizeof(a) - (a.nbytes if a.flags.owndata 
+                                                     else 0)
+                if ds._buffer is not None:
+                    meta += sys.getsizeof(ds._buffer) 
+                r['metadata'] = meta
+                r['cache'] = cached.get(key, 0)
+                r['total'] = (r['values'] + r['overlay'] + r['shared'] 
+                            + r['metadata'] + r['cache'])
+
+                report['series'][self._vault_key_name(key)] = r
+                for group, name in (('by_kind', ds.dataKind),
+                                    ('by_location', ds.dataLocation),
+                                    ('by_interval', ds.dataInterval)):
+                    g = report[group].setdefault(name, dict.fromkeys(fields, 0))
+                    for f in fields:
+                        g[f] += r[f]
+                for f in fields:
+                    report['total'][f] += r[f]
+        return report
+
+    #-------------------------------------------------------------------
+    def printMemoryReport(self):
+        rep = self.memory_report()
+        fields = ('values', 'overlay', 'shared', 'mapped', 'metadata', 
+                  'cache', 'total')
+        print('%-14s' % 'series' + ''.join('%12s' % f for f in fields))
+        for group in ('series', 'by_kind', 'by_location', 'by_interval'):
+            for name in sorted(rep[group]):
+                r = rep[group][name]
+                print('%-14s' % name + ''.join('%12d' % r[f] for f in fields))
+            print()
+        r = rep['total']
+        print('%-14s' % 'total' + ''.join('%12d' % r[f] for f in fields))
+
+    #-------------------------------------------------------------------
+    #  Rebuild the secondary indexes and the count of resident bytes 
+    #  from scratch, e.g. after the whole vault dictionary has been 
+    #  replaced.
+    #-------------------------------------------------------------------
+    def _reindex(self):
+        self._byKind     = {}
+        self._byInterval = {}
+        self._byLocation = {}
+        for key in self.vault:
+            self._byKind.setdefault(key[0], set()).add(key)
+            self._byInterval.setdefault(key[1], set()).add(key)
+            self._byLocation.setdefault(key[2], set()).add(key)
+        self._recount()
+
+    #-------------------------------------------------------------------
+    #  Scenario support.
+    #
+    #  fork() returns a new vault that shares every stored series with
+    #  this one.  Nothing is copied up front; a series is copied the
+    #  first time either vault deposits into it, so the two vaults
+    #  never see each other's changes.  e.g.
+    #     base = DataVault()
+    #     ...deposit the historical inputs...
+    #     for s in scenarios:
+    #         v = base.fork()
+    #         v.deposit(s.outputs)
+    #
+    #  snapshot() records the current contents, just as cheaply, and
+    #  rollback(snap) puts the vault back the way it was when snap was
+    #  taken.  A snapshot can be rolled back to any number of times.
+    #-------------------------------------------------------------------
+    def fork(self):
+        child = type(self)(cache_size=self._cacheSize, 
+                           threadsafe=self._threadsafe,
+                           memory_budget=self._budget)
+        with self._lock.writing():
+            child.vault = dict(self.vault)
+            child._spillFile = self._spillFile
+            child._shm = self._shm
+            self._owned = set()
+        child._reindex()
+        return child
+
+    def snapshot(self):
+        with self._lock.writing():
+            self._owned = set()
+            return VaultSnapshot(self.vault)
+
+    def rollback(self, snap):
+        if not isinstance(snap, VaultSnapshot):
+            raise Exception('DataVault.rollback() requires a VaultSnapshot')
+        with self._lock.writing():
+            self.vault = dict(snap.vault)
+            self._owned = set()
+            self._overlays = set()
+            self._reindex()
+            self.clearCache()
+
+    #-------------------------------------------------------------------
+    #  Turn one find() argument into a set of vault keys from the given
+    #  index, or None if the argument is a wildcard (None or '*').
+    #  The argument can be a single string/code or a list of them.
+    #-------------------------------------------------------------------
+    @staticmethod
+    def _find_matches(index, metaclass, spec):
+        if spec is None or spec == '*':
+            return None
+        if isinstance(spec, (str, int)):
+            spec = [spec]
+        keys = set()
+        for item in spec:
+            code = metaclass.codeFromEntry(item)
+            if code == 0:
+                raise ValueError('Undefined ' + metaclass.__name__)
+            keys |= index.get(code, set())
+        return keys
+
+    #-------------------------------------------------------------------
+    #  Find the series in the vault that match a query, using the
+    #  secondary indexes instead of scanning the whole vault.
+    #  kind, intvl and loc may each be:
+    #    None or '*'          matches anything
+    #    a string or code     matches that one value
+    #    a list of those      matches any of them
+    #  e.g.  find(kind='nbs', loc=['sup', 'mhu'])
+    #        find(intvl='daily')
+    #
+    #  Returns a list of vault keys, sorted, or (series=True) a list of
+    #  the stored DataSeries objects for those keys.  Those are the
+    #  vault's own objects, so please treat them as read-only.
+    #-------------------------------------------------------------------
+    def find(self, kind=None, intvl=None, loc=None, series=False):
+        with self._lock.reading():
+            return self._find(kind, intvl, loc, series)
+
+    def _find(self, kind, intvl, loc, series):
+        sets = []
+        for index, metaclass, spec in ((self._byKind, DataKind, kind),
+                                       (self._byInterval, DataInterval, intvl),
+                                       (self._byLocation, DataLocation, loc)):
+            try:
+                m = self._find_matches(index, metaclass, spec)
+            except ValueError:
+                raise Exception('Invalid ' + metaclass.__name__
+                              + ' specification to DataVault.find()')
+            if m is not None:
+                sets.append(m)
+
+        if sets:
+            sets.sort(key=len)
+            keys = set(sets[0])
+            for m in sets[1:]:
+                keys &= m
+        else:
+            keys = set(self.vault)
+
+        keys = sorted(keys)
+        if series:
+            return [self.vault[k] for k in keys]
+        return keys
+
+    #-------------------------------------------------------------------
+    #  Period-of-record queries.  These use each series' gap index (see
+    #  DataSeries.gapIndex) and never look at the values themselves,
+    #  except to build an index the first time it is needed.
+    #
+    #  A key is a vault key, as returned by find(), or a (kind, intvl,
+    #  loc) tuple of strings or codes, e.g. ('nbs', 'mon', 'sup').
+    #-------------------------------------------------------------------
+    def _resolve_key(self, key):
+        try:
+            key = self._construct_vault_key(kind=key[0], intvl=key[1],
+                                            loc=key[2])
+        except:
+            raise Exception('Invalid key specification: ' + str(key))
+        if key not in self.vault:
+            raise Exception('Unable to find ' + self._vault_key_name(key)
+                          + ' in the vault')
+        return key
+
+    #-------------------------------------------------------------------
+    #  The period when all of the given series have data, as a tuple
+    #  (first, last) of the first day of the first period and the last
+    #  day of the last period, or None if there is no such period.
+    #  Missing values at either end of a series are not counted as part
+    #  of its period of record; with trim=False the series start and end
+    #  dates are used as they are.  The periods of series with different
+    #  intervals need not line up, so the result may split a period.
+    #-------------------------------------------------------------------
+    def common_period(self, keys, trim=True):
+        first = None
+        last  = None
+        for key in keys:
+            key = self._resolve_key(key)
+            with self._key_lock(key).reading():
+                ds = self.vault[key]
+                sd, ed = ds.startDate, ds.endDate
+                if trim:
+                    gaps = ds.gapIndex()
+                    i = gaps.first_present()
+                    if i is None:
+                        return None
+                    j = gaps.last_present()
+                    intvl = ds.dataInterval
+                    sd = util.period_start(ds.startDate, i, intvl)
+                    ed = util.period_end(ds.startDate, j, intvl)
+            if first is None or sd > first:
+                first = sd
+            if last is None or ed < last:
+                last = ed
+        if first is None or first > last:
+            return None
+        return (first, last)
+
+    #-------------------------------------------------------------------
+    #  How much of the period first..last (which default to the start
+    #  and end of the series) has data in the series for key.  The
+    #  period is widened to whole periods of the series' interval, and
+    #  any part of it outside the series counts as missing.
+    #  Returns a dictionary:
+    #     'first', 'last'   the (widened) period
+    #     'periods'         the number of periods in it
+    #     'present'         ...that have a value
+    #     'missing'         ...that don't
+    #     'fraction'        present / periods
+    #-------------------------------------------------------------------
+    def coverage(self, key, first=None, last=None):
+        key = self._resolve_key(key)
+        with self._key_lock(key).reading():
+            ds = self.vault[key]
+            intvl = ds.dataInterval
+            sd = util.date_from_entry(first) if first else ds.startDate
+            ed = util.date_from_entry(last) if last else ds.endDate
+            if ed < sd:
+                raise Exception('Invalid period specified to '
+                              + 'DataVault.coverage()')
+            i = util.period_offset(ds.startDate, sd, intvl)
+            j = util.period_offset(ds.startDate, ed, intvl) + 1
+            missing = ds.gapIndex().missing(i, j)
+            return {'first':    util.period_start(sd, 0, intvl),
+                    'last':     util.period_end(ed, 0, intvl),
+                    'periods':  j - i,
+                    'present':  j - i - missing,
+                    'missing':  missing,
+                    'fraction': (j - i - missing) / (j - i)}
+
+    #-------------------------------------------------------------------
+    #  withdraw() cache maintenance
+    #-------------------------------------------------------------------
+    def _cache_get(self, ckey):
+        with self._mutex:
+            vals = self._cache.get(ckey)
+            if vals is None:
+                self.cacheMisses += 1
+                return None
+            self._cache.move_to_end(ckey)
+            self.cacheHits += 1
+            return vals
+
+    def _cache_put(self, ckey, vals):
+        with self._mutex:
+            self._cache[ckey] = vals
+            self._cacheKeys.setdefault(ckey[0], set()).add(ckey)
+            while len(self._cache) > self._cacheSize:
+                old, _ = self._cache.popitem(last=False)
+                self._cacheKeys[old[0]].discard(old)
+
+    def _invalidate(self, key):
+        with self._mutex:
+            for ckey in self._cacheKeys.pop(key, ()):
+                self._cache.pop(ckey, None)
+
+    #-------------------------------------------------------------------
+    #  Report on the withdraw() cache.
+    #-------------------------------------------------------------------
+    def cacheStats(self):
+        with self._mutex:
+            return {'hits': self.cacheHits, 'misses': self.cacheMisses,
+                    'entries': len(self._cache), 'capacity': self._cacheSize}
+
+    def clearCache(self):
+        with self._mutex:
+            self._cache.clear()
+            self._cacheKeys.clear()
+
     #-------------------------------------------------------------------
     def printVault(self):
         for key in self.vault:
-            print('key=', key, ':', self.vault[key].getOneLineSummary())
+            print('key=', self._vault_key_name(key), ':', 
+                  self.vault[key].getOneLineSummary())
 
     #-------------------------------------------------------------------
     #  The deposit() function is how a user adds data to the vault.
     #  ds is a DataSeries object.
     #-------------------------------------------------------------------
     def deposit(self, ds, lake_area=None):
+        t0 = stats.clock()
         try:
             key = type(self)._construct_vault_key(ds)
         except:
             raise Exception('databank.deposit: error getting the key')
+        _check_length(ds, ds.dataInterval, 'DataVault.deposit')
 
         #
         #  If user did not specify a lake area, then assign a value (if needed)
@@ -905,42 +2742,47 @@ class DataVault(object):
         #  units and values conform to the prescribed data units
         #  for storage in the vault.
         #
-        tempvals = copy(ds.dataVals)      # default is to use data as-is
-        normstr = self.getNormalizedUnits(kind=ds.dataKind)
+        tempvals = ds.dataArray           # default is to use data as-is
+        normstr = DataUnits.nameFromCode(
+                      self._normalizedUnitsCode.get(ds.dataKindCode, 0))
         try:
             #
-            #  If needed, convert data units.
+            #  If needed, convert data units.  convertValues() always
+            #  hands back a new array, so the caller's data is untouched.
             #
             if ds.dataUnits != normstr:
                 try:
                     tempvals = None
-                    if ds.dataUnits != normstr:
-                        oldstr = ds.dataUnits
-                        oldvals = copy(ds.dataVals)
+                    oldstr = ds.dataUnits
+                    oldvals = ds.dataArray
                         
-                        if (oldstr in util.linear_units) and normstr=='m': 
-                            tempvals = util.convertValues(values=oldvals, 
-                                    oldunits=oldstr, newunits=normstr)
-                        elif (oldstr in util.rate_units) and normstr=='cms': 
-                            tempvals = util.convertValues(values=oldvals, 
-                                    oldunits=oldstr, newunits=normstr)
-                        elif (oldstr in util.areal_units):
-                            raise Exception('Error: datavault unable to store '
-                                          + 'areal datasets.')
-                        elif normstr=='m':
-                            tempvals = util.convertValues(values=oldvals, 
-                                    oldunits=oldstr, newunits=normstr,
-                                    area=lake_area, first=ds.startDate, 
-                                    last=ds.endDate)
-                        elif normstr=='cms':
-                            tempvals = util.convertValues(values=oldvals, 
-                                    oldunits=oldstr, newunits=normstr,
-                                    area=lake_area, first=ds.startDate, 
-                                    last=ds.endDate)
-                        else:
-                            print('ds.dataUnits=', ds.dataUnits)
-                            print('normstr=', normstr)
-                            raise Exception('Unhandled data units conversion.')
+                    if (oldstr in util.linear_units) and normstr=='m': 
+                        tempvals = util.convertValues(values=oldvals, 
+                                oldunits=oldstr, newunits=normstr)
+                    elif (oldstr in util.rate_units) and normstr=='cms': 
+                        tempvals = util.convertValues(values=oldvals, 
+                                oldunits=oldstr, newunits=normstr)
+                    elif (oldstr in util.areal_units):
+                        raise Exception('Error: datavault unable to store '
+                                      + 'areal datasets.')
+                    elif normstr=='m':
+                        tempvals = util.convertValues(values=oldvals, 
+                                oldunits=oldstr, newunits=normstr,
+                                intvl=ds.dataInterval,
+                                area=lake_area, first=ds.startDate, 
+                                last=ds.endDate)
+                    elif normstr=='cms':
+                        tempvals = util.convertValues(values=oldvals, 
+                                oldunits=oldstr, newunits=normstr,
+                                intvl=ds.dataInterval,
+                                area=lake_area, first=ds.startDate, 
+                                last=ds.endDate)
+                    else:
+                        print('ds.dataUnits=', ds.dataUnits)
+                        print('normstr=', normstr)
+                        raise Exception('Unhandled data units conversion.')
+                    if tempvals is None:
+                        raise Exception('Unhandled data units conversion.')
                 except:
                     raise Exception('Unable to do required data conversion.')
         except:
@@ -948,54 +2790,322 @@ class DataVault(object):
 
         #
         #  Create a temporary dataset that contains the data to be added, 
-        #  in the correct units.
+        #  in the correct units.  If no conversion was done, tempvals is 
+        #  still the caller's array, so store a copy of it.
         #
         tds = DataSeries(kind=ds.dataKind, units=normstr, loc=ds.dataLocation,
                     intvl=ds.dataInterval, first=ds.startDate, 
-                    last=ds.endDate, values=tempvals)
-            
+                    last=ds.endDate)
+        if tempvals is ds.dataArray:
+            tds.dataVals = tempvals
+        else:
+            tds.dataArray = tempvals
+
+        if t0 is None:
+            self._deposit_normalized(key, tds)
+            return
+        name = self._vault_key_name(key)
+        stats.record('vault.normalize', t0, key=name, 
+                     nbytes=tds.dataArray.nbytes, nvalues=len(tds))
+        t1 = stats.clock()
+        self._deposit_normalized(key, tds)
+        stats.record('vault.merge', t1, key=name, 
+                     nbytes=tds.dataArray.nbytes, nvalues=len(tds))
+        stats.record('vault.deposit', t0, key=name, 
+                     nbytes=tds.dataArray.nbytes, nvalues=len(tds))
+
+    #-------------------------------------------------------------------
+    #  Add a DataSeries that is already in the normalized units to the
+    #  vault.  This is the second half of deposit(), and is also used
+    #  to replay a journal.
+    #-------------------------------------------------------------------
+    def _deposit_normalized(self, key, tds):
         #
-        #  Do we already have a data series like this?
-        #  If so, we will merge them.
+        #  Hold the series lock for the rest of this, so that no one 
+        #  sees the series half-merged.  Merging into a series that 
+        #  this vault owns only needs _lock for reading, so deposits to
+        #  different series proceed together.  Adding a series, or 
+        #  replacing a shared one with a private copy, needs it for
+        #  writing.
         #
-        try:
+        with self._key_lock(key).writing():
             #
-            #  Get the old data set.  Note that this line will fail
-            #  with an exception if there is no matching old dataset.
-            #  That will cause us to drop into the except block and skip the
-            #  rest of the try block.  Seems a little ugly to me, but I
-            #  guess that is the "python way" to do it?  I don't see any
-            #  search functionality that works "cleanly".
+            #  Any cached withdrawals of this series are about to go stale.
             #
-            old = self.vault[key]
+            self._invalidate(key)
 
             #
-            #  Getting to here means we have an old dataset. Proceed with
-            #  checking and merging.
-            #
-            #  Verify that the data sets have matching metadata.
-            #  This should actually never be an issue, but verifying is good.
+            #  The journal record is written while _lock is held, so 
+            #  that compact() (which takes _lock for writing) can never
+            #  separate a record from its change to the vault.  It is
+            #  only written once the change has been made, so a merge 
+            #  that fails leaves nothing in the journal to replay.
             #
-            if old.dataKind != new.dataKind:
-                raise ValueError('Data kind mismatch')
-            if old.dataInterval != new.dataInterval:
-                raise ValueError('Data interval mismatch')
-            if old.dataLocation != new.dataLocation:
-                raise ValueError('Data location mismatch')
+            merged = False
+            with self._lock.reading():
+                old = self.vault.get(key)
+                if (old is not None and key in self._owned 
+                      and old._values is not None):
+                    self._merge(key, old, tds)
+                    self._journal_append(tds)
+                    self._resident(key, locked=True)
+                    merged = True
+
+            if not merged:
+                with self._lock.writing():
+                    #
+                    #  Do we already have a data series like this?
+                    #  If not, just add this new one to the vault.
+                    #
+                    if key not in self.vault:
+                        self._store(key, tds)
+                    else:
+                        self._merge_into(key, tds)
+                    self._journal_append(tds)
+                    self._resident(key, locked=True)
+        self._enforce_budget()
 
-            #
-            #  Merge the two DataSeries objects
-            #
+    #-------------------------------------------------------------------
+    #  Slow path of _deposit_normalized: merge tds into the existing 
+    #  series for key, which may be spilled or shared.  The caller holds
+    #  _lock for writing.
+    #-------------------------------------------------------------------
+    def _merge_into(self, key, tds):
+        old = self._resident(key, locked=True)
+
+        #
+        #  If the stored series is shared with a fork or a snapshot,
+        #  merge into a private copy of it instead.  Values mapped from
+        #  a file or a shared memory block are copied too, but the copy
+        #  only counts as an overlay if it duplicates memory that a 
+        #  fork or snapshot also holds.
+        #
+        if key not in self._owned:
+            if _in_memory(old._values):
+                self._overlays.add(key)
+            old = old.copy()
+            self._store(key, old)
+        self._merge(key, old, tds)
+
+    #-------------------------------------------------------------------
+    #  Merge the normalized series tds into old, the stored series for
+    #  key.  The caller holds the locks.
+    #-------------------------------------------------------------------
+    def _merge(self, key, old, tds):
+        #
+        #  Verify that the data sets have matching metadata.
+        #  This should actually never be an issue, but verifying is good.
+        #
+        if old.dataKindCode != tds.dataKindCode:
+            raise ValueError('Data kind mismatch')
+        if old.dataIntervalCode != tds.dataIntervalCode:
+            raise ValueError('Data interval mismatch')
+        if old.dataLocationCode != tds.dataLocationCode:
+            raise ValueError('Data location mismatch')
+
+        #
+        #  Merge the two DataSeries objects.  A merge that fails leaves
+        #  the old data unchanged; the deposit fails with it, rather than
+        #  losing the new data.
+        #
+        self._detach_views(key, old, tds.startDate, tds.endDate)
+        try:
+            ok = old.add_data(tds)
+        except:
+            raise Exception('Error merging the new data into the old.')
+        if not ok:
+            raise Exception('Unable to merge the new data into the old; '
+                          + 'its dates do not match its interval: ' 
+                          + str(tds.startDate) + ' to ' + str(tds.endDate))
+        self._count(key)
+
+    #-------------------------------------------------------------------
+    #  The stored series old for key is about to have the days from 
+    #  first to last overwritten in place.  Every lazy withdrawal that
+    #  reads any of those days from its values gets a copy of its own
+    #  window first.  Views of other days keep sharing the values, and
+    #  appending to the series never copies it.
+    #-------------------------------------------------------------------
+    def _detach_views(self, key, old, first, last):
+        with self._mutex:
+            views = self._views.get(key)
+            if views is None:
+                return
+            if not views:
+                del self._views[key]
+                return
+            views = list(views)
+        vals = old._values
+        for view in views:
+            if view.endDate < first or view.startDate > last:
+                continue
+            if vals is not None and np.may_share_memory(view._base, vals):
+                view._detach()
+
+    #-------------------------------------------------------------------
+    #  Deposit a whole collection of DataSeries objects at once.
+    #  The result is the same as calling deposit() for each one, in
+    #  order, but it is much faster for a large number of series:
+    #    - The series are grouped by units, interval and lake area, and
+    #      each group is converted to the normalized units with a 
+    #      single multiply over all of its values.
+    #    - Everything deposited for one key is merged into the stored
+    #      series with a single allocation.
+    #  Unlike deposit(), there is no lake_area override; the
+    #  coordinated lake areas are always used.
+    #  precedence decides which values win where series overlap; see
+    #  DataSeries.assemble().  Anything already in the vault counts as
+    #  the first series for its key.
+    #-------------------------------------------------------------------
+    def deposit_many(self, series, precedence='last'):
+        if precedence not in ('last', 'first', 'nonmissing'):
+            raise Exception('Invalid precedence specified to '
+                          + 'DataVault.deposit_many()')
+        t0 = stats.clock()
+        items  = []
+        groups = OrderedDict()
+        for ds in series:
             try:
-                old.add_data(tds)
+                key = type(self)._construct_vault_key(ds)
             except:
-                raise('Error merging the new data into the old.')
+                raise Exception('databank.deposit_many: error getting the key')
+            _check_length(ds, ds.dataInterval, 'DataVault.deposit_many')
+            gkey = (ds.dataUnitsCode, 
+                    self._normalizedUnitsCode.get(ds.dataKindCode, 0),
+                    ds.dataIntervalCode, 
+                    self._coordLakeAreaCode.get(ds.dataLocationCode))
+            groups.setdefault(gkey, []).append(len(items))
+            items.append((key, ds))
 
-        except:
-            #
-            #  No old dataset, so just add this new one to the vault.
-            #
-            self.vault.update({key:tds})
+        #
+        #  Normalize each group.  Concatenating the group's values makes
+        #  the one copy of the caller's data that we need anyway, and 
+        #  then every series in the group is a slice of that.  A slice
+        #  is only ever stored through _own_values(), so that one stored
+        #  series can't keep the whole group's values alive.
+        #
+        normal = [None] * len(items)
+        for (uc, nc, ic, area), idx in groups.items():
+            oldstr = DataUnits.nameFromCode(uc)
+            normstr = DataUnits.nameFromCode(nc)
+            intvl = DataInterval.nameFromCode(ic)
+            group = [items[i][1] for i in idx]
+            sizes = [len(ds) for ds in group]
+            vals = np.concatenate([ds.dataArray for ds in group])
+            if uc != nc and len(vals) > 0:
+                if oldstr in util.areal_units:
+                    raise Exception('Error: datavault unable to store '
+                                  + 'areal datasets.')
+                try:
+                    if util.period_dependent(oldstr, normstr, intvl):
+                        f = np.concatenate([util.conversionFactors(
+                                oldunits=oldstr, newunits=normstr, 
+                                area=area, intvl=intvl, first=ds.startDate,
+                                last=ds.endDate, n=len(ds)) 
+                                for ds in group if len(ds) > 0])
+                    else:
+                        f = util.conversionFactors(oldunits=oldstr, 
+                                newunits=normstr, area=area, intvl=intvl,
+                                first=group[0].startDate,
+                                last=group[0].startDate, n=1)
+                    vals *= f
+                except:
+                    raise Exception('Unable to create dataset for the datavault.')
+
+            offset = 0
+            for i, ds, n in zip(idx, group, sizes):
+                tds = DataSeries(kind=ds.dataKindCode, units=nc, 
+                        intvl=ic, loc=ds.dataLocationCode,
+                        first=ds.startDate, last=ds.endDate)
+                tds.dataArray = vals[offset:offset+n]
+                normal[i] = tds
+                offset += n
+
+        #
+        #  Gather the normalized series by key, keeping the caller's 
+        #  order, and merge each key's series into the vault in one go.
+        #
+        bykey = OrderedDict()
+        for (key, ds), tds in zip(items, normal):
+            bykey.setdefault(key, []).append(tds)
+
+        for key, new in bykey.items():
+            with self._key_lock(key).writing():
+                self._invalidate(key)
+                with self._lock.writing():
+                    old = self.vault.get(key)
+                    if old is None:
+                        if len(new) > 1:
+                            self._store(key, DataSeries.assemble(new, precedence))
+                        else:
+                            self._store(key, _own_values(new[0]))
+                    else:
+                        if key in self._owned and old._values is not None:
+                            base = old
+                            self._detach_views(key, old,
+                                    min(ds.startDate for ds in new),
+                                    max(ds.endDate for ds in new))
+                        else:
+                            #
+                            #  The stored series is shared (or spilled), so
+                            #  merge into a new object.  Giving it a read-only view of
+                            #  the shared values makes add_data_many() copy
+                            #  them (just once) before writing anything.
+                            #
+                            base = DataSeries(kind=old.dataKindCode, 
+                                    units=old.dataUnitsCode,
+                                    intvl=old.dataIntervalCode, 
+                                    loc=old.dataLocationCode,
+                                    first=old.startDate, last=old.endDate)
+                            vals = old.dataArray.view()
+                            vals.flags.writeable = False
+                            base.dataArray = vals
+                            if (key not in self._owned and 
+                                  old._values is not None and 
+                                  _in_memory(old._values)):
+                                self._overlays.add(key)
+
+                        try:
+                            ok = base.add_data_many(new, precedence)
+                        except:
+                            raise Exception('Error merging the new data into the old.')
+                        if not ok:
+                            raise Exception('Unable to merge the new data '
+                                          + 'into the old; its start date '
+                                          + 'does not begin a period.')
+                        self._store(key, base)
+
+                    #
+                    #  Journal the merged result over the span of the new
+                    #  data, rather than the new series themselves, so 
+                    #  that a replay (which always lets later data win)
+                    #  gets the same answer whatever the precedence.
+                    #
+                    if self._journal is not None:
+                        self._journal_append(self._span_of(key, new))
+                    self._resident(key, locked=True)
+        self._enforce_budget()
+
+        if t0 is not None:
+            n = sum(len(tds) for tds in normal)
+            stats.record('vault.deposit_many', t0, nbytes=8*n, nvalues=n)
+
+    #-------------------------------------------------------------------
+    #  A DataSeries holding the stored values for key over the combined
+    #  period of the series in new.
+    #-------------------------------------------------------------------
+    def _span_of(self, key, new):
+        ds = self.vault[key]
+        intvl = ds.dataInterval
+        first = min(n.startDate for n in new)
+        last  = max(n.endDate for n in new)
+        i = util.period_offset(ds.startDate, first, intvl)
+        j = i + util.num_periods(first, last, intvl)
+        rec = DataSeries(kind=ds.dataKindCode, units=ds.dataUnitsCode,
+                         intvl=ds.dataIntervalCode, loc=ds.dataLocationCode,
+                         first=first, last=last)
+        rec.dataArray = ds.dataArray[i:j]
+        return rec
 
     #---------------------------------------------------------------
     #  Equivalent to deposit, but with all fields individually specified.
@@ -1003,11 +3113,7 @@ class DataVault(object):
     def deposit_data(self, kind=None, units=None, intvl=None, loc=None, 
                      first=None, last=None, values=None):
         try:
-            dk = DataKind(kind).primaryName()
-            du = DataUnits(units).primaryName()
-            di = DataInterval(intvl).primaryName()
-            dl = DataLocation(loc).primaryName()
-            ds = DataSeries(kind=dk, units=du, intvl=di, loc=dl, 
+            ds = DataSeries(kind=kind, units=units, intvl=intvl, loc=loc, 
                  first=first, last=last, values=values)
         except:
             raise Exception(
@@ -1018,6 +3124,13 @@ class DataVault(object):
     #----------------------------------------------------------------
     #  Caller must specify the kind, interval, location and units.
     #  first/last are optional.
+    #  With lazy=True, a read-only DataSeriesView is returned instead
+    #  of a DataSeries.  It converts values only as they are accessed,
+    #  which is much cheaper when only a few of them will be read.
+    #  out may be a float64 array (at least as long as the result) 
+    #  to put the values in, so that code that withdraws over and over
+    #  can reuse one buffer instead of allocating a new one each time.
+    #  The returned DataSeries then shares its values with out.
     #  If invalid specififiers are given, returns with a exception.
     #  If all works correctly, it returns a DataSeries object, if the 
     #    data is in the vault.
@@ -1025,63 +3138,87 @@ class DataVault(object):
     #    this also returns None, but no exception is generated.
     #----------------------------------------------------------------
     def withdraw(self, kind=None, units=None, intvl=None, loc=None, 
-                 first=None, last=None):
+                 first=None, last=None, lazy=False, out=None):
 
         #
-        #  Verify that all metadata strings were validly specified.
-        #  Do a full translation from string to object and back in
-        #  order to verify a valid specification.
+        #  Verify that all metadata items were validly specified, and
+        #  resolve each one to its metadata code.  Strings are resolved
+        #  here, once; codes are accepted as-is.
         #
-        dk = 'na'
+        kc = 0
         if kind:
             try:
-                dk = DataKind(kind).primaryName()
+                kc = DataKind.codeFromEntry(kind)
             except:
-                dk = 'na'
-        if dk=='na':
+                kc = 0
+        if kc==0:
             raise Exception('Invalid or missing kind specification '
                            + 'to DataVault.withdraw()')
 
-        du = 'na'
+        uc = 0
         if units:
             try:
-                du = DataUnits(units).primaryName()
+                uc = DataUnits.codeFromEntry(units)
             except:
-                du = 'na'
-        if du=='na':
+                uc = 0
+        if uc==0:
             raise Exception('Invalid or missing units specification '
                            + 'to DataVault.withdraw()')
 
-        di = 'na'
+        ic = 0
         if intvl:
             try:
-                di = DataInterval(intvl).primaryName()
+                ic = DataInterval.codeFromEntry(intvl)
             except:
-                di = 'na'
-        if di=='na':
+                ic = 0
+        if ic==0:
             raise Exception('Invalid or missing interval specification '
                            + 'to DataVault.withdraw()')
 
-        dl = 'na'
+        lc = 0
         if loc:
             try:
-                dl = DataLocation(loc).primaryName()
+                lc = DataLocation.codeFromEntry(loc)
             except:
-                dl = 'na'
-        if dl=='na':
+                lc = 0
+        if lc==0:
             raise Exception('Invalid or missing location specification '
                            + 'to DataVault.withdraw()')
 
         #
-        #  Construct the vault key from the lookup strings
+        #  A date that is given but can't be read is an error, rather 
+        #  than an open end of the period.
+        #
+        for d in (first, last):
+            if d and util.date_from_entry(d) == util.MISSING_DATE:
+                raise Exception('Invalid date specification to '
+                              + 'DataVault.withdraw(): ' + str(d))
+
+        #
+        #  The vault key is just the tuple of codes
         #
-        key = type(self)._construct_vault_key(kind=dk, intvl=di, loc=dl)
+        key = (kc, ic, lc)
         
+        t0 = stats.clock()
+        with self._key_lock(key).reading():
+            rds = self._withdraw(key, uc, first, last, lazy, out)
+        if t0 is not None:
+            n = len(rds) if rds is not None else 0
+            stats.record('vault.withdraw', t0, key=self._vault_key_name(key),
+                         nbytes=8*n, nvalues=n)
+        return rds
+
+    #----------------------------------------------------------------
+    #  The rest of withdraw(), run while holding the series lock.
+    #----------------------------------------------------------------
+    def _withdraw(self, key, uc, first, last, lazy, out=None):
+        du = DataUnits.nameFromCode(uc)
+
         #
         #  Get a temporary dataset
         #
         try:
-            tds = self.vault[key]
+            tds = self._resident(key)
         except:
             raise Exception('Unable to find requested data in the vault')
 
@@ -1102,31 +3239,224 @@ class DataVault(object):
             newlast = min(tds.endDate, d)
 
         #
-        #  Trim the old dataset to match this new period
+        #  Widen the period to whole periods of the data, so that the
+        #  result follows the DataSeries date convention.
         #
-        trimvals = util.trimDataValues(values=tds.dataVals,
-                oldstart=tds.startDate, oldend=tds.endDate,
-                newstart=newfirst, newend=newlast,
-                intvl=tds.dataInterval)
-            
+        if newfirst <= newlast:
+            newfirst = util.period_start(newfirst, 0, tds.dataInterval)
+            newlast  = util.period_end(newlast, 0, tds.dataInterval)
+
+        if lazy:
+            if out is not None:
+                raise Exception('DataVault.withdraw() cannot use an output '
+                              + 'array for a lazy withdrawal')
+            try:
+                view = DataSeriesView(tds, units=uc, first=newfirst, 
+                        last=newlast, 
+                        area=self._coordLakeAreaCode.get(tds.dataLocationCode))
+            except:
+                raise Exception('Error while attempting to convert data units in '
+                              + 'DataVault.withdraw()')
+
+            #
+            #  The view shares the stored values, which a deposit may
+            #  overwrite in place.  Keep track of it, so that such a 
+            #  deposit can first give it a copy of its own window (see
+            #  _detach_views), and the view never changes.
+            #
+            with self._mutex:
+                self._views.setdefault(key, weakref.WeakSet()).add(view)
+            return view
+
+        #
+        #  Where the new period falls in the stored values, and where
+        #  the result goes.
+        #
+        i, j = util.trimIndices(oldstart=tds.startDate, newstart=newfirst,
+                                newend=newlast, intvl=tds.dataInterval)
+        n = max(0, j - i)
+        if out is not None:
+            if (not isinstance(out, np.ndarray) or out.dtype != np.float64
+                  or out.ndim != 1 or len(out) < n):
+                raise Exception('Invalid output array given to '
+                              + 'DataVault.withdraw()')
+            out = out[:n]
+
+        #
+        #  If the cache is on and we have already done this exact
+        #  withdrawal, hand back a copy of the cached result.
+        #
+        ckey = (key, uc, newfirst, newlast)
+        if self._cacheSize:
+            newvals = self._cache_get(ckey)
+            if newvals is not None:
+                rds = DataSeries(kind=tds.dataKindCode, units=uc, 
+                        intvl=tds.dataIntervalCode, loc=tds.dataLocationCode,
+                        first=newfirst, last=newlast)
+                if out is not None:
+                    out[:] = newvals
+                    rds.dataArray = out
+                else:
+                    rds.dataArray = newvals.copy()
+                return rds
+
         #
         #  Now build a final dataset that has the correct units and 
-        #  period of record.
+        #  period of record.  The stored values for the new period are
+        #  converted straight into the result array, without making an
+        #  intermediate trimmed copy.
         #
+        #  convertInto() returns None when there is no conversion plan
+        #  for these units (e.g. a linear unit at a location with no
+        #  lake area), which is an error rather than an empty result.
+        #
+        lkarea = self._coordLakeAreaCode.get(tds.dataLocationCode)
         try:
-            lkarea = self.getLakeArea(tds.dataLocation)
-            newvals = util.convertValues(values=trimvals,
-                    oldunits=tds.dataUnits, newunits=units, 
+            t0 = stats.clock()
+            newvals = util.convertInto(values=tds.dataArray, i=i, j=i+n,
+                    out=out, oldunits=tds.dataUnits, newunits=du, 
                     intvl=tds.dataInterval, area=lkarea, 
                     first=newfirst, last=newlast)
-            kstr = tds.dataKind;
-            istr = tds.dataInterval;
-            lstr = tds.dataLocation;
-            rds = DataSeries(kind=kstr, units=units, intvl=istr, loc=lstr,
-                    first=newfirst, last=newlast, values=newvals)
+        except:
+            raise Exception('Error while attempting to convert data units in '
+                          + 'DataVault.withdraw()')
+        if newvals is None:
+            raise Exception('Unable to convert ' + tds.dataUnits + ' to ' 
+                          + du + ' for ' + self._vault_key_name(key)
+                          + ' in DataVault.withdraw()')
+        try:
+            if t0 is not None:
+                stats.record('vault.convert', t0, 
+                             key=self._vault_key_name(key),
+                             nbytes=newvals.nbytes, nvalues=len(newvals))
+            kstr = tds.dataKindCode
+            istr = tds.dataIntervalCode
+            lstr = tds.dataLocationCode
+            rds = DataSeries(kind=kstr, units=uc, intvl=istr, loc=lstr,
+                    first=newfirst, last=newlast)
+            rds.dataArray = newvals
+            if self._cacheSize:
+                self._cache_put(ckey, newvals.copy())
             return rds
         except:
             raise Exception('Error while attempting to convert data units in '
                           + 'DataVault.withdraw()')
-            
 
+    #----------------------------------------------------------------
+    #  Withdraw several series at once, aligned on a common time axis
+    #  and converted to one set of units.
+    #  kind and loc may each be a single string/code or a list; every
+    #  kind is withdrawn for every location, in the order given.
+    #  units and intvl must be single values.
+    #
+    #  The time axis is:
+    #     first/last, if given (periods with no data are NaN)
+    #     otherwise the union of the periods of record, or, with
+    #     overlap=True, the common (overlapping) period of record.
+    #
+    #  Returns a DataMatrix.  Raises an exception if any of the series
+    #  is not in the vault, or if overlap=True and there is no
+    #  common period.
+    #----------------------------------------------------------------
+    def withdraw_many(self, kind=None, units=None, intvl=None, loc=None,
+                      first=None, last=None, overlap=False):
+        kinds = kind if isinstance(kind, (list, tuple)) else [kind]
+        locs  = loc  if isinstance(loc,  (list, tuple)) else [loc]
+
+        try:
+            uc = DataUnits.codeFromEntry(units) if units else 0
+            ic = DataInterval.codeFromEntry(intvl) if intvl else 0
+        except:
+            uc = ic = 0
+        if uc==0:
+            raise Exception('Invalid or missing units specification '
+                           + 'to DataVault.withdraw_many()')
+        if ic==0:
+            raise Exception('Invalid or missing interval specification '
+                           + 'to DataVault.withdraw_many()')
+        du = DataUnits.nameFromCode(uc)
+        di = DataInterval.nameFromCode(ic)
+
+        #
+        #  Look up every requested series
+        #
+        keys = []
+        for k in kinds:
+            for l in locs:
+                try:
+                    key = (DataKind.codeFromEntry(k), ic, 
+                           DataLocation.codeFromEntry(l))
+                except:
+                    key = None
+                if not key or key[0]==0 or key[2]==0:
+                    raise Exception('Invalid kind/location specification '
+                                  + 'to DataVault.withdraw_many()')
+                if key not in self.vault:
+                    raise Exception('Unable to find requested data in the vault: '
+                                  + self._vault_key_name(key))
+                keys.append(key)
+
+        #
+        #  Hold the locks for all of the series (in sorted order, so 
+        #  two callers can't deadlock) while the matrix is built.
+        #
+        with ExitStack() as stack:
+            for key in sorted(set(keys)):
+                stack.enter_context(self._key_lock(key).reading())
+            return self._withdraw_many(keys, du, di, first, last, overlap)
+
+    #----------------------------------------------------------------
+    #  The rest of withdraw_many(), run while holding the series locks.
+    #----------------------------------------------------------------
+    def _withdraw_many(self, keys, du, di, first, last, overlap):
+        series = [self._resident(key) for key in keys]
+
+        #
+        #  Determine the common time axis
+        #
+        starts = [ds.startDate for ds in series]
+        ends   = [ds.endDate   for ds in series]
+        if first:
+            axstart = util.date_from_entry(first)
+        else:
+            axstart = max(starts) if overlap else min(starts)
+        if last:
+            axend = util.date_from_entry(last)
+        else:
+            axend = min(ends) if overlap else max(ends)
+        if axstart == util.MISSING_DATE or axend == util.MISSING_DATE:
+            raise Exception('Invalid date specification to '
+                          + 'DataVault.withdraw_many()')
+        axstart = util.period_start(axstart, 0, di)
+        axend   = util.period_end(axend, 0, di)
+        n = util.num_periods(axstart, axend, di)
+        if n < 1:
+            raise Exception('No common period of record in '
+                          + 'DataVault.withdraw_many()')
+
+        #
+        #  Convert each stored (normalized) series straight into its row
+        #  (see util.convertInto).
+        #
+        mat = np.full((len(series), n), np.nan)
+        try:
+            for r, ds in enumerate(series):
+                off = util.period_offset(axstart, ds.startDate, di)
+                i = max(0, off)
+                j = min(n, off + len(ds))
+                if i < j:
+                    area = self._coordLakeAreaCode.get(ds.dataLocationCode)
+                    rowvals = util.convertInto(values=ds.dataArray, 
+                            i=i-off, j=j-off, out=mat[r, i:j],
+                            oldunits=ds.dataUnits, newunits=du, area=area,
+                            intvl=di, first=util.period_start(axstart, i, di),
+                            last=util.period_end(axstart, j-1, di))
+                    if rowvals is None:
+                        raise ValueError('Unable to convert ' + ds.dataUnits)
+        except:
+            raise Exception('Error while attempting to convert data units in '
+                          + 'DataVault.withdraw_many()')
+
+        return DataMatrix(kinds=[ds.dataKind for ds in series], units=du,
+                          intvl=di, locs=[ds.dataLocation for ds in series],
+                          first=axstart, last=axend, values=mat)
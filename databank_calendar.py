@@ -0,0 +1,317 @@
+#/bin/python
+
+#--------------------------------------------------------------------------------
+#  Precomputed calendar tables for the databank modules.
+#
+#  Everything here works on day ordinals (datetime.date.toordinal()) and
+#  plain integers, so that whole arrays of dates can be mapped to periods
+#  at once with numpy, and single dates without building any datetime
+#  objects.
+#
+#  Periods are numbered from year 0, so the numbers do not depend on the
+#  range of the tables:
+#     month number     year*12 + month - 1
+#     qm number        month number*4 + quarter - 1
+#     week number      (ordinal + 2) // 7, which is the same for every
+#                      day of a Friday-Thursday regulation week
+#     year number      year
+#
+#  The tables cover FIRST_YEAR through LAST_YEAR.  They are extended
+#  automatically when a date outside that range is used, but never past
+#  MIN_YEAR or MAX_YEAR; a date beyond those raises an exception.  A
+#  wider range can be set up front with set_year_range().  They are:
+#     month_start     ordinal of the first day of each month (plus one
+#                     entry for the month after the last)
+#     month_days      days in each month
+#     qm_start        ordinal of the first day of each quarter-month
+#                     (plus one entry after the last)
+#     qm_days         days in each quarter-month
+#     year_start      ordinal of January 1 of each year (plus one)
+#     day_month       the month (as an index into month_start) of every
+#                     day in the range
+#     day_qm          the quarter-month (as an index into qm_start) of
+#                     every day in the range
+#--------------------------------------------------------------------------------
+
+import datetime as dt
+import threading
+import numpy as np
+
+FIRST_YEAR = 1850
+LAST_YEAR  = 2150
+
+#
+#  The limits of automatic extension.  They keep one stray date (e.g.
+#  util.MISSING_DATE, 9999-09-09) from rebuilding the per-day tables
+#  over thousands of years.
+#
+MIN_YEAR = 1700
+MAX_YEAR = 2400
+
+#---------------------------
+#  the breaking point for each quarter-month, by month length
+#---------------------------
+qtr_month_start_end_days = (
+        ((1,7), (8,14), (15,21), (22,28)),         # qtr-months for 28-day month
+        ((1,7), (8,14), (15,21), (22,29)),         # qtr-months for 29-day month
+        ((1,8), (9,15), (16,23), (24,30)),         # qtr-months for 30-day month
+        ((1,8), (9,15), (16,23), (24,31))          # qtr-months for 31-day month
+)
+_qm_start_days = np.array([[q[0] for q in row]
+                           for row in qtr_month_start_end_days], dtype=np.int64)
+
+#
+#  Ordinal of 1970-01-01, the numpy datetime64 epoch.
+#
+EPOCH = dt.date(1970, 1, 1).toordinal()
+
+
+#--------------------------------------------------------------------------------
+#  One set of tables.  A new set is built whenever the range changes, and
+#  swapped in whole, so readers never see a half-built set.
+#--------------------------------------------------------------------------------
+class _Tables(object):
+    def __init__(self, first, last):
+        self.first = first
+        self.last  = last
+        months = np.arange(np.datetime64('%04d-01' % first, 'M'),
+                           np.datetime64('%04d-01' % (last + 1), 'M') + 1)
+        self.month_start = (months.astype('datetime64[D]').astype(np.int64)
+                            + EPOCH)
+        self.month_days  = np.diff(self.month_start)
+        self.year_start  = self.month_start[::12].copy()
+
+        nm = len(self.month_days)
+        qs = (self.month_start[:-1, None] - 1
+              + _qm_start_days[self.month_days - 28])
+        self.qm_start = np.append(qs.ravel(), self.month_start[-1])
+        self.qm_days  = np.diff(self.qm_start)
+
+        self.day0 = int(self.month_start[0])
+        self.day_month = np.repeat(np.arange(nm, dtype=np.int32),
+                                   self.month_days)
+        self.day_qm    = np.repeat(np.arange(4*nm, dtype=np.int32),
+                                   self.qm_days)
+
+        self.lo = int(self.month_start[0])
+        self.hi = int(self.month_start[-1])
+
+_tables = _Tables(FIRST_YEAR, LAST_YEAR)
+_lock   = threading.Lock()
+
+#--------------------------------------------------------------------------------
+#  Rebuild the tables for first through last.  This is the only way to
+#  cover years outside MIN_YEAR through MAX_YEAR.
+#--------------------------------------------------------------------------------
+def set_year_range(first=None, last=None):
+    if not first or not last or last < first or first < 1 or last > 9998:
+        raise Exception('Invalid year range specified to set_year_range()')
+    with _lock:
+        _set_range(first, last)
+
+def _set_range(first, last):
+    global _tables, FIRST_YEAR, LAST_YEAR
+    _tables = _Tables(first, last)
+    FIRST_YEAR = first
+    LAST_YEAR  = last
+
+def year_range():
+    t = _tables
+    return t.first, t.last
+
+#
+#  The tables, extended if needed to cover ordinals lo through hi.
+#
+def _covering(lo, hi):
+    t = _tables
+    if lo >= t.lo and hi < t.hi:
+        return t
+    return _covering_years(_year_of(lo), _year_of(hi))
+
+def _year_of(o):
+    if not 1 <= o <= _MAX_ORDINAL:
+        raise Exception('Invalid day ordinal for the calendar: ' + str(o))
+    return dt.date.fromordinal(int(o)).year
+
+_MAX_ORDINAL = dt.date.max.toordinal()
+
+#
+#  The tables, extended if needed to cover years y1 through y2.  They 
+#  are extended by a few years more than needed, so that a run of 
+#  dates just past the end doesn't rebuild them again and again.
+#
+def _covering_years(y1, y2):
+    with _lock:
+        t = _tables
+        if t.first <= y1 and y2 <= t.last:
+            return t
+        lo = min(t.first, MIN_YEAR)
+        hi = max(t.last, MAX_YEAR)
+        if y1 < lo or y2 > hi:
+            bad = y1 if y1 < lo else y2
+            raise Exception('Year ' + str(bad) + ' is outside the range of '
+                    'the calendar tables (' + str(lo) + '-' + str(hi) 
+                    + '); see databank_calendar.set_year_range()')
+        _set_range(max(lo, min(t.first, y1 - 10)), 
+                   min(hi, max(t.last, y2 + 10)))
+        return _tables
+
+#
+#  Tables covering year, for the scalar functions.
+#
+def _for_year(year):
+    t = _tables
+    if t.first <= year <= t.last:
+        return t
+    return _covering_years(year, year)
+
+
+#--------------------------------------------------------------------------------
+#  Scalar functions.  These take and return plain ints.
+#--------------------------------------------------------------------------------
+def days_in_month(year, month):
+    t = _for_year(year)
+    return int(t.month_days[(year - t.first)*12 + month - 1])
+
+#
+#  First and last day of quarter qtr (1-4) of a month.
+#
+def qtr_month_start_end(year, month, qtr):
+    return qtr_month_start_end_days[days_in_month(year, month) - 28][qtr-1]
+
+#
+#  The quarter (1-4) of its month that a day falls in.
+#
+def qtr_of_day(year, month, day):
+    t = _for_year(year)
+    k = (year - t.first)*12 + month - 1
+    o = int(t.month_start[k]) + day - 1
+    return int(t.day_qm[o - t.day0]) - 4*k + 1
+
+#
+#  Ordinal of the Friday on or before the day with ordinal o.
+#  (Ordinal 1 is a Monday, so o + 2 is a multiple of 7 on Fridays.)
+#
+def friday_ordinal(o):
+    return o - (o + 2) % 7
+
+
+#--------------------------------------------------------------------------------
+#  Array functions.  These take a day ordinal or an array of them (see
+#  ordinals()) and return the same shape.
+#--------------------------------------------------------------------------------
+#
+#  Day ordinals for a sequence of datetime.date objects, or for a numpy
+#  datetime64 array.
+#
+def ordinals(dates):
+    if isinstance(dates, np.ndarray) and dates.dtype.kind == 'M':
+        return dates.astype('datetime64[D]').astype(np.int64) + EPOCH
+    if isinstance(dates, dt.date):
+        return dates.toordinal()
+    return np.fromiter((d.toordinal() for d in dates), dtype=np.int64)
+
+#
+#  numpy datetime64[D] values for day ordinals.
+#
+def datetimes(o):
+    return (np.asarray(o, dtype=np.int64) - EPOCH).astype('datetime64[D]')
+
+def _lookup(o):
+    a = np.asarray(o, dtype=np.int64)
+    if a.size == 0:
+        return a, _tables
+    return a, _covering(int(a.min()), int(a.max()))
+
+def _result(o, r):
+    if np.ndim(o) == 0:
+        return int(r)
+    return r.astype(np.int64)
+
+def month_number(o):
+    a, t = _lookup(o)
+    return _result(o, t.day_month[a - t.day0] + 12*t.first)
+
+def qm_number(o):
+    a, t = _lookup(o)
+    return _result(o, t.day_qm[a - t.day0] + 48*t.first)
+
+def week_number(o):
+    return (o + 2) // 7
+
+def year_number(o):
+    a, t = _lookup(o)
+    return _result(o, t.day_month[a - t.day0] // 12 + t.first)
+
+#
+#  The number of the period (see the top of this file) that contains
+#  each day, for any interval.
+#
+def period_number(o, intvl):
+    i = intvl.lower()
+    if i=='dy':
+        return o
+    if i=='wk':
+        return week_number(o)
+    if i=='mn':
+        return month_number(o)
+    if i=='qm':
+        return qm_number(o)
+    if i=='yr':
+        return year_number(o)
+    raise Exception('Invalid interval specified to period_number()')
+
+#
+#  The ordinal of the first day of each period number p.
+#
+def period_start(p, intvl):
+    i = intvl.lower()
+    if i=='dy':
+        return p
+    if i=='wk':
+        return _result(p, np.asarray(p, dtype=np.int64)*7 - 2)
+    a = np.asarray(p, dtype=np.int64)
+    if i=='mn':
+        t = _covering_periods(a, 12)
+        return _result(p, t.month_start[a - 12*t.first])
+    if i=='qm':
+        t = _covering_periods(a, 48)
+        return _result(p, t.qm_start[a - 48*t.first])
+    if i=='yr':
+        t = _covering_periods(a, 1)
+        return _result(p, t.year_start[a - t.first])
+    raise Exception('Invalid interval specified to period_start()')
+
+#
+#  The number of days in each period number p.
+#
+def period_days(p, intvl):
+    i = intvl.lower()
+    if i=='dy':
+        return _result(p, np.ones(np.shape(p), dtype=np.int64))
+    if i=='wk':
+        return _result(p, np.full(np.shape(p), 7, dtype=np.int64))
+    a = np.asarray(p, dtype=np.int64)
+    if i=='mn':
+        t = _covering_periods(a, 12)
+        return _result(p, t.month_days[a - 12*t.first])
+    if i=='qm':
+        t = _covering_periods(a, 48)
+        return _result(p, t.qm_days[a - 48*t.first])
+    if i=='yr':
+        t = _covering_periods(a, 1)
+        return _result(p, np.diff(t.year_start)[a - t.first])
+    raise Exception('Invalid interval specified to period_days()')
+
+#
+#  Tables covering period numbers a, with per_year periods in a year.
+#
+def _covering_periods(a, per_year):
+    t = _tables
+    if a.size == 0:
+        return t
+    y1 = int(a.min()) // per_year
+    y2 = int(a.max()) // per_year
+    if t.first <= y1 and y2 <= t.last:
+        return t
+    return _covering_years(y1, y2)
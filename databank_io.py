@@ -3,6 +3,7 @@ import re
 import datetime as dt
 import databank as databank
 import databank_util as util
+import databank_stats as stats
 
 
 # set fill value for missing data or non-existent values in table
@@ -77,13 +78,13 @@ def __get_meta_data(all_lines):
                     lstr = items[0].strip().lower()
                     rstr = items[1].strip().lower()
                     if (lstr == 'kind') or (lstr == 'type'):
-                        mkind = databank.DataKind(rstr).primaryName()
+                        mkind = databank.getPrimaryName(meta='kind', name=rstr)
                     if lstr == 'location':
-                        mloc = databank.DataLocation(rstr).primaryName()
+                        mloc = databank.getPrimaryName(meta='location', name=rstr)
                     if lstr == 'units':
-                        munits = databank.DataUnits(rstr).primaryName()
+                        munits = databank.getPrimaryName(meta='units', name=rstr)
                     if lstr == 'interval':
-                        mintvl = databank.DataInterval(rstr).primaryName()
+                        mintvl = databank.getPrimaryName(meta='interval', name=rstr)
                         if mintvl == 'na':
                             t = 'na'
                             if rstr[0] == 'd': t = 'dy'
@@ -91,7 +92,7 @@ def __get_meta_data(all_lines):
                             if rstr[0] == 'q': t = 'qm'
                             if rstr[0] == 'm': t = 'mn'
                             if rstr[0] == 'y': t = 'yr'
-                            mintvl = databank.DataInterval(t).primaryName()
+                            mintvl = databank.getPrimaryName(meta='interval', name=t)
         except:
             raise Exception('Error in header of the file')
 
@@ -379,7 +380,7 @@ def read_file(filename, kind=None, units=None, intvl=None, loc=None):
     the metadata (header info) so these keyword args will likely
     be required when processing these files.
     '''
-
+    t0 = stats.clock()
 
     #
     #  Get all of the non-comment content from the file as
@@ -487,7 +488,9 @@ def read_file(filename, kind=None, units=None, intvl=None, loc=None):
             except:
                 raise Exception('Error separating header and data lines.')
 
+        t1 = stats.clock()
         format_name = __detect_format(filename, data_lines, mintvl)
+        stats.record('io.detect_format', t1, key=filename)
         # end of what procData did
     else:
         raise Exception('Invalid interval')
@@ -495,8 +498,12 @@ def read_file(filename, kind=None, units=None, intvl=None, loc=None):
     if format_name == 'unknown':
         raise Exception('Format of ' + filename + ' could not be recognized')
     try:
+        t1 = stats.clock()
         start, end, datavals = __parse_data(filename, format_name, mintvl,
                                           data_lines)
+        if t1 is not None:
+            stats.record('io.parse', t1, key=filename, 
+                         nvalues=len(datavals) if datavals else 0)
     except:
         raise Exception('Error calling parse_data for '+filename+';  format:'
                         +format_name+'; interval:'+mintvl)
@@ -510,6 +517,9 @@ def read_file(filename, kind=None, units=None, intvl=None, loc=None):
 
     ds = databank.DataSeries(kind=mkind, units=munits, intvl=mintvl, loc=mloc,
                              first=start, last=end, values=datavals)
+    if t0 is not None:
+        stats.record('io.read_file', t0, key=filename, 
+                     nbytes=os.path.getsize(filename), nvalues=len(ds))
     return ds
 
 
@@ -588,10 +598,9 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 qq = int(items[2])
                 sd, ed = util.getQtrMonthStartEnd(year=yy, month=mm, qtr=qq)
                 d1 = dt.date(yy, mm, sd)
+                i0 = util.period_offset(start, d1, 'dy')
                 for i in range(3, len(items)):
-                    val = float(items[i])
-                    ndx = (d1 - start).days + i - 3
-                    datavals[ndx] = val
+                    datavals[i0 + i - 3] = float(items[i])
 
         if format_name == 'table':
             for line in data_lines:
@@ -600,10 +609,9 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 mm = int(items[0].split('-')[1])
                 d1 = dt.date(yy, mm, 1)
                 ndays = util.days_in_month(year=yy, month=mm) + 1
+                i0 = util.period_offset(start, d1, 'dy')
                 for i in range(1, ndays):
-                    val = float(items[i])
-                    ndx = (d1 - start).days + i - 1
-                    datavals[ndx] = val
+                    datavals[i0 + i - 1] = float(items[i])
 
         if format_name == 'column':
             for line in data_lines:
@@ -612,8 +620,7 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 mm = int(items[0].split('-')[1])
                 dd = int(items[0].split('-')[2])
                 d1 = dt.date(yy, mm, dd)
-                #ndx = (d1 - start).days - 1
-                ndx = (d1 - start).days 
+                ndx = util.period_offset(start, d1, 'dy')
                 datavals[ndx] = float(items[1])
 
 
@@ -645,7 +652,7 @@ def __parse_data(filename, format_name, intvl, data_lines):
             end = max(end, d1)
 
 
-        nweeks = int((end - start).days/7) + 1
+        nweeks = util.num_periods(start, end, 'wk')
         if nweeks < 1:
             return start, end, datavals
         datavals = [util.MISSING_REAL] * nweeks
@@ -656,8 +663,8 @@ def __parse_data(filename, format_name, intvl, data_lines):
             yy = int(items[0].split('-')[0])
             mm = int(items[0].split('-')[1])
             dd = int(items[0].split('-')[2])
-            d1 = util.getFridayDate(year=yy, month=mm, day=dd)
-            ndx = int((d1 - start).days/7)
+            d1 = dt.date(yy, mm, dd)
+            ndx = util.period_offset(start, d1, 'wk')
             datavals[ndx] = float(items[1])
 
 
@@ -669,7 +676,7 @@ def __parse_data(filename, format_name, intvl, data_lines):
 
     # first loop through to get start/end dates
         if format_name == 'cglrrm':
-            start_qtr = 1  # this format can NOT have partial years
+            # this format can NOT have partial years
             for line in data_lines:
                 items = [s.strip() for s in line.split() if s]
                 yy = int(items[0].split()[0])
@@ -679,7 +686,7 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 d2 = dt.date(yy, 12, ed)
                 start = min(start, d1)
                 end = max(end, d2)
-            nqtrs = 48*(end.year - start.year + 1)
+            nqtrs = util.num_periods(start, end, 'qm')
             datavals = [util.MISSING_REAL] * nqtrs
 
 
@@ -692,13 +699,9 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 ed = util.getQtrMonthStartEnd(year=yy, month=mm, qtr=4)[1]
                 d1 = dt.date(yy, mm, sd)
                 d2 = dt.date(yy, mm, ed)
-                if d1 <= start:
-                    start = d1
-                    start_mon = mm
-                if d2 >= end:
-                    end = d2
-                    end_mon = mm
-            nqtrs = 48*(end.year - start.year) + 4*(end_mon - start_mon + 1)
+                start = min(start, d1)
+                end = max(end, d2)
+            nqtrs = util.num_periods(start, end, 'qm')
             datavals = [util.MISSING_REAL] * nqtrs
 
 
@@ -711,15 +714,9 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 sd, ed = util.getQtrMonthStartEnd(year=yy, month=mm, qtr=qq)
                 d1 = dt.date(yy, mm, sd)
                 d2 = dt.date(yy, mm, ed)
-                if d1 <= start:
-                    start = d1
-                    start_mon = mm
-                    start_qtr = qq
-                if d2 >= end:
-                    end = d2
-                    end_mon = mm
-                    end_qtr = qq
-            nqtrs = 48*(end.year - start.year) + 4*(end_mon - start_mon) + (end_qtr - start_qtr) + 1
+                start = min(start, d1)
+                end = max(end, d2)
+            nqtrs = util.num_periods(start, end, 'qm')
             datavals = [util.MISSING_REAL] * nqtrs
 
         # now loop through to get datavals
@@ -729,12 +726,10 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 yy = int(items[0])
                 qq = int(items[1])
 
-                yy_delta = yy - start.year
-                qq_delta = qq - start_qtr
+                i0 = util.period_offset(start, dt.date(yy, 1, 1), 'qm') + qq - 1
 
                 for i in range(2, len(items)):
-                    ndx = 48*yy_delta + qq_delta + 4*(i - 2)
-                    datavals[ndx] = float(items[i])
+                    datavals[i0 + 4*(i - 2)] = float(items[i])
 
 
         if format_name == 'table':
@@ -743,12 +738,10 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 yy = int(items[0].split('-')[0])
                 mm = int(items[0].split('-')[1])
 
-                yy_delta = yy - start.year
-                mm_delta = mm - start_mon
+                i0 = util.period_offset(start, dt.date(yy, mm, 1), 'qm')
 
                 for i in range(1,len(items)):
-                    ndx = 48*yy_delta + 4*mm_delta + (i - 1)
-                    datavals[ndx] = float(items[i])
+                    datavals[i0 + i - 1] = float(items[i])
 
         if format_name == 'column':
             for line in data_lines:
@@ -757,11 +750,7 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 mm = int(items[0].split('-')[1])
                 qq = int(items[0].split('-')[2])
 
-                yy_delta = yy - start.year
-                mm_delta = mm - start_mon
-                qq_delta = qq - start_qtr
-
-                ndx = 48*yy_delta + 4*mm_delta + qq_delta
+                ndx = util.period_offset(start, dt.date(yy, mm, 1), 'qm') + qq - 1
                 datavals[ndx] = float(items[1])
 
 
@@ -783,7 +772,6 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 d2 = dt.date(yy, mm, ndays)
                 start = min(start, d1)
                 end = max(end, d2)
-                nmonths = 12*(end.year - start.year) + (end.month - start.month + 1)
 
         # change cglrrm data_lines to be comma delimited
         if format_name == 'cglrrm':
@@ -799,8 +787,8 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 d2 = dt.date(yy, 12, 31)
                 start = min(start, d1)
                 end = max(end, d2)
-                nmonths = 12*(end.year - start.year + 1)
 
+        nmonths = util.num_periods(start, end, 'mn')
         datavals = [util.MISSING_REAL] * nmonths
 
 
@@ -812,10 +800,7 @@ def __parse_data(filename, format_name, intvl, data_lines):
                 yy = int(items[0].split('-')[0])
                 mm = int(items[0].split('-')[1])
 
-                yy_delta = yy - start.year
-                mm_delta = mm - start.month
-
-                ndx = 12*yy_delta + mm_delta
+                ndx = util.period_offset(start, dt.date(yy, mm, 1), 'mn')
                 datavals[ndx] = float(items[1])
 
 
@@ -823,10 +808,9 @@ def __parse_data(filename, format_name, intvl, data_lines):
             for line in data_lines:
                 items = [s.strip() for s in line.split(',') if s]
                 yy = int(items[0])
-                yy_delta = yy - start.year
+                i0 = util.period_offset(start, dt.date(yy, 1, 1), 'mn')
                 for i in range(1, len(items)):
-                    ndx = 12*yy_delta + i - 1
-                    datavals[ndx] = float(items[i])
+                    datavals[i0 + i - 1] = float(items[i])
 
 
     return start, end, datavals
@@ -868,6 +852,8 @@ def write_file(filename, file_format, dataseries, overwrite=False, width=9, prec
 
 
 
+    t0 = stats.clock()
+
     # check input arguments for validity
     if file_format not in ['table', 'column']:
         raise Exception('invalid file_format: use \"table\" or \"column\"')
@@ -885,6 +871,10 @@ def write_file(filename, file_format, dataseries, overwrite=False, width=9, prec
     except:
         raise Exception('Unable to write datavals to ' + filename)
 
+    if t0 is not None:
+        stats.record('io.write_file', t0, key=filename, 
+                     nbytes=os.path.getsize(filename), nvalues=len(dataseries))
+
 
 
 
@@ -0,0 +1,143 @@
+#/bin/python
+
+#--------------------------------------------------------------------------------
+#  Optional instrumentation for the databank modules.
+#
+#  It is off by default.  When it is off, each instrumented function pays
+#  for one function call (clock() returning None) and nothing else.
+#  Turn it on with:
+#     import databank_stats as stats
+#     stats.enable()
+#     ...run things...
+#     stats.report()
+#
+#  Each instrumented operation records, per operation name and per key
+#  (a file name, a vault key name such as 'run_dy_on', or a units
+#  conversion such as 'mm->cms'):
+#     the number of calls
+#     the total wall time, in seconds
+#     the number of bytes handled (file size, or size of the values)
+#     the number of values handled
+#
+#  The operations are:
+#     io.read_file       databank_io.read_file(), the whole thing
+#     io.detect_format   ...the file format detection part of it
+#     io.parse           ...the parsing part of it
+#     io.write_file      databank_io.write_file()
+#     vault.deposit      DataVault.deposit(), the whole thing
+#     vault.normalize    ...the conversion to the normalized units
+#     vault.merge        ...storing/merging into the vault
+#     vault.deposit_many DataVault.deposit_many()
+#     vault.withdraw     DataVault.withdraw(), the whole thing
+#     vault.convert      ...trimming to the requested period and 
+#                           conversion to the requested units, in one pass
+#     util.convert       databank_util.convertValues()
+#
+#  Callbacks registered with add_callback() are called for every record
+#  as fn(op, key, seconds, nbytes, nvalues), e.g. to feed a profiler or
+#  a log.
+#--------------------------------------------------------------------------------
+
+import sys
+import time
+import threading
+
+enabled = False
+
+_stats     = {}          # (op, key) -> [calls, seconds, bytes, values]
+_callbacks = []
+_lock      = threading.Lock()
+
+
+#--------------------------------------------------------------------------------
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+#--------------------------------------------------------------------------------
+#  Clear everything recorded so far.  Callbacks are kept.
+#--------------------------------------------------------------------------------
+def reset():
+    with _lock:
+        _stats.clear()
+
+#--------------------------------------------------------------------------------
+def add_callback(fn):
+    with _lock:
+        _callbacks.append(fn)
+
+def remove_callback(fn):
+    with _lock:
+        if fn in _callbacks:
+            _callbacks.remove(fn)
+
+#--------------------------------------------------------------------------------
+#  The start time for an operation, or None if instrumentation is off.
+#  Instrumented code does:
+#     t0 = stats.clock()
+#     ...
+#     if t0 is not None:
+#         stats.record('some.op', t0, key=..., nbytes=..., nvalues=...)
+#--------------------------------------------------------------------------------
+def clock():
+    if enabled:
+        return time.perf_counter()
+    return None
+
+#--------------------------------------------------------------------------------
+#  Record one call of op that started at t0 (from clock()).
+#--------------------------------------------------------------------------------
+def record(op, t0, key=None, nbytes=0, nvalues=0):
+    if t0 is None:
+        return
+    seconds = time.perf_counter() - t0
+    with _lock:
+        s = _stats.get((op, key))
+        if s is None:
+            s = _stats[(op, key)] = [0, 0.0, 0, 0]
+        s[0] += 1
+        s[1] += seconds
+        s[2] += nbytes
+        s[3] += nvalues
+        callbacks = list(_callbacks)
+    for fn in callbacks:
+        fn(op, key, seconds, nbytes, nvalues)
+
+#--------------------------------------------------------------------------------
+#  Everything recorded so far, as a dictionary.  With by_key=False the
+#  keys are operation names; with by_key=True they are (op, key) tuples.
+#  Each value is a dictionary with calls, seconds, bytes and values.
+#--------------------------------------------------------------------------------
+def results(by_key=False):
+    out = {}
+    with _lock:
+        for (op, key), s in _stats.items():
+            k = (op, key) if by_key else op
+            r = out.get(k)
+            if r is None:
+                r = out[k] = {'calls': 0, 'seconds': 0.0, 'bytes': 0, 'values': 0}
+            r['calls']   += s[0]
+            r['seconds'] += s[1]
+            r['bytes']   += s[2]
+            r['values']  += s[3]
+    return out
+
+#--------------------------------------------------------------------------------
+#  Print a table of the results, busiest operations first.
+#--------------------------------------------------------------------------------
+def report(file=None, by_key=False):
+    if file is None:
+        file = sys.stdout
+    res = results(by_key)
+    print('%-48s %9s %12s %12s %14s %12s' % ('operation', 'calls', 'total s',
+          'mean ms', 'bytes', 'values'), file=file)
+    for k in sorted(res, key=lambda k: -res[k]['seconds']):
+        r = res[k]
+        name = k if not by_key else (k[0] + ' ' + str(k[1] if k[1] is not None else ''))
+        print('%-48s %9d %12.6f %12.4f %14d %12d' % (name[:48], r['calls'],
+              r['seconds'], 1000.0*r['seconds']/max(1, r['calls']),
+              r['bytes'], r['values']), file=file)
@@ -1,4 +1,8 @@
 import datetime as dt
+from functools import lru_cache
+import numpy as np
+import databank_stats as stats
+import databank_calendar as cal
 
 #-------------------------
 #  Define a "missing value" for dates and other variable types.
@@ -6,10 +10,16 @@ import datetime as dt
 #  recognized as an out-of-range value, and none of our valid data will 
 #  ever have year=9999.
 #  For numeric values, I am just assigning very large negative numbers.
+#
+#  Internally, data values are stored in numpy float64 arrays and a
+#  missing value is stored as NaN.  MISSING_REAL is still what the
+#  outside world sees (files, lists returned to the user), and any
+#  value below MISSING_TEST is treated as missing when it comes in.
 #-------------------------
 MISSING_DATE = dt.date(9999, 9, 9)
 MISSING_INT  = -999999999
 MISSING_REAL = -9.9e29
+MISSING_TEST = -9.8e20
 
 linear_units = ('mm',  'cm',  'm',  'km',  'in',  'ft',  'yd',  'mi')
 areal_units  = ('mm2', 'cm2', 'm2', 'km2', 'in2', 'ft2', 'yd2', 'mi2')
@@ -17,14 +27,9 @@ cubic_units  = ('mm3', 'cm3', 'm3', 'km3', 'in3', 'ft3', 'yd3', 'mi3')
 rate_units   = ('cms', '10cms', 'cfs', 'tcfs')
 
 #---------------------------
-#  define the breaking point for each quarter-month
+#  the breaking point for each quarter-month (see databank_calendar)
 #---------------------------
-qtr_month_start_end_days = (
-        ((1,7), (8,14), (15,21), (22,28)),         # qtr-months for 28-day month
-        ((1,7), (8,14), (15,21), (22,29)),         # qtr-months for 29-day month
-        ((1,8), (9,15), (16,23), (24,30)),         # qtr-months for 30-day month
-        ((1,8), (9,15), (16,23), (24,31))          # qtr-months for 31-day month
-)
+qtr_month_start_end_days = cal.qtr_month_start_end_days
 
 
 #-------------------------------------------------------------------------------
@@ -32,6 +37,40 @@ qtr_month_start_end_days = (
 #-------------------------------------------------------------------------------
 #
 #--------------------------------------------------------------------
+#  Translate a list (or array) of data values into a contiguous float64
+#  numpy array, with every missing value (None, NaN or anything below
+#  MISSING_TEST) set to NaN.
+#  If copy is False and values is already a float64 array without any
+#  sentinel values in it, that same array is returned.
+#--------------------------------------------------------------------
+def to_array(values, copy=True):
+    if values is None:
+        return np.empty(0, dtype=np.float64)
+    if copy:
+        a = np.array(values, dtype=np.float64)
+    else:
+        a = np.asarray(values, dtype=np.float64)
+    if a.ndim != 1:
+        a = a.ravel()
+    missing = a < MISSING_TEST
+    if missing.any():
+        if a is values:
+            a = a.copy()
+        a[missing] = np.nan
+    return a
+
+#--------------------------------------------------------------------
+#  The reverse of to_array().  Returns a plain python list of floats
+#  with every NaN replaced by MISSING_REAL.
+#--------------------------------------------------------------------
+def to_list(values):
+    if values is None:
+        return []
+    a = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(a), MISSING_REAL, a).tolist()
+
+#--------------------------------------------------------------------
+#--------------------------------------------------------------------
 def days_in_month(year=None, month=None):
     ''' Determine # of days in month.  This is maybe out of place... 
         not intended to be called by user but just a helper function 
@@ -42,10 +81,7 @@ def days_in_month(year=None, month=None):
         raise Exception('No month specified in days_in_month()')
         
     try:
-        if month==12:
-            return (dt.datetime(year+1,1,1)-dt.datetime(year,12,1)).days
-        else:
-            return (dt.datetime(year,month+1,1)-dt.datetime(year,month,1)).days
+        return cal.days_in_month(year, month)
     except:
         raise Exception('Error computing number of days in a month')
 
@@ -55,14 +91,8 @@ def getFridayDate(year=None, month=None, day=None):
     '''Get the date of the most recent (i.e. PRECEDING) friday given a yr,mo, day.  
 	This is to match the previous convention that the CGLRRM used for weekly data beginning on friday.'''
 
-    in_date=dt.date(year, month, day)
-    idx=in_date.weekday() 
-	# idx= 0  1  2  3  4  5  6
-	#      M  T  W  R  F  Sa Su
-    shift=[3, 4, 5, 6, 0, 1, 2]
-
-    friday_date = in_date-dt.timedelta(days=shift[idx])
-    return friday_date
+    o = dt.date(year, month, day).toordinal()
+    return dt.date.fromordinal(cal.friday_ordinal(o))
 
 
 #-----------------------------------------------------------------------------
@@ -70,8 +100,7 @@ def getFridayDate(year=None, month=None, day=None):
 #  e.g. if any_date = datetime.date(2001,3,15), this will return datetime.date(2001,3,31)
 #-----------------------------------------------------------------------------
 def last_day_of_month(any_date):
-    next_month = any_date.replace(day=28) + dt.timedelta(days=4)
-    return next_month - dt.timedelta(days=next_month.day)
+    return any_date.replace(day=cal.days_in_month(any_date.year, any_date.month))
 
 #-----------------------------------------------------------------------------
 #  Given a passed argument, attempt to translate it into a valid
@@ -120,23 +149,382 @@ def getQtrMonthStartEnd(year=None, month=None, qtr=None):
         raise Exception('No quarter specified in getQtrMonthStartEnd()')
 
     try:
-        days = days_in_month(year=year, month=month)
-        sd = qtr_month_start_end_days[days-28][qtr-1][0]
-        ed = qtr_month_start_end_days[days-28][qtr-1][1]
-        return sd, ed
+        return cal.qtr_month_start_end(year, month, qtr)
     except:
         raise Exception('Error finding start/end of a qtr-month')
 
+#--------------------------------------------------------------------
+def qtr_of_date(any_date):
+    ''' Determine which quarter (1-4) of its month a date falls in'''
+    return cal.qtr_of_day(any_date.year, any_date.month, any_date.day)
+
+#-------------------------------------------------------------------------------
+#  Period arithmetic.  These work for every interval ('dy', 'wk', 'qm', 'mn',
+#  'yr') and follow the DataSeries convention that a period is identified
+#  by any day inside it.  Weeks are the Friday-Thursday "regulation weeks"
+#  (see getFridayDate).
+#
+#  This is also the date-to-index engine for the databank: the index of a
+#  date in a series is period_offset(series start, date, intvl), and the
+#  slice for a date range is trimIndices().  Both are a few integer 
+#  operations on day ordinals (plus a table lookup for quarter-months,
+#  see databank_calendar), whatever the interval or the length of the 
+#  series.
+#-------------------------------------------------------------------------------
+#
+#--------------------------------------------------------------------
+#  Number of whole periods from the period that contains base to the
+#  period that contains any_date.  Negative if any_date is earlier.
+#  e.g. period_offset(date(2001,1,15), date(2001,3,2), 'mn') -> 2
+#--------------------------------------------------------------------
+def period_offset(base=None, any_date=None, intvl=None):
+    i = intvl.lower()
+    if i=='dy':
+        return any_date.toordinal() - base.toordinal()
+    if i=='wk':
+        b = base.toordinal() - (base.weekday() - 4) % 7
+        return (any_date.toordinal() - b) // 7
+    if i=='mn':
+        return (any_date.year - base.year)*12 + (any_date.month - base.month)
+    if i=='qm':
+        return (cal.qm_number(any_date.toordinal()) 
+              - cal.qm_number(base.toordinal()))
+    if i=='yr':
+        return any_date.year - base.year
+    raise Exception('Invalid interval specified to period_offset()')
+
+#--------------------------------------------------------------------
+#  Number of periods from first through last, inclusive.
+#--------------------------------------------------------------------
+def num_periods(first=None, last=None, intvl=None):
+    return period_offset(first, last, intvl) + 1
+
+#--------------------------------------------------------------------
+#  First day of the period that is n periods after the one containing
+#  base (n may be negative or zero).
+#--------------------------------------------------------------------
+def period_start(base=None, n=0, intvl=None):
+    i = intvl.lower()
+    if i=='dy':
+        return base + dt.timedelta(days=n)
+    if i=='wk':
+        return dt.date.fromordinal(cal.friday_ordinal(base.toordinal()) + 7*n)
+    if i=='mn':
+        y, m = divmod(base.year*12 + base.month - 1 + n, 12)
+        return dt.date(y, m+1, 1)
+    if i=='qm':
+        q = cal.qm_number(base.toordinal()) + n
+        return dt.date.fromordinal(cal.period_start(q, 'qm'))
+    if i=='yr':
+        return dt.date(base.year + n, 1, 1)
+    raise Exception('Invalid interval specified to period_start()')
+
+#--------------------------------------------------------------------
+#  Last day of the period that is n periods after the one containing base.
+#--------------------------------------------------------------------
+def period_end(base=None, n=0, intvl=None):
+    return period_start(base, n+1, intvl) - dt.timedelta(days=1)
+
+#--------------------------------------------------------------------
+#  Start date of each of n consecutive periods, beginning with the
+#  period that contains first.  Returned as a numpy datetime64[D] array.
+#--------------------------------------------------------------------
+def period_dates(first=None, n=0, intvl=None):
+    i = intvl.lower()
+    d0 = np.datetime64(period_start(first, 0, i), 'D')
+    if i=='dy':
+        return d0 + np.arange(n)
+    if i=='wk':
+        return d0 + 7*np.arange(n)
+    if i=='mn':
+        return (d0.astype('datetime64[M]') + np.arange(n)).astype('datetime64[D]')
+    if i=='yr':
+        return (d0.astype('datetime64[Y]') + np.arange(n)).astype('datetime64[D]')
+    if i=='qm':
+        p = cal.qm_number(first.toordinal()) + np.arange(n)
+        return cal.datetimes(cal.period_start(p, 'qm'))
+    raise Exception('Invalid interval specified to period_dates()')
+
+#--------------------------------------------------------------------
+#  Number of seconds in each of n consecutive periods, beginning with
+#  the period that contains first.  Returned as a float64 numpy array.
+#--------------------------------------------------------------------
+def period_seconds(first=None, n=0, intvl=None):
+    i = intvl.lower()
+    if i=='dy':
+        return np.full(n, 86400.0)
+    if i=='wk':
+        return np.full(n, 604800.0)
+    if n < 1:
+        return np.zeros(0)
+    p = cal.period_number(first.toordinal(), i) + np.arange(n)
+    return cal.period_days(p, i) * 86400.0
+
+#--------------------------------------------------------------------
+#  Conversion factor tables.
+#
+#  For each dimension, the factor that converts a value in each of its
+#  units (in the order of the tuples at the top) to the base unit, and
+#  the factor that converts a value in the base unit back to each of 
+#  them.  The base units are m, m2, m3 and cms.
+#  The two columns were written down separately and are not exact 
+#  reciprocals of each other, so both are kept.
+#--------------------------------------------------------------------
+_to_base = {
+    'linear': (0.001, 0.01, 1.0, 1000.0, 0.0254, 0.3048, 0.9144, 1609.34),
+    'areal':  (1.0e-6, 0.0001, 1.0, 1.0e+6, 0.00064516, 0.092903, 
+               0.836127, 2.59e+6),
+    'cubic':  (1.0e-9, 1.0e-6, 1.0, 1.0e+9, 1.6387e-5, 0.0283168, 
+               0.764555, 4.168e+9),
+    'rate':   (1.0, 10.0, 0.0283168, 28.3168),
+}
+_from_base = {
+    'linear': (1000.0, 100.0, 1.0, 0.001, 39.3701, 3.28084, 1.09361, 0.0006214),
+    'areal':  (1.0e+6, 10000.0, 1.0, 1.0e-6, 1550, 10.7639, 1.19599, 3.861e-7),
+    'cubic':  (1.0e+9, 1.0e+6, 1.0, 1.0e-9, 61023.7, 35.3147, 1.30795, 
+               2.3991e-10),
+    'rate':   (1.0, 0.1, 35.3147, 0.0353147),
+}
+_dimension_units = {'linear': linear_units, 'areal': areal_units,
+                    'cubic': cubic_units,   'rate': rate_units}
+
+#
+#  factor_tables[dim][i, j] converts the i'th unit of dim to the j'th.
+#  _unit_dims maps each unit string to its (dimension, row number).
+#
+factor_tables = dict((dim, np.outer(_to_base[dim], _from_base[dim]))
+                     for dim in _dimension_units)
+_unit_dims = {}
+for _dim, _units in _dimension_units.items():
+    for _i, _u in enumerate(_units):
+        _unit_dims[_u] = (_dim, _i)
+
+#--------------------------------------------------------------------
+#  The multiplier from oldstr to newstr, which must both be units of
+#  the dimension dim.  Raises an exception if they aren't.
+#--------------------------------------------------------------------
+def unitFactor(dim=None, oldstr=None, newstr=None):
+    try:
+        d1, i = _unit_dims[oldstr]
+        d2, j = _unit_dims[newstr]
+    except (KeyError, TypeError):
+        d1 = d2 = None
+    if d1 != dim or d2 != dim:
+        raise Exception('Invalid conversion specified: ' + str(oldstr)
+                      + '->' + str(newstr))
+    return float(factor_tables[dim][i, j])
+
+#--------------------------------------------------------------------
+#  A compiled conversion from one set of units to another.
+#
+#  Every conversion comes down to values * factor * secs**power, where
+#  secs is the number of seconds in each period and power is 0 within
+#  a dimension, -1 into a rate and +1 out of one (the lake area, when 
+#  it is needed, is folded into factor).  So applying a plan is one
+#  vectorized multiply, by a scalar when the periods are all the same
+#  length and by an array of per-period factors when they are not.
+#
+#  Plans are made by conversionPlan(), from a cache of the plans for
+#  each pair of units and interval.  Don't make them directly.
+#--------------------------------------------------------------------
+class ConversionPlan(object):
+    def __init__(self, factor, power=0, intvl=None):
+        self.factor = factor
+        self.power  = power
+        self.intvl  = intvl
+
+    #
+    #  The multiplier(s) for n values starting with the period that 
+    #  contains first: a scalar, or an array of n factors.  None if the
+    #  seconds per period are not known for the interval.
+    #
+    def factors(self, first=None, n=0):
+        if self.power == 0:
+            return self.factor
+        secs = _period_seconds(self.intvl, first, n)
+        if secs is None:
+            return None
+        if self.power > 0:
+            return self.factor * secs
+        return self.factor / secs
+
+    #
+    #  Convert values (list or array; anything below MISSING_TEST is 
+    #  missing) to a new float64 array, or None if it can't be done.
+    #
+    def apply(self, values, first=None):
+        return self.multiply(to_array(values, copy=False), first)
+
+    #
+    #  The same, for a float64 array that already has NaN for missing
+    #  (e.g. stored vault values, or a slice of them).  The result is
+    #  written into out if it is given, which must be a float64 array
+    #  of the same length, and otherwise into a new array.  Nothing
+    #  else of that length is allocated for scalar factors; for 
+    #  per-period factors only the seconds array is.
+    #
+    def multiply(self, a, first=None, out=None):
+        if self.power == 0:
+            return np.multiply(a, self.factor, out=out)
+        secs = _period_seconds(self.intvl, first, len(a))
+        if secs is None:
+            return None
+        out = np.multiply(a, self.factor, out=out)
+        if self.power > 0:
+            out *= secs
+        else:
+            out /= secs
+        return out
+
+#--------------------------------------------------------------------
+#  The ConversionPlan from oldunits to newunits.  area (square meters)
+#  is only used for linear <-> rate conversions and intvl only for 
+#  conversions to or from a rate.  Raises an exception if the 
+#  conversion makes no sense (e.g. cm -> ft3).
+#
+#  The plans are cached without the area (see _unit_plan), so the 
+#  cache stays small however many different areas are used; the area
+#  is applied here, to a copy of the cached plan.
+#--------------------------------------------------------------------
+def conversionPlan(oldunits=None, newunits=None, intvl=None, area=None):
+    try:
+        plan, areapow = _unit_plan(oldunits, newunits, intvl)
+    except TypeError:
+        raise Exception('Invalid conversion specified; ' + str(oldunits)
+                      + ' to ' + str(newunits))
+    if areapow == 0:
+        return plan
+    f = plan.factor * area if areapow > 0 else plan.factor / area
+    return ConversionPlan(f, plan.power, plan.intvl)
+
+_PLAN_CACHE = 256
+
+#
+#  The plan for a conversion, leaving out the lake area, and the power
+#  of the area that it still has to be multiplied by (0 if none).
+#
+@lru_cache(maxsize=_PLAN_CACHE)
+def _unit_plan(oldunits, newunits, intvl):
+    try:
+        d1, i = _unit_dims[oldunits]
+        d2, j = _unit_dims[newunits]
+    except (KeyError, TypeError):
+        raise Exception('Invalid conversion specified; ' + str(oldunits)
+                      + ' to ' + str(newunits))
+
+    #
+    #  Within one dimension, it's just the factor from the table.
+    #  Otherwise go through the base units:
+    #     linear -> rate     m * area / secs     = cms
+    #     cubic  -> rate     m3 / secs           = cms
+    #     rate   -> linear   cms * secs / area   = m
+    #     rate   -> cubic    cms * secs          = m3
+    #
+    if d1 == d2:
+        return ConversionPlan(float(factor_tables[d1][i, j])), 0
+    elif d1 in ('linear', 'cubic') and d2 == 'rate':
+        f = _to_base[d1][i] * _from_base[d2][j]
+        return (ConversionPlan(f, -1, intvl.lower()), 
+                1 if d1 == 'linear' else 0)
+    elif d1 == 'rate' and d2 in ('linear', 'cubic'):
+        f = _to_base[d1][i] * _from_base[d2][j]
+        return (ConversionPlan(f, 1, intvl.lower()), 
+                -1 if d2 == 'linear' else 0)
+    raise Exception('Invalid conversion specified; ' + oldunits
+                  + ' to ' + newunits)
+
+#--------------------------------------------------------------------
+#  Multipliers that convert values in oldunits to newunits, one for 
+#  each of the n periods beginning with first, as an array
+#  (rate <-> linear/cubic factors depend on the length of the period).
+#  Returns None if the conversion cannot be done.
+#--------------------------------------------------------------------
+def conversionFactors(oldunits=None, newunits=None, area=None, intvl=None,
+                      first=None, last=None, n=0):
+    if n < 1: return None
+    if (oldunits in rate_units) != (newunits in rate_units):
+        if not intvl: return None
+        if (oldunits in linear_units or newunits in linear_units) and not area:
+            return None
+        if intvl in ('qm', 'mn', 'yr') and not (first and last): return None
+    try:
+        f = conversionPlan(oldunits, newunits, intvl, area).factors(first, n)
+    except:
+        raise Exception('Error converting ' + str(oldunits)
+                  + ' to ' + str(newunits))
+    if f is None:
+        return None
+    return np.broadcast_to(np.float64(f), (n,)).copy()
+
+#--------------------------------------------------------------------
+#  True if the factor for converting oldunits to newunits is different
+#  for different periods, i.e. a rate <-> linear/cubic conversion for an
+#  interval whose periods are not all the same length.
+#--------------------------------------------------------------------
+def period_dependent(oldunits=None, newunits=None, intvl=None):
+    if intvl in ('dy', 'wk'):
+        return False
+    return (oldunits in rate_units) != (newunits in rate_units)
+
 #--------------------------------------------------------------------
 #  oldunits, newunits must be specified as strings, and must have a matching
 #  entry in the tuples defined at the top.
+#  values may be a list or a numpy array.  The converted values are
+#  always returned as a new float64 numpy array, with NaN for missing.
 #--------------------------------------------------------------------
 def convertValues(values=None, oldunits=None, newunits=None, 
                   area=None, intvl=None, first=None, last=None):
-    if not values:   return None
+    t0 = stats.clock()
+    result = _convertValues(values, oldunits, newunits, area, intvl, 
+                            first, last)
+    if t0 is not None:
+        n = len(values) if values is not None else 0
+        stats.record('util.convert', t0, key=str(oldunits) + '->' + str(newunits),
+                     nbytes=8*n, nvalues=n)
+    return result
+
+def _convertValues(values, oldunits, newunits, area, intvl, first, last):
+    if values is None or len(values) == 0: return None
     if not oldunits: return None
     if not newunits: return None
         
+    plan = _plan_for(oldunits, newunits, area, intvl, first, last)
+    if plan is None:
+        return None
+    try:
+        return plan.apply(values, first)
+    except:
+        raise Exception('Error converting ' + oldunits
+                  + ' to ' + newunits)
+
+#--------------------------------------------------------------------
+#  The fused trim-and-convert kernel used by DataVault.withdraw().
+#  values[i:j] (a float64 array with NaN for missing, such as the 
+#  stored values of a vault series) is converted and written straight
+#  into out, or into a new array if out is None, so the window is
+#  allocated at most once.  out must be a float64 array of length j-i.
+#  first is the start of period i, for conversions that depend on the
+#  length of the periods.
+#  Returns out (or the new array), or None if the conversion cannot
+#  be done with what was given.
+#--------------------------------------------------------------------
+def convertInto(values=None, i=0, j=None, out=None, oldunits=None, 
+                newunits=None, area=None, intvl=None, first=None, last=None):
+    if values is None: return None
+    if not oldunits: return None
+    if not newunits: return None
+    if j is None:
+        j = len(values)
+    plan = _plan_for(oldunits, newunits, area, intvl, first, last)
+    if plan is None:
+        return None
+    return plan.multiply(values[i:j], first, out=out)
+
+#--------------------------------------------------------------------
+#  The ConversionPlan for a conversion, or None if it can't be done
+#  with what was given.  Raises an exception if it makes no sense.
+#--------------------------------------------------------------------
+def _plan_for(oldunits, newunits, area, intvl, first, last):
     if not isinstance(oldunits, str):
         raise Exception('Invalid oldunits specification in convertValues.')
     if not isinstance(newunits, str):
@@ -146,18 +534,10 @@ def convertValues(values=None, oldunits=None, newunits=None,
     #  If the conversion is within the same kind of units, we can
     #  do it directly.
     #
-    try:
-        if (oldunits in linear_units) and (newunits in linear_units):
-            return linearConvert(values, oldunits, newunits)
-        elif (oldunits in areal_units) and (newunits in areal_units):
-            return arealConvert(values, oldunits, newunits)
-        elif (oldunits in cubic_units) and (newunits in cubic_units):
-            return cubicConvert(values, oldunits, newunits)
-        elif (oldunits in rate_units) and (newunits in rate_units):
-            return rateConvert(values, oldunits, newunits)
-    except:
-        raise Exception('Error converting ' + oldunits
-                  + ' to ' + newunits)
+    d1 = _unit_dims.get(oldunits, (None,))[0]
+    d2 = _unit_dims.get(newunits, (None,))[0]
+    if d1 is not None and d1 == d2:
+        return conversionPlan(oldunits, newunits)
     
     #
     #  If the conversion request is cross-group (e.g. cm -> cms)
@@ -177,48 +557,35 @@ def convertValues(values=None, oldunits=None, newunits=None,
     #  If doing daily or weekly we could process every value with
     #  the same conversion factors, but in the general case each 
     #  value must be computed independently because the number
-    #  of seconds will vary (e.g. February != June).  That will
-    #  be handled in the routines called from this section of code.
+    #  of seconds will vary (e.g. February != June).  That is
+    #  handled by the conversion plan (see ConversionPlan).
     #
     #  We require the start/end dates for data intervals greater than
     #  weekly, because we have to compute the number of days for each
     #  value.
     #
     if not intvl: return None
-    if not area:  return None
+    if 'linear' in (d1, d2) and not area: return None
     if (intvl == 'qm') or (intvl == 'mn') or (intvl == 'yr'):
         if not first: return None
         if not last:  return None
 
-    try:
-        if (oldunits in linear_units) and (newunits in rate_units):
-            return linearToRate(values=values, oldu=oldunits, newu=newunits, 
-                   area=area, intvl=intvl, first=first, last=last)
-        elif (oldunits in cubic_units) and (newunits in rate_units):
-            return cubicToRate(values=values, oldu=oldunits, newu=newunits, 
-                   intvl=intvl, first=first, last=last)
-        elif (oldunits in rate_units) and (newunits in linear_units):
-            return rateToLinear(values=values, oldu=oldunits, newu=newunits,
-                   area=area, intvl=intvl, first=first, last=last)
-        elif (oldunits in rate_units) and (newunits in cubic_units):
-            return rateToCubic(values=values, oldu=oldunits, newu=newunits, 
-                   intvl=intvl, first=first, last=last)
-    except:
-        raise Exception('Error converting ' + oldunits
-                  + ' to ' + newunits)
-         
-    raise Exception('Invalid conversion specified; ' + oldunits
-                  + ' to ' + newunits)
+    if not ((d1 in ('linear', 'cubic') and d2 == 'rate') 
+            or (d1 == 'rate' and d2 in ('linear', 'cubic'))):
+        raise Exception('Invalid conversion specified; ' + oldunits
+                      + ' to ' + newunits)
+    return conversionPlan(oldunits, newunits, intvl, area)
          
          
 #-------------------------------------------------------
-#  values = list of data values
-#           Any value < -9.9e20 is considered "missing"
+#  values = list or array of data values
+#           Any value < -9.8e20 (or NaN) is considered "missing"
+#  Returns a float64 numpy array, with NaN for each missing value.
 #  oldstr = unit string for incoming data (e.g. 'mm', 'm', 'ft')
 #  newstr = unit string for outgoing data (e.g. 'mm', 'm', 'ft')
 #-------------------------------------------------------
 def linearConvert(values=None, oldstr=None, newstr=None):
-    if not values: return None
+    if values is None or len(values) == 0: return None
     if not oldstr: return None
     if not newstr: return None
     if not isinstance(oldstr, str):
@@ -226,49 +593,22 @@ def linearConvert(values=None, oldstr=None, newstr=None):
     if not isinstance(newstr, str):
         raise Exception('Invalid new units specification in linearConvert.')
 
-    try:    
-        #
-        #  Determine the conversion factor...
-        #  m1 = old units -> meters
-        #  m2 = meters -> new units
-        #
-        m1 = 0.0
-        if oldstr=='mm': m1 = 0.001 
-        if oldstr=='cm': m1 = 0.01 
-        if oldstr=='m' : m1 = 1.0 
-        if oldstr=='km': m1 = 1000.0 
-        if oldstr=='in': m1 = 0.0254
-        if oldstr=='ft': m1 = 0.3048
-        if oldstr=='yd': m1 = 0.9144
-        if oldstr=='mi': m1 = 1609.34
-                
-        m2 = 0.0
-        if newstr=='mm': m2 = 1000.0 
-        if newstr=='cm': m2 = 100.0 
-        if newstr=='m' : m2 = 1.0 
-        if newstr=='km': m2 = 0.001 
-        if newstr=='in': m2 = 39.3701
-        if newstr=='ft': m2 = 3.28084
-        if newstr=='yd': m2 = 1.09361
-        if newstr=='mi': m2 = 0.0006214
-                
-        mult = m1 * m2
-        if mult > 0.0:
-            return [MISSING_REAL if v<-9.8e20 else v * mult for v in values]
-        else:
-            raise Exception('Invalid conversion specified: ' + oldstr 
-                          + '->' + newstr)
+    try:
+        return np.multiply(to_array(values, copy=False), 
+                           unitFactor('linear', oldstr, newstr))
     except:
-        raise Exception('Error converting ', + oldstr + '->' + newstr)
-        
+        raise Exception('Error converting ' + oldstr + '->' + newstr)
+
+
 #-------------------------------------------------------
-#  values = list of data values
-#           Any value < -9.9e20 is considered "missing"
+#  values = list or array of data values
+#           Any value < -9.8e20 (or NaN) is considered "missing"
+#  Returns a float64 numpy array, with NaN for each missing value.
 #  oldstr = unit string for incoming data (e.g. 'mm2', 'm2', 'ft2')
 #  newstr = unit string for outgoing data (e.g. 'mm2', 'm2', 'ft2')
 #-------------------------------------------------------
 def arealConvert(values=None, oldstr=None, newstr=None):
-    if not values: return None
+    if values is None or len(values) == 0: return None
     if not oldstr: return None
     if not newstr: return None
     if not isinstance(oldstr, str):
@@ -276,49 +616,22 @@ def arealConvert(values=None, oldstr=None, newstr=None):
     if not isinstance(newstr, str):
         raise Exception('Invalid new units specification in arealConvert.')
 
-    try:    
-        #
-        #  Determine the conversion factor...
-        #  m1 = old units -> square meters
-        #  m2 = square meters -> new units
-        #
-        m1 = 0.0
-        if oldstr=='mm2': m1 = 1.0e-6 
-        if oldstr=='cm2': m1 = 0.0001
-        if oldstr=='m2' : m1 = 1.0 
-        if oldstr=='km2': m1 = 1.0e+6 
-        if oldstr=='in2': m1 = 0.00064516
-        if oldstr=='ft2': m1 = 0.092903
-        if oldstr=='yd2': m1 = 0.836127
-        if oldstr=='mi2': m1 = 2.59e+6
-                
-        m2 = 0.0
-        if newstr=='mm2': m2 = 1.0e+6 
-        if newstr=='cm2': m2 = 10000.0 
-        if newstr=='m2' : m2 = 1.0 
-        if newstr=='km2': m2 = 1.0e-6 
-        if newstr=='in2': m2 = 1550
-        if newstr=='ft2': m2 = 10.7639
-        if newstr=='yd2': m2 = 1.19599
-        if newstr=='mi2': m2 = 3.861e-7
-                
-        mult = m1 * m2
-        if mult > 0.0:
-            return [MISSING_REAL if v<-9.8e20 else v * mult for v in values]
-        else:
-            raise Exception('Invalid conversion specified: ' + oldstr 
-                          + '->' + newstr)
+    try:
+        return np.multiply(to_array(values, copy=False), 
+                           unitFactor('areal', oldstr, newstr))
     except:
-        raise Exception('Error converting ', + oldstr + '->' + newstr)
-        
+        raise Exception('Error converting ' + oldstr + '->' + newstr)
+
+
 #-------------------------------------------------------
-#  values = list of data values
-#           Any value < -9.9e20 is considered "missing"
+#  values = list or array of data values
+#           Any value < -9.8e20 (or NaN) is considered "missing"
+#  Returns a float64 numpy array, with NaN for each missing value.
 #  oldstr = unit string for incoming data (e.g. 'mm3', 'm3', 'ft3')
 #  newstr = unit string for outgoing data (e.g. 'mm3', 'm3', 'ft3')
 #-------------------------------------------------------
 def cubicConvert(values=None, oldstr=None, newstr=None):
-    if not values: return None
+    if values is None or len(values) == 0: return None
     if not oldstr: return None
     if not newstr: return None
     if not isinstance(oldstr, str):
@@ -326,49 +639,22 @@ def cubicConvert(values=None, oldstr=None, newstr=None):
     if not isinstance(newstr, str):
         raise Exception('Invalid new units specification in cubicConvert.')
 
-    try:    
-        #
-        #  Determine the conversion factor...
-        #  m1 = old units -> cubic meters
-        #  m2 = cubic meters -> new units
-        #
-        m1 = 0.0
-        if oldstr=='mm3': m1 = 1.0e-9 
-        if oldstr=='cm3': m1 = 1.0e-6
-        if oldstr=='m3' : m1 = 1.0 
-        if oldstr=='km3': m1 = 1.0e+9 
-        if oldstr=='in3': m1 = 1.6387e-5
-        if oldstr=='ft3': m1 = 0.0283168
-        if oldstr=='yd3': m1 = 0.764555
-        if oldstr=='mi3': m1 = 4.168e+9
-                
-        m2 = 0.0
-        if newstr=='mm3': m2 = 1.0e+9 
-        if newstr=='cm3': m2 = 1.0e+6 
-        if newstr=='m3' : m2 = 1.0 
-        if newstr=='km3': m2 = 1.0e-9
-        if newstr=='in3': m2 = 61023.7
-        if newstr=='ft3': m2 = 35.3147
-        if newstr=='yd3': m2 = 1.30795
-        if newstr=='mi3': m2 = 2.3991e-10
-                
-        mult = m1 * m2
-        if mult > 0.0:
-            return [MISSING_REAL if v<-9.8e20 else v * mult for v in values]
-        else:
-            raise Exception('Invalid conversion specified: ' + oldstr 
-                          + '->' + newstr)
+    try:
+        return np.multiply(to_array(values, copy=False), 
+                           unitFactor('cubic', oldstr, newstr))
     except:
-        raise Exception('Error converting ', + oldstr + '->' + newstr)
-        
+        raise Exception('Error converting ' + oldstr + '->' + newstr)
+
+
 #-------------------------------------------------------
-#  values = list of data values
-#           Any value < -9.9e20 is considered "missing"
+#  values = list or array of data values
+#           Any value < -9.8e20 (or NaN) is considered "missing"
+#  Returns a float64 numpy array, with NaN for each missing value.
 #  oldstr = unit string for incoming data (e.g. 'cms', 'tcfs' )
 #  newstr = unit string for outgoing data (e.g. 'cms', 'tcfs')
 #-------------------------------------------------------
 def rateConvert(values=None, oldstr=None, newstr=None):
-    if not values: return None
+    if values is None or len(values) == 0: return None
     if not oldstr: return None
     if not newstr: return None
     if not isinstance(oldstr, str):
@@ -376,142 +662,138 @@ def rateConvert(values=None, oldstr=None, newstr=None):
     if not isinstance(newstr, str):
         raise Exception('Invalid new units specification in rateConvert.')
 
-    try:    
-        #
-        #  Determine the conversion factor...
-        #  m1 = old units ->  meters per second
-        #  m2 = meters per second -> new units
-        #
-        m1 = 0.0
-        if oldstr=='cms':   m1 = 1.0
-        if oldstr=='10cms': m1 = 10.0
-        if oldstr=='cfs' :  m1 = 0.0283168
-        if oldstr=='tcfs':  m1 = 28.3168 
-                
-        m2 = 0.0
-        if newstr=='cms':   m2 = 1.0
-        if newstr=='10cms': m2 = 0.1
-        if newstr=='cfs' :  m2 = 35.3147
-        if newstr=='tcfs':  m2 = 0.0353147
-                
-        mult = m1 * m2
-        if mult > 0.0:
-            return [MISSING_REAL if v<-9.8e20 else v * mult for v in values]
-        else:
-            raise Exception('Invalid conversion: ' + oldstr + '->' + newstr)
+    try:
+        return np.multiply(to_array(values, copy=False), 
+                           unitFactor('rate', oldstr, newstr))
     except:
         raise Exception('Error converting ' + oldstr + '->' + newstr)
 
 
 #-------------------------------------------------------
 #  value = data value to be converted
-#            Any value < -9.9e20 is considered "missing"
+#            Any value < -9.8e20 (or NaN) is considered "missing"
+#            and MISSING_REAL is returned for it.
 #  oldu  = unit string for incoming data (e.g. 'cm', 'inch' )
 #  newu  = unit string for outgoing data (e.g. 'cms', 'tcfs')
 #  area  = area in sq meters
 #  secs  = number of seconds over which the linear amount was accumulated
 #-------------------------------------------------------
 def valueLinearToRate(value=None, oldu=None, newu=None, area=None, secs=None):
-    if not value: return None
+    if value is None: return None
     if not oldu:  return None
     if not newu:  return None
     if not area:  return None
     if not secs:  return None
 
     try:
-        v1 = [value]
-        m  = linearConvert(v1, oldu, 'm')
-        vcms = [MISSING_REAL if v<-9.8e20 else v*(area/secs) for v in m]
+        vcms = linearConvert([value], oldu, 'm')
+        vcms *= area / secs
         v2 = rateConvert(vcms, 'cms', newu)
-        return v2[0]
+        return MISSING_REAL if np.isnan(v2[0]) else float(v2[0])
     except:
         raise Exception('Unable to convert ' + oldu + '->' + newu)
 
         
 #-------------------------------------------------------
 #  value = data value to be converted
-#            Any value < -9.9e20 is considered "missing"
+#            Any value < -9.8e20 (or NaN) is considered "missing"
+#            and MISSING_REAL is returned for it.
 #  oldu  = unit string for incoming data (e.g. 'cm3', 'in3' )
 #  newu  = unit string for outgoing data (e.g. 'cms', 'tcfs')
 #  secs  = number of seconds over which the volume was accumulated
 #-------------------------------------------------------
 def valueCubicToRate(value=None, oldu=None, newu=None, secs=None):
-    if not value: return None
+    if value is None: return None
     if not oldu:  return None
     if not newu:  return None
     if not secs:  return None
 
     try:
-        v1 = [value]
-        m3 = cubicConvert(v1, oldu, 'm3')
-        vcms = [MISSING_REAL if v<-9.8e20 else v/secs for v in m3]
+        vcms = cubicConvert([value], oldu, 'm3')
+        vcms /= secs
         v2 = rateConvert(vcms, 'cms', newu)
-        return v2[0]
+        return MISSING_REAL if np.isnan(v2[0]) else float(v2[0])
     except:
         raise Exception('Unable to convert ' + oldu + '->' + newu)
 
         
 #-------------------------------------------------------
 #  value = data value to be converted
-#            Any value < -9.9e20 is considered "missing"
+#            Any value < -9.8e20 (or NaN) is considered "missing"
+#            and MISSING_REAL is returned for it.
 #  oldu  = unit string for incoming data (e.g. 'cm3', 'in3' )
 #  newu  = unit string for outgoing data (e.g. 'cms', 'tcfs')
 #  secs  = number of seconds over which the volume was accumulated
 #-------------------------------------------------------
 def valueRateToLinear(value=None, oldu=None, newu=None, area=None, secs=None):
-    if not value: return None
+    if value is None: return None
     if not oldu:  return None
     if not newu:  return None
     if not area:  return None
     if not secs:  return None
 
     try:
-        v1 = [value]
-        vcms = rateConvert(v1, oldu, 'cms')
-        vm = [MISSING_REAL if v<-9.8e20 else v*secs/area for v in vcms]
+        vm = rateConvert([value], oldu, 'cms')
+        vm *= secs / area
         v2 = linearConvert(vm, 'm', newu)
-        return v2[0]
+        return MISSING_REAL if np.isnan(v2[0]) else float(v2[0])
     except:
         raise Exception('Unable to convert ' + oldu + '->' + newu)
 
 #-------------------------------------------------------
 #  value = data value to be converted
-#            Any value < -9.9e20 is considered "missing"
+#            Any value < -9.8e20 (or NaN) is considered "missing"
+#            and MISSING_REAL is returned for it.
 #  oldu  = unit string for incoming data (e.g. 'cm3', 'in3' )
 #  newu  = unit string for outgoing data (e.g. 'cms', 'tcfs')
 #  secs  = number of seconds over which the volume was accumulated
 #-------------------------------------------------------
 def valueRateToCubic(value=None, oldu=None, newu=None, secs=None):
-    if not value: return None
+    if value is None: return None
     if not oldu:  return None
     if not newu:  return None
     if not secs:  return None
 
     try:
-        v1 = [value]
-        vcms = rateConvert(v1, oldu, 'cms')
-        vm3 = [MISSING_REAL if v<-9.8e20 else v*secs for v in vcms]
+        vm3 = rateConvert([value], oldu, 'cms')
+        vm3 *= secs
         v2 = cubicConvert(vm3, 'm3', newu)
-        return v2[0]
+        return MISSING_REAL if np.isnan(v2[0]) else float(v2[0])
     except:
         raise Exception('Unable to convert ' + oldu + '->' + newu)
 
 #-------------------------------------------------------
-#  values = list of data values
-#           Any value < -9.9e20 is considered "missing"
+#  The slice [i:j] of a series starting at oldstart that holds the
+#  periods from the one containing newstart through the one 
+#  containing newend.  When newend is before newstart, the slice is
+#  empty and (0, 0) is returned without looking up either date, which
+#  may be outside the calendar tables (e.g. MISSING_DATE).
+#-------------------------------------------------------
+def trimIndices(oldstart=None, newstart=None, newend=None, intvl=None):
+    if newend < newstart:
+        return 0, 0
+    i = period_offset(oldstart, newstart, intvl)
+    j = period_offset(oldstart, newend, intvl) + 1
+    return i, max(i, j)
+
+#-------------------------------------------------------
+#  values = list or array of data values
+#           Any value < -9.8e20 (or NaN) is considered "missing"
 #  oldstart = starting date for the old data list
 #  oldend   = ending date for the old data list
 #  newstart = starting date for the result data list
 #  newend   = ending date for the result data list
 #  intvl    = interval of the data.  Must be one of the following:
-#             ['dy', 'wk', 'qm', 'mn']
+#             ['dy', 'wk', 'qm', 'mn', 'yr']
 #
 #  The dates must have already been verified to be set such that
 #  oldstart <= newstart  and  newend <= oldend.
+#  The result includes the periods containing both newstart and
+#  newend.  For a numpy array it is a view, not a copy.
 #-------------------------------------------------------
 def trimDataValues(values=None, oldstart=None, oldend=None,
                 newstart=None, newend=None, intvl=None):
-    if not values:   return None
+    if values is None or len(values) == 0: return None
     if not oldstart: return None
     if not oldend:   return None
     if not newstart: return None
@@ -537,47 +819,50 @@ def trimDataValues(values=None, oldstart=None, oldend=None,
     if not ok:
         raise Exception('Invalid date specification for trimDataValues()')
 
-    #
-    #  Transform interval spec into the primary name
-    #
-    ok = False
-    if intvl.lower()=='dy':  ok = True
-    if intvl.lower()=='wk':  ok = True
-    if intvl.lower()=='qm':  ok = True
-    if intvl.lower()=='mn':  ok = True
-    if not ok:
+    if intvl.lower() not in ('dy', 'wk', 'qm', 'mn', 'yr'):
         raise Exception('Invalid interval specified to trimDataValues()')
     
-    #
-    if intvl.lower()=='dy':
-        # index of start/end days
-        d1 = (news-olds).days
-        d2 = (newe-olds).days
-        return values[d1:d2]
-        
-    if intvl.lower()=='mn':
-        # index of start/end months
-        y = news.year - olds.year
-        m = news.month - olds.month
-        m1 = y*12 + m
-        y = newe.year - olds.year
-        m = newe.month - olds.month
-        m2 = y*12 + m + 1
-        return values[m1:m2]
-
-#-------------------------------------------------------
-#  values = list of data values to be converted
-#            Any value < -9.9e20 is considered "missing"
+    i, j = trimIndices(olds, news, newe, intvl.lower())
+    return values[i:j]
+
+#-------------------------------------------------------
+#  Number of seconds in each of n consecutive months, starting with the
+#  month that contains first.  Returned as a float64 numpy array.
+#-------------------------------------------------------
+def month_seconds(first=None, n=0):
+    return period_seconds(first, n, 'mn')
+
+#-------------------------------------------------------
+#  Number of seconds in each period for the rate <-> linear/cubic
+#  converters below.  Daily and weekly periods are all the same 
+#  length, so a scalar is returned.  For the other intervals the
+#  length varies (e.g. February != June), so an array (one entry per
+#  value) is returned.
+#  Returns None for intervals that are not handled.
+#-------------------------------------------------------
+def _period_seconds(intvl, first, n):
+    i = intvl.lower()
+    if i=='dy':
+        return 86400.0
+    if i=='wk':
+        return 604800.0
+    if i in ('qm', 'mn', 'yr'):
+        return period_seconds(first, n, i)
+    return None
+
+#-------------------------------------------------------
+#  values = list or array of data values to be converted
+#            Any value < -9.8e20 (or NaN) is considered "missing"
 #  oldu  = unit string for incoming data (e.g. 'cm', 'in' )
 #  newu  = unit string for outgoing data (e.g. 'cms', 'tcfs')
 #  area  = effective area in square meters
-#  intvl = interval of the data ('dy', 'wk', 'qm', 'mn')
+#  intvl = interval of the data ('dy', 'wk', 'qm', 'mn', 'yr')
 #  first = start date (datetime.date)
 #  last  = end date (datetime.date)
 #-------------------------------------------------------
 def linearToRate(values=None, oldu=None, newu=None, area=None, 
                  intvl=None, first=None, last=None):
-    if not values: return None
+    if values is None or len(values) == 0: return None
     if not oldu:   return None
     if not newu:   return None
     if not area:   return None
@@ -585,54 +870,25 @@ def linearToRate(values=None, oldu=None, newu=None, area=None,
     if not first:  return None
     if not last:   return None
 
-    #
-    #  daily data is relatively clean/easy because each value
-    #  can use the same number of seconds for conversion.
-    #  Thus, we can process it using list comprehension.
-    #
-    if intvl.lower()=='dy':
-        secs = 86400
-        try:
-            m  = linearConvert(values, oldu, 'm')
-            vcms = [MISSING_REAL if v<-9.8e20 else v*(area/secs) for v in m]
-            newv = rateConvert(vcms, 'cms', newu)
-            return newv
-        except:
-            raise Exception('Unable to convert ' + oldu + '->' + newu)
-
-    #
-    #  monthly we just need to determine how many days 
-    #  in each month.
-    #
-    if intvl.lower()=='mn':
-        newv = []
-        y = first.year
-        m = first.month
-        for val in values:
-            d = days_in_month(yr=y, mo=m)
-            secs = d * 86400
-            v2 = valueLinearToRate(value=val, oldu=oldu, 
-                 newu=newu, area=area, secs=secs)
-            newv.append(v2)
-            m += 1
-            if m>12:
-                m = 1
-                y = y + 1
-        return newv
+    try:
+        plan = conversionPlan(oldu, newu, intvl, area)
+        return plan.apply(values, first)
+    except:
+        raise Exception('Unable to convert ' + oldu + '->' + newu)
     
 #-------------------------------------------------------
-#  values = list of data values to be converted
-#            Any value < -9.9e20 is considered "missing"
-#  oldu  = unit string for incoming data (e.g. 'cm', 'in' )
-#  newu  = unit string for outgoing data (e.g. 'cms', 'tcfs')
+#  values = list or array of data values to be converted
+#            Any value < -9.8e20 (or NaN) is considered "missing"
+#  oldu  = unit string for incoming data (e.g. 'cms', 'tcfs')
+#  newu  = unit string for outgoing data (e.g. 'cm', 'in' )
 #  area  = effective area in square meters
-#  intvl = interval of the data ('dy', 'wk', 'qm', 'mn')
+#  intvl = interval of the data ('dy', 'wk', 'qm', 'mn', 'yr')
 #  first = start date (datetime.date)
 #  last  = end date (datetime.date)
 #-------------------------------------------------------
 def rateToLinear(values=None, oldu=None, newu=None, area=None, 
                  intvl=None, first=None, last=None):
-    if not values: return None
+    if values is None or len(values) == 0: return None
     if not oldu:   return None
     if not newu:   return None
     if not area:   return None
@@ -640,148 +896,56 @@ def rateToLinear(values=None, oldu=None, newu=None, area=None,
     if not first:  return None
     if not last:   return None
 
-    #
-    #  daily data is relatively clean/easy because each value
-    #  can use the same number of seconds for conversion.
-    #  Thus, we can process it using list comprehension.
-    #
-    if intvl.lower()=='dy':
-        secs = 86400
-        try:
-            vcms = rateConvert(values, oldu, 'cms')
-            vm = [MISSING_REAL if v<-9.8e20 else v*secs/area for v in vcms]
-            newv = linearConvert(vm, 'm', newu)
-            return newv
-        except:
-            raise Exception('Unable to convert ' + oldu + '->' + newu)
-
-    #
-    #  monthly we just need to determine how many days 
-    #  in each month.
-    #
-    if intvl.lower()=='mn':
-        newv = []
-        y = first.year
-        m = first.month
-        for val in values:
-            d = days_in_month(year=y, month=m)
-            secs = d * 86400
-            v2 = valueRateToLinear(value=val, oldu=oldu, 
-                 newu=newu, area=area, secs=secs)
-            newv.append(v2)
-            m += 1
-            if m>12:
-                m = 1
-                y = y + 1
-        return newv
+    try:
+        plan = conversionPlan(oldu, newu, intvl, area)
+        return plan.apply(values, first)
+    except:
+        raise Exception('Unable to convert ' + oldu + '->' + newu)
     
 #-------------------------------------------------------
-#  values = list of data values to be converted
-#            Any value < -9.9e20 is considered "missing"
+#  values = list or array of data values to be converted
+#            Any value < -9.8e20 (or NaN) is considered "missing"
 #  oldu  = unit string for incoming data (e.g. 'cm3', 'in3' )
 #  newu  = unit string for outgoing data (e.g. 'cms', 'tcfs')
-#  intvl = interval of the data ('dy', 'wk', 'qm', 'mn')
+#  intvl = interval of the data ('dy', 'wk', 'qm', 'mn', 'yr')
 #  first = start date (datetime.date)
 #  last  = end date (datetime.date)
 #-------------------------------------------------------
 def cubicToRate(values=None, oldu=None, newu=None, 
                  intvl=None, first=None, last=None):
-    if not values: return None
+    if values is None or len(values) == 0: return None
     if not oldu:   return None
     if not newu:   return None
     if not intvl:  return None
     if not first:  return None
     if not last:   return None
 
-    #
-    #  daily data is relatively clean/easy because each value
-    #  can use the same number of seconds for conversion.
-    #  Thus, we can process it using list comprehension.
-    #
-    if intvl.lower()=='dy':
-        secs = 86400
-        try:
-            m3 = cubicConvert(values, oldu, 'm3')
-            vcms = [MISSING_REAL if v<-9.8e20 else v/secs for v in m3]
-            newv = rateConvert(vcms, 'cms', newu)
-            return newv
-        except:
-            raise Exception('Unable to convert ' + oldu + '->' + newu)
-
-    #
-    #  monthly we just need to determine how many days 
-    #  in each month.
-    #
-    if intvl.lower()=='mn':
-        newv = []
-        y = first.year
-        m = first.month
-        for val in values:
-            d = days_in_month(yr=y, mo=m)
-            secs = d * 86400
-            v2 = valueCubicToRate(value=val, oldu=oldu, 
-                 newu=newu, secs=secs)
-            newv.append(v2)
-            m += 1
-            if m>12:
-                m = 1
-                y = y + 1
-        return newv
+    try:
+        plan = conversionPlan(oldu, newu, intvl, None)
+        return plan.apply(values, first)
+    except:
+        raise Exception('Unable to convert ' + oldu + '->' + newu)
     
 #-------------------------------------------------------
-#  values = list of data values to be converted
-#            Any value < -9.9e20 is considered "missing"
-#  oldu  = unit string for incoming data (e.g. 'cm3', 'in3' )
-#  newu  = unit string for outgoing data (e.g. 'cms', 'tcfs')
-#  intvl = interval of the data ('dy', 'wk', 'qm', 'mn')
+#  values = list or array of data values to be converted
+#            Any value < -9.8e20 (or NaN) is considered "missing"
+#  oldu  = unit string for incoming data (e.g. 'cms', 'tcfs')
+#  newu  = unit string for outgoing data (e.g. 'cm3', 'in3' )
+#  intvl = interval of the data ('dy', 'wk', 'qm', 'mn', 'yr')
 #  first = start date (datetime.date)
 #  last  = end date (datetime.date)
 #-------------------------------------------------------
 def rateToCubic(values=None, oldu=None, newu=None, 
                 intvl=None, first=None, last=None):
-    if not values: return None
+    if values is None or len(values) == 0: return None
     if not oldu:   return None
     if not newu:   return None
     if not intvl:  return None
     if not first:  return None
     if not last:   return None
 
-    #
-    #  daily data is relatively clean/easy because each value
-    #  can use the same number of seconds for conversion.
-    #  Thus, we can process it using list comprehension.
-    #
-    if intvl.lower()=='dy':
-        secs = 86400
-        try:
-            vcms = rateConvert(values, oldu, 'cms')
-            vm3 = [MISSING_REAL if v<-9.8e20 else v*secs for v in vcms]
-            newv = cubicConvert(vm3, 'm3', newu)
-            return newv
-        except:
-            raise Exception('Unable to convert ' + oldu + '->' + newu)
-
-    #
-    #  monthly we just need to determine how many days 
-    #  in each month.
-    #
-    if intvl.lower()=='mn':
-        newv = []
-        y = first.year
-        m = first.month
-        for val in values:
-            d = days_in_month(yr=y, mo=m)
-            secs = d * 86400
-            v2 = valueRateToCubic(value=val, oldu=oldu, 
-                 newu=newu, secs=secs)
-            newv.append(v2)
-            m += 1
-            if m>12:
-                m = 1
-                y = y + 1
-        return newv
-    
-
-
-
-    
+    try:
+        plan = conversionPlan(oldu, newu, intvl, None)
+        return plan.apply(values, first)
+    except:
+        raise Exception('Unable to convert ' + oldu + '->' + newu)
@@ -169,41 +169,20 @@ the_vault.deposit(nbs)
 
 #
 #  Now I need to know what the overall period of record is for
-#  the data that I stored.  I will retrieve each of the monthly
-#  NBS data sets, and find the overlapping period of record.
+#  the data that I stored, i.e. the period when all of the monthly
+#  NBS data sets have data.  The vault can tell me that without
+#  retrieving any of the data.  trim=False uses each data set's full
+#  period of record, including any missing values at either end.
 #
-#  I don't care about the units because I will not be using the
-#  actual data here, but I have to specify something, so I arbitrarily 
-#  have chosen 'cfs'.
-#
-data_start = datetime.date(1900, 1, 1)      # initialize to far past date
-data_end   = datetime.date(2099, 1, 1)      # initialize to far future date
-
-nbs = the_vault.withdraw(kind='nbs', units='cfs', intvl='mon', loc='sup')
-if nbs.startDate > data_start:
-    data_start = nbs.startDate
-if nbs.endDate < data_end:
-    data_end = nbs.endDate
-
-nbs = the_vault.withdraw(kind='nbs', units='cfs', intvl='mon', loc='mhu')
-if nbs.startDate > data_start:
-    data_start = nbs.startDate
-if nbs.endDate < data_end:
-    data_end = nbs.endDate
-
-
-nbs = the_vault.withdraw(kind='nbs', units='cfs', intvl='mon', loc='stc')
-if nbs.startDate > data_start:
-    data_start = nbs.startDate
-if nbs.endDate < data_end:
-    data_end = nbs.endDate
-
-
-nbs = the_vault.withdraw(kind='nbs', units='cfs', intvl='mon', loc='eri')
-if nbs.startDate > data_start:
-    data_start = nbs.startDate
-if nbs.endDate < data_end:
-    data_end = nbs.endDate
+period = the_vault.common_period([('nbs', 'mon', 'sup'),
+                                  ('nbs', 'mon', 'mhu'),
+                                  ('nbs', 'mon', 'stc'),
+                                  ('nbs', 'mon', 'eri')], trim=False)
+if period is None:
+    print('Insufficient data to run the model.')
+    print('The data files have no period in common.')
+    sys.exit(1)
+data_start, data_end = period
 
 #
 #  Do I have sufficient data stored to run my model for the period that
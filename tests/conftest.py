@@ -0,0 +1,40 @@
+#--------------------------------------------------------------------------------
+#  Shared setup for the databank tests.  The modules live at the top of
+#  the repository rather than in a package, so put that on the path.
+#--------------------------------------------------------------------------------
+import datetime
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import databank
+import databank_util as util
+
+
+#
+#  Path of a file under data/, e.g. data_file('mn', 'tab_monthly.txt').
+#
+def data_file(*parts):
+    return os.path.join(ROOT, 'data', *parts)
+
+
+#
+#  A DataSeries of daily runoff at Lake Superior, in cms.
+#
+def daily(values, first='2000-01-01', last=None, loc='sup', kind='run',
+          units='cms'):
+    d0 = util.date_from_entry(first)
+    if last is None:
+        last = d0 + datetime.timedelta(days=len(values) - 1)
+    return databank.DataSeries(kind=kind, units=units, intvl='dy', loc=loc,
+                               first=d0, last=last, values=values)
+
+
+@pytest.fixture
+def vault():
+    return databank.DataVault()
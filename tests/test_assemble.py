@@ -0,0 +1,63 @@
+import datetime
+import random
+
+import numpy as np
+import pytest
+
+import databank_util as util
+from databank import DataSeries
+from conftest import daily
+
+M = util.MISSING_REAL
+
+
+def fragments():
+    return [daily([1, 2, 3], first='2000-01-01'),
+            daily([5, 6], first='2000-01-01'),
+            daily([M, 7], first='2000-01-02'),
+            daily([9], first='2000-01-08')]
+
+
+@pytest.mark.parametrize('precedence, expected', [
+    ('last',       [5.0, M, 7.0, M, M, M, M, 9.0]),
+    ('first',      [1.0, 2.0, 3.0, M, M, M, M, 9.0]),
+    ('nonmissing', [5.0, 6.0, 7.0, M, M, M, M, 9.0]),
+])
+def test_precedence(precedence, expected):
+    ds = DataSeries.assemble(fragments(), precedence)
+    assert ds.startDate == datetime.date(2000, 1, 1)
+    assert ds.endDate == datetime.date(2000, 1, 8)
+    assert ds.dataVals == expected
+
+
+def test_same_as_add_data_in_order():
+    frags = fragments()
+    one = frags[0].copy()
+    for f in frags[1:]:
+        one.add_data(f)
+    assert DataSeries.assemble(fragments()).dataVals == one.dataVals
+
+
+@pytest.mark.parametrize('precedence', ['last', 'first', 'nonmissing'])
+def test_add_data_many_counts_stored_data_first(precedence):
+    frags = fragments()
+    ds = frags[0].copy()
+    ds.add_data_many(frags[1:], precedence)
+    assert ds.dataVals == DataSeries.assemble(fragments(), precedence).dataVals
+
+
+def test_order_of_disjoint_fragments_does_not_matter():
+    frags = [daily([float(k)], first=datetime.date(2000, 1, 1)
+                   + datetime.timedelta(days=k)) for k in range(50)]
+    random.Random(1).shuffle(frags)
+    np.testing.assert_array_equal(DataSeries.assemble(frags).dataArray,
+                                  np.arange(50.0))
+
+
+def test_errors():
+    with pytest.raises(Exception):
+        DataSeries.assemble([])
+    with pytest.raises(TypeError):
+        DataSeries.assemble([daily([1]), daily([1], loc='eri')])
+    with pytest.raises(Exception):
+        DataSeries.assemble(fragments(), 'middle')
@@ -0,0 +1,147 @@
+import calendar
+import datetime as dt
+
+import numpy as np
+import pytest
+
+import databank_calendar as cal
+import databank_util as util
+from databank import DataSeries, DataVault
+
+
+@pytest.fixture(autouse=True)
+def restore_range():
+    first, last = cal.year_range()
+    yield
+    cal.set_year_range(first, last)
+
+
+def quarter(d):
+    n = calendar.monthrange(d.year, d.month)[1]
+    for q, (a, b) in enumerate(cal.qtr_month_start_end_days[n - 28]):
+        if d.day <= b:
+            return q + 1
+
+
+DAYS = [dt.date(1996, 1, 1) + dt.timedelta(k) for k in range(0, 3000, 5)]
+
+
+def test_period_numbers_match_the_dates():
+    o = cal.ordinals(DAYS)
+    mn = cal.month_number(o)
+    qm = cal.qm_number(o)
+    yr = cal.year_number(o)
+    assert mn.dtype == np.int64
+    for d, m, q, y in zip(DAYS, mn, qm, yr):
+        assert m == d.year*12 + d.month - 1
+        assert q == m*4 + quarter(d) - 1
+        assert y == d.year
+
+
+def test_scalar_ordinals_give_ints():
+    o = dt.date(2000, 3, 5).toordinal()
+    assert cal.month_number(o) == 2000*12 + 2
+    assert type(cal.month_number(o)) is int
+    assert type(cal.qm_number(o)) is int
+
+
+def test_weeks_run_friday_to_thursday():
+    fri = dt.date(2000, 1, 7).toordinal()
+    assert cal.friday_ordinal(fri) == fri
+    assert cal.friday_ordinal(fri + 6) == fri
+    assert cal.friday_ordinal(fri + 7) == fri + 7
+    w = cal.week_number(np.arange(fri, fri + 14))
+    assert (w[:7] == w[0]).all() and (w[7:] == w[0] + 1).all()
+
+
+@pytest.mark.parametrize('intvl', ['dy', 'wk', 'qm', 'mn', 'yr'])
+def test_period_start_and_days(intvl):
+    o = cal.ordinals(DAYS)
+    p = cal.period_number(o, intvl)
+    s = cal.period_start(p, intvl)
+    n = cal.period_days(p, intvl)
+    assert (s <= o).all() and (o < s + n).all()
+    assert (cal.period_number(s, intvl) == p).all()
+    assert (cal.period_number(s - 1, intvl) == p - 1).all()
+
+
+def test_scalar_helpers_match_the_calendar():
+    for y in (1900, 2000, 2001, 2004):
+        for m in range(1, 13):
+            n = calendar.monthrange(y, m)[1]
+            assert cal.days_in_month(y, m) == n
+            assert util.days_in_month(y, m) == n
+            assert cal.qtr_month_start_end(y, m, 4) == (
+                cal.qtr_month_start_end_days[n - 28][3])
+    assert cal.qtr_of_day(2000, 2, 29) == 4
+    assert cal.qtr_of_day(2000, 2, 15) == 3
+
+
+def test_datetimes_round_trip():
+    a = np.array(DAYS, dtype='datetime64[D]')
+    o = cal.ordinals(a)
+    assert (o == cal.ordinals(DAYS)).all()
+    assert (cal.datetimes(o) == a).all()
+
+
+def test_tables_extend_for_dates_outside_the_range():
+    cal.set_year_range(1990, 2010)
+    o = dt.date(2030, 6, 1).toordinal()
+    assert cal.month_number(o) == 2030*12 + 5
+    first, last = cal.year_range()
+    assert first == 1990 and 2030 <= last <= cal.MAX_YEAR
+
+
+def test_set_year_range():
+    cal.set_year_range(1950, 1960)
+    assert cal.year_range() == (1950, 1960)
+    for first, last in ((1960, 1950), (0, 10), (1950, 9999), (None, 1960)):
+        with pytest.raises(Exception):
+            cal.set_year_range(first, last)
+    assert cal.year_range() == (1950, 1960)
+
+
+def test_far_off_dates_are_rejected():
+    before = cal.year_range()
+    with pytest.raises(Exception, match='outside the range'):
+        cal.month_number(util.MISSING_DATE.toordinal())
+    with pytest.raises(Exception, match='outside the range'):
+        cal.qm_number(np.array([dt.date(2000, 1, 1).toordinal(),
+                                dt.date(5, 1, 1).toordinal()]))
+    with pytest.raises(Exception, match='outside the range'):
+        cal.days_in_month(cal.MAX_YEAR + 1, 1)
+    with pytest.raises(Exception, match='Invalid day ordinal'):
+        cal.year_number(0)
+    assert cal.year_range() == before
+
+
+def test_wider_range_can_be_set_up_front():
+    cal.set_year_range(1000, 3000)
+    assert cal.year_number(dt.date(2999, 12, 31).toordinal()) == 2999
+    assert cal.days_in_month(1100, 2) == 28
+
+
+#
+#  A withdrawal that selects nothing must not look up its dates, which
+#  may be MISSING_DATE or beyond the tables; a date that can't be read
+#  is rejected by withdraw() itself.
+#
+def test_empty_withdrawals_look_up_no_dates():
+    v = DataVault()
+    v.deposit(DataSeries(kind='nbs', units='cms', intvl='qm', loc='sup',
+                         first='2000-01-01', last='2000-01-31',
+                         values=[1, 2, 3, 4]))
+    v.deposit(DataSeries(kind='nbs', units='cms', intvl='mn', loc='sup',
+                         first='2000-01-01', last='2000-02-29',
+                         values=[1, 2]))
+    far = dt.date(cal.MAX_YEAR + 1, 1, 1)
+    assert util.trimIndices(dt.date(2000, 1, 1), util.MISSING_DATE,
+                            dt.date(2000, 1, 31), 'qm') == (0, 0)
+    assert len(util.period_seconds(util.MISSING_DATE, 0, 'mn')) == 0
+    for intvl, units in (('qm', 'cms'), ('mn', 'mm')):
+        kw = dict(kind='nbs', units=units, intvl=intvl, loc='sup')
+        assert len(v.withdraw(first=far, **kw)) == 0
+        assert len(v.withdraw(first=far, lazy=True, **kw)) == 0
+        for bad in (dict(first='junk'), dict(last='junk')):
+            with pytest.raises(Exception, match='DataVault.withdraw'):
+                v.withdraw(**dict(kw, **bad))
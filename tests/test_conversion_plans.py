@@ -0,0 +1,66 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import databank_util as util
+
+M = util.MISSING_REAL
+
+
+@pytest.mark.parametrize('dim, units', [('linear', util.linear_units),
+                                        ('areal', util.areal_units),
+                                        ('cubic', util.cubic_units),
+                                        ('rate', util.rate_units)])
+def test_factor_tables_round_trip(dim, units):
+    for a, b in itertools.permutations(units, 2):
+        f = util.unitFactor(dim, a, b)
+        assert f * util.unitFactor(dim, b, a) == pytest.approx(1.0, rel=1e-3)
+    assert util.unitFactor(dim, units[0], units[0]) == pytest.approx(1.0)
+
+
+def test_known_factors():
+    assert util.unitFactor('linear', 'm', 'mm') == 1000.0
+    assert util.unitFactor('rate', 'cms', '10cms') == 0.1
+    assert util.unitFactor('linear', 'ft', 'm') == pytest.approx(0.3048)
+    with pytest.raises(Exception):
+        util.unitFactor('linear', 'm', 'cms')
+
+
+def test_same_dimension_conversion_keeps_missing():
+    out = util.linearConvert([1.0, M, 2.0], 'm', 'cm')
+    np.testing.assert_array_equal(out, [100.0, np.nan, 200.0])
+    out = util.convertValues([1.0, M], oldunits='cms', newunits='tcfs')
+    np.testing.assert_allclose(out, [0.0353147, np.nan])
+
+
+def test_rate_to_depth_uses_area_and_seconds():
+    area = 8.21e10
+    out = util.convertValues([1.0, 2.0], oldunits='cms', newunits='mm',
+                             area=area, intvl='dy')
+    np.testing.assert_allclose(out, np.array([1.0, 2.0]) * 86400 / area
+                               * 1000)
+    back = util.convertValues(out, oldunits='mm', newunits='cms', area=area,
+                              intvl='dy')
+    np.testing.assert_allclose(back, [1.0, 2.0])
+
+
+def test_plans_are_cached_without_the_area():
+    util._unit_plan.cache_clear()
+    for area in np.linspace(1e9, 1e11, 50):
+        plan = util.conversionPlan('cms', 'mm', 'dy', area)
+        assert plan.factor == pytest.approx(1000.0 / area)
+    info = util._unit_plan.cache_info()
+    assert info.currsize == 1 and info.hits == 49
+    assert info.maxsize is not None
+    assert util.conversionPlan('cms', 'cfs') is util.conversionPlan('cms',
+                                                                    'cfs')
+
+
+def test_invalid_conversions():
+    with pytest.raises(Exception):
+        util.conversionPlan('cm', 'ft3', 'dy')
+    with pytest.raises(Exception):
+        util.conversionPlan('m2', 'cms', 'dy', 1.0)
+    with pytest.raises(Exception):
+        util.conversionPlan(None, 'cms')
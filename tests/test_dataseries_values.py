@@ -0,0 +1,44 @@
+import numpy as np
+
+import databank_util as util
+from conftest import daily
+
+
+def test_values_are_float64_with_nan_for_missing():
+    ds = daily([1, util.MISSING_REAL, 3])
+    assert ds.dataArray.dtype == np.float64
+    assert np.isnan(ds.dataArray[1])
+    assert ds.missingMask().tolist() == [False, True, False]
+
+
+def test_list_access_returns_missing_real():
+    ds = daily([1.5, util.MISSING_REAL, 3.0])
+    assert ds.dataVals == [1.5, util.MISSING_REAL, 3.0]
+    assert ds[1] == util.MISSING_REAL
+    assert ds[0:2] == [1.5, util.MISSING_REAL]
+    assert list(ds) == ds.dataVals
+    assert len(ds) == 3
+
+
+def test_dataVals_copies_and_dataArray_adopts():
+    vals = np.array([1.0, 2.0, 3.0])
+    ds = daily([0, 0, 0])
+    ds.dataVals = vals
+    vals[0] = 99.0
+    assert ds[0] == 1.0
+    ds.dataArray = vals
+    assert ds.dataArray is vals
+
+
+def test_copy_is_independent():
+    ds = daily([1, 2, 3])
+    cp = ds.copy()
+    cp.dataArray[0] = 7.0
+    assert ds[0] == 1.0
+    assert cp.startDate == ds.startDate and cp.endDate == ds.endDate
+
+
+def test_withdraw_round_trip(vault):
+    vault.deposit(daily([1, 2, util.MISSING_REAL, 4]))
+    ds = vault.withdraw(kind='run', units='cms', intvl='dy', loc='sup')
+    assert ds.dataVals == [1.0, 2.0, util.MISSING_REAL, 4.0]
@@ -0,0 +1,139 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+import databank_io
+import databank_util as util
+from databank import DataSeries, DataVault
+from conftest import data_file
+
+d = util.date_from_entry
+
+
+@pytest.mark.parametrize('intvl, base, date, offset', [
+    ('dy', '2000-02-28', '2000-03-01', 2),
+    ('wk', '2000-01-07', '2000-01-13', 0),
+    ('wk', '2000-01-07', '2000-01-14', 1),
+    ('wk', '2000-01-13', '2000-01-14', 1),
+    ('qm', '2000-01-01', '2000-01-08', 0),
+    ('qm', '2000-01-01', '2000-01-09', 1),
+    ('qm', '2000-01-01', '2000-03-01', 8),
+    ('mn', '2001-01-15', '2001-03-02', 2),
+    ('yr', '2000-12-31', '2001-01-01', 1),
+    ('mn', '2001-03-02', '2001-01-15', -2),
+])
+def test_period_offset(intvl, base, date, offset):
+    assert util.period_offset(d(base), d(date), intvl) == offset
+
+
+@pytest.mark.parametrize('intvl, base, n, start, end', [
+    ('dy', '2000-02-28', 1, '2000-02-29', '2000-02-29'),
+    ('wk', '2000-01-12', 0, '2000-01-07', '2000-01-13'),
+    ('qm', '2000-02-20', 1, '2000-02-22', '2000-02-29'),
+    ('qm', '2000-02-20', -3, '2000-01-24', '2000-01-31'),
+    ('mn', '2000-11-15', 3, '2001-02-01', '2001-02-28'),
+    ('yr', '2000-06-01', -1, '1999-01-01', '1999-12-31'),
+])
+def test_period_start_and_end(intvl, base, n, start, end):
+    assert util.period_start(d(base), n, intvl) == d(start)
+    assert util.period_end(d(base), n, intvl) == d(end)
+
+
+@pytest.mark.parametrize('intvl', ['dy', 'wk', 'qm', 'mn', 'yr'])
+def test_period_dates_agree_with_period_start(intvl):
+    first = d('1999-12-20')
+    got = util.period_dates(first, 30, intvl)
+    expected = [util.period_start(first, k, intvl) for k in range(30)]
+    assert got.tolist() == expected
+    assert util.num_periods(expected[0], expected[-1], intvl) == 30
+
+
+@pytest.mark.parametrize('intvl, first, last, newstart, newend, ij', [
+    ('dy', '2000-01-01', '2000-01-10', '2000-01-03', '2000-01-10', (2, 10)),
+    ('wk', '2000-01-07', '2000-02-24', '2000-01-15', '2000-01-28', (1, 4)),
+    ('qm', '2000-01-01', '2000-03-31', '2000-02-01', '2000-02-29', (4, 8)),
+    ('mn', '2000-01-01', '2000-12-31', '2000-03-31', '2000-05-01', (2, 5)),
+    ('yr', '1990-01-01', '1999-12-31', '1995-07-01', '1995-07-01', (5, 6)),
+])
+def test_trim_data_values_every_interval(intvl, first, last, newstart,
+                                         newend, ij):
+    n = util.num_periods(d(first), d(last), intvl)
+    values = np.arange(n, dtype=np.float64)
+    got = util.trimDataValues(values, first, last, newstart, newend, intvl)
+    assert got.tolist() == values[ij[0]:ij[1]].tolist()
+    assert got.base is values
+
+
+def test_trim_data_values_keeps_the_last_day():
+    got = util.trimDataValues([1, 2, 3, 4, 5], '2000-01-01', '2000-01-05',
+                              '2000-01-02', '2000-01-05', 'dy')
+    assert got == [2, 3, 4, 5]
+
+
+def test_trim_data_values_rejects_bad_input():
+    assert util.trimDataValues([], '2000-01-01', '2000-01-05',
+                               '2000-01-02', '2000-01-05', 'dy') is None
+    with pytest.raises(Exception):
+        util.trimDataValues([1, 2], '2000-01-01', '2000-01-02',
+                            '2000-01-01', '2000-01-02', 'hr')
+    with pytest.raises(Exception):
+        util.trimDataValues([1, 2], '2000-01-01', '2000-01-02',
+                            util.MISSING_DATE, '2000-01-02', 'dy')
+
+
+@pytest.mark.parametrize('intvl, first, last', [
+    ('dy', '2000-01-01', '2000-01-10'),
+    ('wk', '2000-01-07', '2000-02-24'),
+    ('qm', '2000-01-01', '2000-03-31'),
+    ('mn', '2000-01-01', '2000-12-31'),
+    ('yr', '1990-01-01', '1999-12-31'),
+])
+def test_trim_data_values_invalid_or_missing_bounds(intvl, first, last):
+    n = util.num_periods(d(first), d(last), intvl)
+    values = np.arange(n, dtype=np.float64)
+    for bounds in ((None, last), (first, None), ('', last), (first, '')):
+        assert util.trimDataValues(values, first, last, *bounds,
+                                   intvl=intvl) is None
+    for bounds in (('junk', last), (first, 'junk'),
+                   (util.MISSING_DATE, last), (first, util.MISSING_DATE)):
+        with pytest.raises(Exception, match='Invalid date specification'):
+            util.trimDataValues(values, first, last, *bounds, intvl=intvl)
+    assert len(util.trimDataValues(values, first, last, last, first,
+                                   intvl)) == 0
+    assert util.trimIndices(d(first), util.MISSING_DATE, d(last),
+                            intvl) == (0, 0)
+
+
+@pytest.mark.parametrize('intvl, first, last', [
+    ('wk', '2000-01-07', '2000-06-29'),
+    ('qm', '2000-01-01', '2000-03-31'),
+    ('mn', '2000-01-01', '2000-12-31'),
+    ('yr', '1990-01-01', '1999-12-31'),
+])
+def test_withdraw_widens_to_whole_periods(intvl, first, last):
+    n = util.num_periods(d(first), d(last), intvl)
+    v = DataVault()
+    v.deposit(DataSeries(kind='flw', units='cms', intvl=intvl, loc='det',
+                         first=first, last=last, values=list(range(n))))
+    lo = d(first) + dt.timedelta(days=40)
+    hi = d(last) - dt.timedelta(days=40)
+    ds = v.withdraw(kind='flw', units='cms', intvl=intvl, loc='det',
+                    first=lo, last=hi)
+    i = util.period_offset(d(first), lo, intvl)
+    j = util.period_offset(d(first), hi, intvl) + 1
+    assert ds.startDate == util.period_start(lo, 0, intvl)
+    assert ds.endDate == util.period_end(hi, 0, intvl)
+    assert ds.dataVals == [float(k) for k in range(i, j)]
+
+
+@pytest.mark.parametrize('parts', [
+    ('wk', 'weekly.txt'),
+    ('wk', 'despr_new.txt'),
+    ('qm', 'qm_col.txt'),
+    ('qm', 'classic_mon.txt'),
+])
+def test_parsed_series_cover_their_dates(parts):
+    ds = databank_io.read_file(data_file(*parts))
+    assert len(ds) == util.num_periods(ds.startDate, ds.endDate,
+                                       ds.dataInterval)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from databank import DataSeries, DataVault
+from conftest import daily
+
+
+def monthly(values, first='2000-01-01', last='2000-03-31', units='mm',
+            loc='sup'):
+    return DataSeries(kind='nbs', units=units, intvl='mn', loc=loc,
+                      first=first, last=last, values=values)
+
+
+def series_list():
+    return [daily([1, 2, 3], loc='sup', units='cfs'),
+            daily([4, 5], loc='eri'),
+            daily([9], first='2000-01-02', loc='sup', units='cfs'),
+            monthly([10, 20, 30]),
+            monthly([1, 2, 3], loc='eri', units='m')]
+
+
+def contents(v):
+    return dict((k, (ds.startDate, ds.endDate, ds.dataArray.tolist()))
+                for k, ds in v.vault.items())
+
+
+def test_same_result_as_deposit_in_order():
+    one = DataVault()
+    for ds in series_list():
+        one.deposit(ds)
+    many = DataVault()
+    many.deposit_many(series_list())
+    a, b = contents(one), contents(many)
+    assert sorted(a) == sorted(b)
+    for k in a:
+        assert a[k][:2] == b[k][:2]
+        np.testing.assert_allclose(a[k][2], b[k][2])
+
+
+def test_merges_into_existing_series():
+    v = DataVault()
+    v.deposit(daily([1, 2, 3]))
+    v.deposit_many([daily([7], first='2000-01-04'),
+                    daily([8], first='2000-01-01')])
+    assert v.withdraw(kind='run', units='cms', intvl='dy',
+                      loc='sup').dataVals == [8.0, 2.0, 3.0, 7.0]
+
+
+@pytest.mark.parametrize('precedence, expected', [
+    ('last',  [5.0, 6.0, 3.0]),
+    ('first', [1.0, 2.0, 3.0]),
+])
+def test_precedence(precedence, expected):
+    v = DataVault()
+    v.deposit_many([daily([1, 2, 3]), daily([5, 6])], precedence=precedence)
+    assert v.withdraw(kind='run', units='cms', intvl='dy',
+                      loc='sup').dataVals == expected
+
+
+def test_stored_series_do_not_share_the_group_array():
+    v = DataVault()
+    v.deposit_many([daily([1, 2], loc=loc) for loc in ('sup', 'eri', 'ont')])
+    for ds in v.vault.values():
+        assert ds.dataArray.base is None
+
+
+def test_bad_precedence():
+    with pytest.raises(Exception):
+        DataVault().deposit_many([daily([1])], precedence='middle')
+
+
+#
+#  A series whose values don't match its dates is rejected even when it
+#  is the first one for its key, rather than stored and merged wrongly
+#  later.
+#
+def test_first_deposit_checks_the_length():
+    v = DataVault()
+    with pytest.raises(Exception):
+        v.deposit(daily([1, 2, 3], last='2000-01-10'))
+    with pytest.raises(Exception):
+        v.deposit_many([daily([4, 5], loc='eri'),
+                        daily([1, 2, 3], last='2000-01-10')])
+    assert v.vault == {}
@@ -0,0 +1,67 @@
+import pytest
+
+from databank import DataVault
+from conftest import daily
+
+
+def values(v, loc='sup'):
+    return v.withdraw(kind='run', units='cms', intvl='dy', loc=loc).dataVals
+
+
+@pytest.fixture
+def base():
+    v = DataVault()
+    v.deposit(daily([1, 2, 3], loc='sup'))
+    v.deposit(daily([4, 5, 6], loc='eri'))
+    return v
+
+
+def test_fork_shares_until_written(base):
+    child = base.fork()
+    k = base.find(loc='sup')[0]
+    assert child.vault[k] is base.vault[k]
+    child.deposit(daily([9], loc='sup'))
+    assert child.vault[k] is not base.vault[k]
+    assert values(child) == [9.0, 2.0, 3.0]
+    assert values(base) == [1.0, 2.0, 3.0]
+
+
+def test_parent_changes_do_not_reach_the_fork(base):
+    child = base.fork()
+    base.deposit(daily([7], first='2000-01-04', loc='eri'))
+    assert values(base, 'eri') == [4.0, 5.0, 6.0, 7.0]
+    assert values(child, 'eri') == [4.0, 5.0, 6.0]
+
+
+def test_new_series_in_a_fork(base):
+    child = base.fork()
+    child.deposit(daily([1], loc='ont'))
+    assert len(child.find()) == 3
+    assert len(base.find()) == 2
+
+
+def test_rollback_restores_contents(base):
+    snap = base.snapshot()
+    base.deposit(daily([0], loc='sup'))
+    base.deposit(daily([0], loc='ont'))
+    base.rollback(snap)
+    assert values(base) == [1.0, 2.0, 3.0]
+    assert len(base.find()) == 2
+    base.deposit(daily([8], loc='sup'))
+    base.rollback(snap)
+    assert values(base) == [1.0, 2.0, 3.0]
+
+
+def test_rollback_clears_the_cache():
+    v = DataVault(cache_size=4)
+    v.deposit(daily([1, 2]))
+    snap = v.snapshot()
+    v.deposit(daily([5]))
+    assert values(v) == [5.0, 2.0]
+    v.rollback(snap)
+    assert values(v) == [1.0, 2.0]
+
+
+def test_rollback_requires_a_snapshot(base):
+    with pytest.raises(Exception):
+        base.rollback(base.fork())
@@ -0,0 +1,98 @@
+import datetime
+import random
+
+import numpy as np
+import pytest
+
+import databank_util as util
+from databank import DataSeries, DataVault, _GapIndex
+from conftest import daily
+
+M = util.MISSING_REAL
+
+
+def brute_missing(values, i, j):
+    return sum(1 for k in range(i, j)
+               if k < 0 or k >= len(values) or np.isnan(values[k]))
+
+
+def random_values(rng, n):
+    return np.where(rng.random(n) < 0.4, np.nan, 1.0)
+
+
+def test_missing_counts_match_a_scan():
+    rng = np.random.default_rng(3)
+    for n in (0, 1, 7, 50):
+        vals = random_values(rng, n)
+        gaps = _GapIndex.build(vals)
+        for i in range(-3, n + 3):
+            for j in range(i, n + 4):
+                assert gaps.missing(i, j) == brute_missing(vals, i, j)
+
+
+def test_first_and_last_present():
+    gaps = _GapIndex.build(np.array([np.nan, 1, np.nan, 2, np.nan]))
+    assert (gaps.first_present(), gaps.last_present()) == (1, 3)
+    empty = _GapIndex.build(np.array([np.nan, np.nan]))
+    assert empty.first_present() is None and empty.last_present() is None
+
+
+def test_merges_keep_the_index_current():
+    rng = random.Random(5)
+    nrng = np.random.default_rng(5)
+    ds = daily(random_values(nrng, 10), first='2000-01-10')
+    ds.gapIndex()
+    for _ in range(30):
+        start = datetime.date(2000, 1, 1) + datetime.timedelta(rng.randrange(40))
+        frag = daily(random_values(nrng, rng.randrange(1, 8)), first=start)
+        ds.add_data(frag)
+        built = _GapIndex.build(ds.dataArray)
+        assert ds._gaps is not None
+        assert ds._gaps.starts.tolist() == built.starts.tolist()
+        assert ds._gaps.ends.tolist() == built.ends.tolist()
+
+
+@pytest.fixture
+def filled():
+    v = DataVault()
+    v.deposit(daily([M, 1, 2, 3, M], first='2000-01-01', loc='sup'))
+    v.deposit(daily([4, 5, 6, 7], first='2000-01-03', loc='eri'))
+    return v
+
+
+def test_common_period(filled):
+    keys = [('run', 'dy', 'sup'), ('run', 'dy', 'eri')]
+    assert filled.common_period(keys) == (datetime.date(2000, 1, 3),
+                                          datetime.date(2000, 1, 4))
+    assert filled.common_period(keys, trim=False) == \
+           (datetime.date(2000, 1, 3), datetime.date(2000, 1, 5))
+    filled.deposit(daily([8], first='2000-02-01', loc='ont'))
+    assert filled.common_period(keys + [('run', 'dy', 'ont')]) is None
+
+
+def test_coverage(filled):
+    c = filled.coverage(('run', 'dy', 'sup'))
+    assert (c['periods'], c['present'], c['missing']) == (5, 3, 2)
+    assert c['fraction'] == pytest.approx(0.6)
+    c = filled.coverage(('run', 'dy', 'sup'), first='1999-12-31',
+                        last='2000-01-02')
+    assert (c['periods'], c['present']) == (3, 1)
+
+
+def test_monthly_coverage_widens_to_whole_months():
+    v = DataVault()
+    v.deposit(DataSeries(kind='nbs', units='cms', intvl='mn', loc='sup',
+                         first='1950-01-01', last='1950-04-30',
+                         values=[1, M, 3, 4]))
+    c = v.coverage(('nbs', 'mon', 'sup'), first='1949-12-15',
+                   last='1950-02-10')
+    assert c['first'] == datetime.date(1949, 12, 1)
+    assert c['last'] == datetime.date(1950, 2, 28)
+    assert (c['periods'], c['present']) == (3, 1)
+
+
+def test_unknown_key(filled):
+    with pytest.raises(Exception):
+        filled.coverage(('run', 'dy', 'ont'))
+    with pytest.raises(Exception):
+        filled.common_period([('nbs',)])
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from databank import DataSeries, DataVault
+from conftest import daily
+
+
+def values(v, loc='sup'):
+    return v.withdraw(kind='run', units='cms', intvl='dy', loc=loc).dataVals
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'v.dbv'), str(tmp_path / 'v.jrn')
+
+
+def test_replay_restores_deposits(paths):
+    base, jrn = paths
+    v = DataVault()
+    v.deposit(daily([1, 2, 3]))
+    v.save(base)
+    v.open_journal(jrn)
+    v.deposit(daily([9], first='2000-01-02'))
+    v.deposit_data(kind='nbs', units='mm', intvl='mn', loc='eri',
+                   first='2003-01-01', last='2003-02-28', values=[10, 20])
+    v.close_journal()
+
+    w = DataVault.load(base, journal=jrn)
+    assert values(w) == [1.0, 9.0, 3.0]
+    nbs = w.withdraw(kind='nbs', units='mm', intvl='mn', loc='eri')
+    assert nbs.dataVals == pytest.approx([10.0, 20.0])
+
+
+def test_compact_empties_the_journal(paths):
+    base, jrn = paths
+    v = DataVault()
+    v.save(base)
+    v.open_journal(jrn)
+    v.deposit(daily([1, 2]))
+    size = os.path.getsize(jrn)
+    v.compact(base)
+    assert os.path.getsize(jrn) < size
+    v.deposit(daily([5], first='2000-01-03'))
+    v.close_journal()
+    assert values(DataVault.load(base, journal=jrn)) == [1.0, 2.0, 5.0]
+
+
+def test_incomplete_last_record_is_dropped(paths):
+    base, jrn = paths
+    v = DataVault()
+    v.save(base)
+    v.open_journal(jrn)
+    v.deposit(daily([1, 2]))
+    v.close_journal()
+    with open(jrn, 'ab') as f:
+        f.write(b'\x50\x00\x00\x00abcd')
+    assert values(DataVault.load(base, journal=jrn)) == [1.0, 2.0]
+
+
+def test_failed_merge_is_not_journaled(paths):
+    base, jrn = paths
+    v = DataVault()
+    v.save(base)
+    v.open_journal(jrn)
+    v.deposit(daily([1, 2, 3, 4, 5]))
+    bad = DataSeries(kind='run', units='cms', intvl='dy', loc='sup',
+                     first='2000-01-03', last='2000-01-09', values=[7, 8])
+    with pytest.raises(Exception):
+        v.deposit(bad)
+    v.close_journal()
+    assert values(DataVault.load(base, journal=jrn)) == \
+           [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_open_without_replay(paths):
+    base, jrn = paths
+    v = DataVault()
+    v.open_journal(jrn)
+    v.deposit(daily([1]))
+    v.close_journal()
+    w = DataVault()
+    w.open_journal(jrn, replay=False)
+    assert w.find() == []
+    w.close_journal()
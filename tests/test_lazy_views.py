@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+import databank_util as util
+from databank import DataSeries, DataSeriesView, DataVault
+from conftest import daily
+
+
+@pytest.fixture
+def filled():
+    v = DataVault()
+    v.deposit(daily([1, 2, util.MISSING_REAL, 4, 5]))
+    v.deposit(DataSeries(kind='nbs', units='cms', intvl='mn', loc='sup',
+                         first='2000-01-01', last='2000-04-30',
+                         values=[1, 2, 3, 4]))
+    return v
+
+
+def test_view_matches_eager_withdrawal(filled):
+    kw = dict(kind='run', units='cfs', intvl='dy', loc='sup')
+    view = filled.withdraw(lazy=True, **kw)
+    eager = filled.withdraw(**kw)
+    assert isinstance(view, DataSeriesView)
+    assert len(view) == len(eager)
+    assert view.dataVals == eager.dataVals
+    assert view[2] == util.MISSING_REAL
+    assert view[-1] == eager[-1]
+
+
+def test_period_dependent_view(filled):
+    kw = dict(kind='nbs', units='mm', intvl='mn', loc='sup')
+    view = filled.withdraw(lazy=True, **kw)
+    eager = filled.withdraw(**kw)
+    np.testing.assert_allclose(view.dataArray, eager.dataArray)
+    assert view[1] == pytest.approx(eager[1])
+
+
+@pytest.mark.parametrize('s', [slice(1, 4), slice(None, None, 2),
+                               slice(None, None, -1), slice(3, 1, -1),
+                               slice(4, 1)])
+def test_slices_match_a_list(filled, s):
+    view = filled.withdraw(kind='nbs', units='mm', intvl='mn', loc='sup',
+                           lazy=True)
+    expected = view.dataVals[s]
+    assert view[s] == pytest.approx(expected)
+
+
+def test_view_is_read_only(filled):
+    view = filled.withdraw(kind='run', units='cms', intvl='dy', loc='sup',
+                           lazy=True)
+    with pytest.raises(TypeError):
+        view[0] = 1.0
+    with pytest.raises(IndexError):
+        view[5]
+
+
+def test_deposit_does_not_change_a_view(filled):
+    view = filled.withdraw(kind='run', units='cms', intvl='dy', loc='sup',
+                           lazy=True)
+    filled.deposit(daily([99.0]))
+    assert view[0] == 1.0
+    assert filled.withdraw(kind='run', units='cms', intvl='dy',
+                           loc='sup')[0] == 99.0
+
+
+def test_materialize(filled):
+    view = filled.withdraw(kind='run', units='cms', intvl='dy', loc='sup',
+                           first='2000-01-02', last='2000-01-03', lazy=True)
+    ds = view.materialize()
+    assert isinstance(ds, DataSeries)
+    assert (ds.startDate, ds.endDate) == (view.startDate, view.endDate)
+    assert ds.dataVals == [2.0, util.MISSING_REAL]
+
+
+def test_appending_after_a_view_writes_in_place():
+    v = DataVault()
+    v.deposit(daily([1, 2, 3]))
+    v.deposit(daily([4], first='2000-01-04'))
+    key = v.find(loc='sup')[0]
+    buf = v.vault[key]._buffer._buf
+    view = v.withdraw(kind='run', units='cms', intvl='dy', loc='sup',
+                      lazy=True)
+    v.deposit(daily([5], first='2000-01-05'))
+    v.deposit_many([daily([6], first='2000-01-06')])
+    assert v.vault[key]._buffer._buf is buf
+    assert np.may_share_memory(view._base, buf)
+    assert view.dataVals == [1.0, 2.0, 3.0, 4.0]
+    assert v.withdraw(kind='run', units='cms', intvl='dy',
+                      loc='sup').dataVals == [1, 2, 3, 4, 5, 6]
+
+
+def test_only_views_of_overwritten_days_are_copied():
+    v = DataVault()
+    v.deposit(daily([1, 2, 3, 4]))
+    kw = dict(kind='run', units='cms', intvl='dy', loc='sup', lazy=True)
+    early = v.withdraw(last='2000-01-02', **kw)
+    late = v.withdraw(first='2000-01-03', **kw)
+    vals = v.vault[v.find(loc='sup')[0]].dataArray
+    v.deposit_many([daily([9], first='2000-01-04')])
+    assert np.may_share_memory(early._base, vals)
+    assert not np.may_share_memory(late._base, vals)
+    assert early.dataVals == [1.0, 2.0]
+    assert late.dataVals == [3.0, 4.0]
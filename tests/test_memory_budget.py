@@ -0,0 +1,108 @@
+import gc
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from databank import DataVault
+from conftest import daily
+
+LOCS = ('sup', 'mic', 'hur', 'eri', 'ont', 'stc')
+N = 1000
+
+
+@pytest.fixture
+def budgeted():
+    v = DataVault(memory_budget=2 * 8 * N)
+    data = {}
+    for k, loc in enumerate(LOCS):
+        data[loc] = np.arange(N, dtype=float) + k
+        v.deposit(daily(data[loc], loc=loc))
+    return v, data
+
+
+def test_cold_series_are_spilled(budgeted):
+    v, data = budgeted
+    stats = v.spillStats()
+    assert stats['spills'] >= len(LOCS) - 2
+    assert stats['resident_bytes'] <= stats['budget']
+
+
+def test_withdraw_reloads(budgeted):
+    v, data = budgeted
+    for loc in LOCS:
+        ds = v.withdraw(kind='run', units='cms', intvl='dy', loc=loc)
+        np.testing.assert_array_equal(ds.dataArray, data[loc])
+    assert v.spillStats()['reloads'] > 0
+
+
+def test_spilled_series_from_find_read_normally(budgeted):
+    v, data = budgeted
+    spilled = [ds for ds in v.find(series=True) if ds._values is None]
+    assert spilled
+    for ds in spilled:
+        assert len(ds.dataVals) == N
+        assert ds[1] == ds.dataArray[1]
+        assert list(ds)[:2] == ds.dataVals[:2]
+        assert not ds.missingMask().any()
+
+
+def test_deposit_into_a_spilled_series(budgeted):
+    v, data = budgeted
+    v.deposit(daily([-1.0], loc='sup'))
+    ds = v.withdraw(kind='run', units='cms', intvl='dy', loc='sup')
+    assert ds[0] == -1.0
+    np.testing.assert_array_equal(ds.dataArray[1:], data['sup'][1:])
+
+
+def test_concurrent_withdrawals_reload_once():
+    v = DataVault(memory_budget=8, threadsafe=True)
+    v.deposit(daily(np.arange(100.0), loc='sup'))
+    v.deposit(daily(np.arange(100.0), loc='eri'))
+    assert v.spillStats()['spilled_series'] == 2
+    start = threading.Barrier(8)
+
+    def withdraw():
+        start.wait()
+        v.withdraw(kind='run', units='cms', intvl='dy', loc='sup')
+
+    threads = [threading.Thread(target=withdraw) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert v.spillStats()['reloads'] == 1
+
+
+def test_spill_file_is_removed():
+    v = DataVault(memory_budget=8)
+    v.deposit(daily(np.arange(100.0)))
+    path = v._spillFile.path
+    assert os.path.exists(path)
+    del v
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+def test_resident_bytes_are_kept_current(budgeted):
+    v, data = budgeted
+    v.withdraw(kind='run', units='cms', intvl='dy', loc='sup')
+    v.deposit(daily([1.0, 2.0], loc='eri', first='2002-09-27'))
+    child = v.fork()
+    child.deposit(daily([3.0], loc='hur'))
+    for vault in (v, child):
+        measured = sum(vault._series_bytes(ds) for ds in vault.vault.values())
+        assert vault.spillStats()['resident_bytes'] == measured
+
+
+def test_deposits_within_budget_measure_nothing(monkeypatch):
+    v = DataVault(memory_budget=10**9)
+    v.deposit(daily(np.arange(N, dtype=float), loc='sup'))
+    calls = []
+    measure = DataVault._series_bytes
+    monkeypatch.setattr(DataVault, '_series_bytes',
+                        staticmethod(lambda ds: calls.append(ds) or measure(ds)))
+    for loc in LOCS:
+        v.deposit(daily([1.0], loc=loc))
+    assert len(calls) == len(LOCS)
@@ -0,0 +1,92 @@
+
+import numpy as np
+import pytest
+
+from databank import DataVault
+from conftest import daily
+
+N = 1000
+
+
+@pytest.fixture
+def filled():
+    v = DataVault()
+    v.deposit(daily(np.arange(N, dtype=float), loc='sup'))
+    v.deposit(daily(np.arange(N, dtype=float), loc='eri', kind='nbs'))
+    return v
+
+
+def test_owned_values(filled):
+    rep = filled.memory_report()
+    r = rep['series']['run_dy_su']
+    assert r['values'] == N * 8
+    assert r['shared'] == r['mapped'] == 0
+    assert r['total'] == r['values'] + r['metadata']
+    assert rep['total']['values'] == 2 * N * 8
+    assert rep['by_kind']['nbs']['values'] == N * 8
+    assert rep['by_location']['su']['values'] == N * 8
+    assert rep['by_interval']['dy']['values'] == 2 * N * 8
+
+
+def test_fork_shares_then_overlays(filled):
+    child = filled.fork()
+    assert child.memory_report()['series']['run_dy_su']['shared'] == N * 8
+    child.deposit(daily([1.0], loc='sup'))
+    r = child.memory_report()['series']['run_dy_su']
+    assert r['overlay'] >= N * 8 and r['shared'] == 0
+
+
+def test_lazy_withdrawal_makes_no_overlay(filled):
+    filled.withdraw(kind='run', units='cms', intvl='dy', loc='sup',
+                    lazy=True)
+    filled.deposit(daily([1.0], loc='sup', first='2002-09-27'))
+    t = filled.memory_report()['total']
+    assert t['overlay'] == 0
+    assert t['values'] >= 2 * N * 8 + 8
+
+
+def test_copies_of_mapped_values_are_not_overlays(filled):
+    cat = filled.share()
+    try:
+        v = DataVault.attach(cat)
+        v.deposit(daily([1.0], loc='sup'))
+        r = v.memory_report()['series']['run_dy_su']
+        assert r['overlay'] == 0 and r['values'] >= N * 8
+        del v
+    finally:
+        cat.close()
+        cat.unlink()
+
+
+def test_attached_values_are_mapped(filled):
+    cat = filled.share()
+    try:
+        v = DataVault.attach(cat)
+        t = v.memory_report()['total']
+        assert t['mapped'] == 2 * N * 8
+        assert t['values'] == t['shared'] == 0
+        assert t['total'] == t['metadata']
+        assert DataVault._series_bytes(v.vault[v.find(loc='sup')[0]]) == 0
+        del v
+    finally:
+        cat.close()
+        cat.unlink()
+
+
+def test_spilled_values_are_mapped():
+    v = DataVault(memory_budget=8)
+    v.deposit(daily(np.arange(N, dtype=float)))
+    t = v.memory_report()['total']
+    assert t['mapped'] == N * 8 and t['values'] == 0
+
+
+def test_cache_is_counted():
+    v = DataVault(cache_size=4)
+    v.deposit(daily(np.arange(N, dtype=float)))
+    v.withdraw(kind='run', units='cfs', intvl='dy', loc='sup')
+    assert v.memory_report()['total']['cache'] >= N * 8
+
+
+def test_print(filled, capsys):
+    filled.printMemoryReport()
+    assert 'run_dy_su' in capsys.readouterr().out
@@ -0,0 +1,63 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import databank_util as util
+from databank import DataSeries
+from conftest import daily
+
+
+def monthly(values, first, last):
+    return DataSeries(kind='nbs', units='cms', intvl='mn', loc='sup',
+                      first=first, last=last, values=values)
+
+
+def test_daily_merge_extends_both_ends_with_missing():
+    ds = daily([1, 2, 3], first='2000-01-05')
+    assert ds.add_data(daily([9], first='2000-01-09'))
+    assert ds.add_data(daily([0], first='2000-01-02'))
+    assert ds.startDate == datetime.date(2000, 1, 2)
+    assert ds.endDate == datetime.date(2000, 1, 9)
+    m = util.MISSING_REAL
+    assert ds.dataVals == [0.0, m, m, 1.0, 2.0, 3.0, m, 9.0]
+
+
+def test_monthly_merge_overwrites_overlap():
+    ds = monthly([1, 2, 3], '2000-01-01', '2000-03-31')
+    assert ds.add_data(monthly([8, 9], '2000-03-01', '2000-04-30'))
+    assert ds.dataVals == [1.0, 2.0, 8.0, 9.0]
+    assert ds.endDate == datetime.date(2000, 4, 30)
+
+
+def test_appending_day_by_day_grows_in_place():
+    ds = daily([0.0])
+    d0 = ds.startDate
+    buffers = set()
+    for k in range(1, 500):
+        d = d0 + datetime.timedelta(days=k)
+        ds.add_data(daily([float(k)], first=d))
+        buffers.add(id(ds._buffer._buf))
+    np.testing.assert_array_equal(ds.dataArray, np.arange(500.0))
+    assert len(buffers) < 20
+
+
+def test_read_only_values_are_copied_not_written():
+    vals = np.array([1.0, 2.0])
+    vals.flags.writeable = False
+    ds = daily([0, 0])
+    ds.dataArray = vals
+    ds.add_data(daily([5.0], first='2000-01-03'))
+    assert ds.dataVals == [1.0, 2.0, 5.0]
+    assert vals.tolist() == [1.0, 2.0]
+
+
+def test_length_mismatch_changes_nothing():
+    ds = daily([1, 2, 3, 4, 5])
+    bad = DataSeries(kind='run', units='cms', intvl='dy', loc='sup',
+                     first='2000-01-03', last='2000-01-09', values=[7, 8])
+    with pytest.raises(Exception):
+        ds.add_data(bad)
+    assert len(ds) == 5
+    assert ds.endDate == datetime.date(2000, 1, 5)
+    assert ds.dataVals == [1.0, 2.0, 3.0, 4.0, 5.0]
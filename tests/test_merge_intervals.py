@@ -0,0 +1,85 @@
+import datetime
+
+import pytest
+
+import databank_util as util
+from databank import DataSeries, DataVault
+
+M = util.MISSING_REAL
+
+
+def series(intvl, first, n, values):
+    first = util.date_from_entry(first)
+    return DataSeries(kind='nbs', units='cms', intvl=intvl, loc='sup',
+                      first=first, last=util.period_end(first, n - 1, intvl),
+                      values=values)
+
+
+def test_weekly_merge():
+    ds = series('wk', '2000-01-07', 2, [1, 2])
+    assert ds.add_data(series('wk', '2000-01-28', 1, [4]))
+    assert ds.add_data(series('wk', '1999-12-31', 2, [0, 9]))
+    assert ds.startDate == datetime.date(1999, 12, 31)
+    assert ds.endDate == datetime.date(2000, 2, 3)
+    assert ds.dataVals == [0.0, 9.0, 2.0, M, 4.0]
+
+
+def test_weekly_merge_needs_a_friday():
+    ds = series('wk', '2000-01-07', 1, [1])
+    bad = DataSeries(kind='nbs', units='cms', intvl='wk', loc='sup',
+                     first='2000-01-10', last='2000-01-16', values=[2])
+    assert ds.mrg_weekly_data(bad) is False
+    assert ds.dataVals == [1.0]
+
+
+#
+#  A misaligned fragment used to be dropped, with only a message, while
+#  add_data() and the deposit still reported success.
+#
+def test_misaligned_fragment_is_not_dropped_silently():
+    bad = DataSeries(kind='nbs', units='cms', intvl='wk', loc='sup',
+                     first='2017-01-21', last='2017-01-26', values=[3])
+    ds = series('wk', '2017-01-06', 2, [1, 2])
+    assert ds.add_data(bad) is False
+    assert ds.add_data_many([bad]) is False
+    assert ds.dataVals == [1.0, 2.0]
+    for deposit in (DataVault.deposit, DataVault.deposit_many):
+        v = DataVault()
+        v.deposit(series('wk', '2017-01-06', 2, [1, 2]))
+        with pytest.raises(Exception, match='Unable to merge'):
+            deposit(v, bad if deposit is DataVault.deposit else [bad])
+        assert v.withdraw(kind='nbs', units='cms', intvl='wk',
+                          loc='sup').dataVals == [1.0, 2.0]
+
+
+def test_quarter_monthly_merge():
+    ds = series('qm', '2000-01-01', 4, [1, 2, 3, 4])
+    assert ds.add_data(series('qm', '2000-02-15', 3, [6, 7, 8]))
+    assert ds.add_data(series('qm', '1999-12-24', 1, [0]))
+    assert ds.startDate == datetime.date(1999, 12, 24)
+    assert ds.endDate == datetime.date(2000, 3, 8)
+    assert ds.dataVals == [0.0, 1.0, 2.0, 3.0, 4.0, M, M, 6.0, 7.0, 8.0]
+
+
+def test_quarter_monthly_merge_checks_dates():
+    ds = series('qm', '2000-01-01', 1, [1])
+    bad = DataSeries(kind='nbs', units='cms', intvl='qm', loc='sup',
+                     first='2000-01-02', last='2000-01-08', values=[2])
+    assert ds.mrg_qtrmonthly_data(bad) is False
+
+
+def test_annual_merge():
+    ds = series('yr', '2000-01-01', 2, [1, 2])
+    assert ds.add_data(series('yr', '2004-01-01', 1, [4]))
+    assert ds.add_data(series('yr', '1998-01-01', 1, [0]))
+    assert ds.dataVals == [0.0, M, 1.0, 2.0, M, M, 4.0]
+    assert ds.endDate == datetime.date(2004, 12, 31)
+
+
+@pytest.mark.parametrize('first, last', [('2000-02-01', '2000-12-31'),
+                                         ('2000-01-01', '2000-11-30')])
+def test_annual_merge_checks_dates(first, last):
+    ds = series('yr', '2000-01-01', 1, [1])
+    bad = DataSeries(kind='nbs', units='cms', intvl='yr', loc='sup',
+                     first=first, last=last, values=[2])
+    assert ds.mrg_annual_data(bad) is False
@@ -0,0 +1,52 @@
+import pytest
+
+import databank
+from databank import DataKind, DataInterval, DataLocation, DataVault
+from conftest import daily
+
+
+def test_codeFromEntry_accepts_strings_and_codes():
+    code = DataKind.codeFromEntry('runoff')
+    assert code == DataKind.codeFromEntry('run')
+    assert DataKind.codeFromEntry(code) == code
+    assert DataKind.nameFromCode(code) == 'run'
+
+
+@pytest.mark.parametrize('entry', [True, -1, 10000, 1.5, None])
+def test_codeFromEntry_rejects_other_entries(entry):
+    with pytest.raises(ValueError):
+        DataKind.codeFromEntry(entry)
+
+
+def test_series_stores_codes_and_shows_names():
+    ds = daily([1, 2], kind='runoff', units='cms', loc='lake superior')
+    assert ds.dataKindCode == DataKind.codeFromEntry('run')
+    assert ds.dataKind == 'run'
+    assert ds.dataLocation == 'su'
+    ds.dataLocation = 'erie'
+    assert ds.dataLocationCode == DataLocation.codeFromEntry('er')
+
+
+def test_series_rejects_bad_metadata():
+    with pytest.raises(Exception):
+        databank.DataSeries(kind='no such kind', intvl=10000)
+
+
+def test_vault_keys_are_code_tuples(vault):
+    vault.deposit(daily([1, 2, 3], loc='ont'))
+    key = (DataKind.codeFromEntry('run'), DataInterval.codeFromEntry('dy'),
+           DataLocation.codeFromEntry('on'))
+    assert list(vault.vault) == [key]
+    assert DataVault._construct_vault_key(kind='runoff', intvl='daily',
+                                          loc='ont') == key
+    assert DataVault._vault_key_name(key) == 'run_dy_on'
+
+
+def test_withdraw_by_alias_or_code(vault):
+    vault.deposit(daily([1, 2, 3], loc='ont'))
+    a = vault.withdraw(kind='runoff', units='cms', intvl='daily',
+                       loc='lake ontario')
+    b = vault.withdraw(kind=DataKind.codeFromEntry('run'), units='cms',
+                       intvl=DataInterval.codeFromEntry('dy'),
+                       loc=DataLocation.codeFromEntry('on'))
+    assert a.dataVals == b.dataVals == [1.0, 2.0, 3.0]
@@ -0,0 +1,50 @@
+import pytest
+
+import databank
+from databank import DataKind, DataUnits, DataInterval, DataLocation
+
+
+@pytest.mark.parametrize('meta, name, expected', [
+    ('kind',     'runoff',      'run'),
+    ('units',    'centimeters', 'cm'),
+    ('location', 'ogoki',       'og'),
+    ('kind',     'length',      'na'),
+    ('kind',     'meters',      'na'),
+    ('interval', 'sup',         'na'),
+])
+def test_getPrimaryName(meta, name, expected):
+    assert databank.getPrimaryName(meta=meta, name=name) == expected
+    assert databank.getPrimaryName(meta=meta, name=name) == expected
+
+
+def test_getPrimaryName_checks_arguments_every_time():
+    databank.getPrimaryName(meta='kind', name='runoff')
+    with pytest.raises(Exception):
+        databank.getPrimaryName(meta='kind', name=None)
+    with pytest.raises(Exception):
+        databank.getPrimaryName(meta=None, name='runoff')
+
+
+def test_primary_name_cache_is_bounded():
+    info = databank._primaryName.cache_info()
+    assert info.maxsize is not None
+    for k in range(info.maxsize + 10):
+        databank.getPrimaryName(meta='kind', name='no such kind %d' % k)
+    assert databank._primaryName.cache_info().currsize <= info.maxsize
+
+
+def test_lookup_ignores_case_and_whitespace():
+    assert DataKind.intValueFromString(' Runoff ') == \
+           DataKind.intValueFromString('run')
+    assert DataLocation.intValueFromString('Lake Superior') == \
+           DataLocation.intValueFromString('su')
+    assert DataUnits.intValueFromString('no such units') == 0
+
+
+def test_every_alias_maps_to_the_first_row_that_has_it():
+    for cls in (DataKind, DataUnits, DataInterval, DataLocation):
+        for names in cls._inputStrings:
+            for name in names:
+                first = next(row for row in cls._inputStrings
+                             if name.lower() in [n.lower() for n in row])
+                assert cls.primaryNameFromString(name) == first[0]
@@ -0,0 +1,72 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import databank_util as util
+from databank import DataSeries, DataVault
+
+DAY = 86400.0
+
+
+@pytest.mark.parametrize('intvl, first, days', [
+    ('dy', '2000-02-28', [1, 1, 1]),
+    ('wk', '2000-01-07', [7, 7]),
+    ('mn', '2000-01-01', [31, 29, 31, 30]),
+    ('qm', '2000-02-01', [7, 7, 7, 8, 8]),
+    ('yr', '1999-01-01', [365, 366, 365]),
+])
+def test_period_seconds(intvl, first, days):
+    first = util.date_from_entry(first)
+    np.testing.assert_array_equal(util.period_seconds(first, len(days), intvl),
+                                  np.array(days) * DAY)
+
+
+def test_month_seconds_matches():
+    first = datetime.date(2001, 11, 1)
+    np.testing.assert_array_equal(util.month_seconds(first, 4),
+                                  util.period_seconds(first, 4, 'mn'))
+
+
+@pytest.mark.parametrize('intvl, first, last, days', [
+    ('wk', '2000-01-07', '2000-01-20', [7, 7]),
+    ('qm', '2000-01-01', '2000-01-15', [8, 7]),
+    ('mn', '2000-01-01', '2000-02-29', [31, 29]),
+    ('yr', '2000-01-01', '2001-12-31', [366, 365]),
+])
+def test_rate_depth_round_trip_at_every_interval(intvl, first, last, days):
+    area = 8.21e10
+    first = util.date_from_entry(first)
+    last = util.date_from_entry(last)
+    cms = np.array([1.0, 2.0])
+    mm = util.convertValues(cms, oldunits='cms', newunits='mm', area=area,
+                            intvl=intvl, first=first, last=last)
+    np.testing.assert_allclose(mm, cms * np.array(days) * DAY / area * 1000)
+    back = util.convertValues(mm, oldunits='mm', newunits='cms', area=area,
+                              intvl=intvl, first=first, last=last)
+    np.testing.assert_allclose(back, cms)
+
+
+@pytest.mark.parametrize('intvl, first, last, values', [
+    ('qm', '2000-01-01', '2000-01-31', [1, 2, 3, 4]),
+    ('mn', '2000-01-01', '2000-03-31', [1, 2, 3]),
+    ('yr', '2000-01-01', '2000-12-31', [1]),
+])
+def test_cubic_withdrawal_without_a_lake_area(intvl, first, last, values):
+    v = DataVault()
+    v.deposit(DataSeries(kind='flw', units='cms', intvl=intvl, loc='det',
+                         first=first, last=last, values=values))
+    ds = v.withdraw(kind='flw', units='m3', intvl=intvl, loc='det')
+    secs = util.period_seconds(util.date_from_entry(first), len(values),
+                               intvl)
+    np.testing.assert_allclose(ds.dataArray, np.array(values) * secs)
+
+
+def test_withdraw_raises_without_a_plan():
+    v = DataVault()
+    v.deposit(DataSeries(kind='flw', units='cms', intvl='mn', loc='det',
+                         first='2000-01-01', last='2000-01-31', values=[1]))
+    with pytest.raises(Exception):
+        v.withdraw(kind='flw', units='mm', intvl='mn', loc='det')
+    with pytest.raises(Exception):
+        v.withdraw_many(kind='flw', units='mm', intvl='mn', loc=['det'])
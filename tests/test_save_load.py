@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import databank_io
+import databank_util as util
+from databank import DataVault
+from conftest import daily, data_file
+
+
+def same(a, b):
+    if sorted(a.vault) != sorted(b.vault):
+        return False
+    for k, ds in a.vault.items():
+        other = b.vault[k]
+        if (ds.startDate, ds.endDate, ds.dataUnitsCode) != \
+           (other.startDate, other.endDate, other.dataUnitsCode):
+            return False
+        if not np.array_equal(ds.dataArray, other.dataArray, equal_nan=True):
+            return False
+    return True
+
+
+@pytest.fixture
+def filled():
+    v = DataVault()
+    v.deposit(databank_io.read_file(data_file('mn', 'tab_monthly.txt')))
+    v.deposit(daily([1, util.MISSING_REAL, 3], loc='eri'))
+    return v
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_round_trip(filled, tmp_path, use_mmap):
+    path = str(tmp_path / 'v.dbv')
+    filled.save(path)
+    loaded = DataVault.load(path, use_mmap=use_mmap)
+    assert same(filled, loaded)
+    assert loaded.find(kind='run') == filled.find(kind='run')
+
+
+def test_pathlib_paths(filled, tmp_path):
+    path = tmp_path / 'v.dbv'
+    filled.save(path)
+    assert same(filled, DataVault.load(path))
+    bad = tmp_path / 'x.dbv'
+    bad.write_bytes(b'something else')
+    with pytest.raises(Exception, match='Not a DataVault file'):
+        DataVault.load(bad)
+
+
+def test_deposit_into_a_mapped_vault_leaves_the_file_alone(filled, tmp_path):
+    path = str(tmp_path / 'v.dbv')
+    filled.save(path)
+    loaded = DataVault.load(path)
+    loaded.deposit(daily([7], loc='eri'))
+    assert loaded.withdraw(kind='run', units='cms', intvl='dy',
+                           loc='eri')[0] == 7.0
+    again = DataVault.load(path)
+    assert again.withdraw(kind='run', units='cms', intvl='dy',
+                          loc='eri')[0] == 1.0
+
+
+def test_mapped_values_are_not_counted_as_memory(filled, tmp_path):
+    path = str(tmp_path / 'v.dbv')
+    filled.save(path)
+    report = DataVault.load(path).memory_report()['total']
+    assert report['values'] == 0 and report['mapped'] > 0
+
+
+def test_empty_vault(tmp_path):
+    path = str(tmp_path / 'e.dbv')
+    DataVault().save(path)
+    assert DataVault.load(path).vault == {}
+
+
+def test_not_a_vault_file(tmp_path):
+    path = tmp_path / 'x.dbv'
+    path.write_bytes(b'something else')
+    with pytest.raises(Exception):
+        DataVault.load(str(path))
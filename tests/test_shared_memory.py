@@ -0,0 +1,86 @@
+import gc
+import multiprocessing
+
+import pytest
+
+from databank import DataVault
+from conftest import daily
+
+
+@pytest.fixture
+def catalog():
+    v = DataVault()
+    v.deposit(daily([1, 2, 3], loc='sup'))
+    v.deposit(daily([4, 5], loc='eri'))
+    cat = v.share()
+    yield cat
+    cat.close()
+    cat.unlink()
+
+
+def _worker(args):
+    cat, x = args
+    v = DataVault.attach(cat)
+    before = v.withdraw(kind='run', units='cms', intvl='dy', loc='sup')[0]
+    v.deposit(daily([x], loc='sup'))
+    after = v.withdraw(kind='run', units='cms', intvl='dy', loc='sup')[0]
+    return before, after
+
+
+def test_attach_sees_the_shared_values(catalog):
+    v = DataVault.attach(catalog)
+    assert len(catalog) == 2
+    assert v.withdraw(kind='run', units='cms', intvl='dy',
+                      loc='eri').dataVals == [4.0, 5.0]
+    vals = v.vault[v.find(loc='sup')[0]].dataArray
+    assert not vals.flags.writeable
+    assert v.memory_report()['total']['values'] == 0
+
+
+def test_deposit_after_attach_copies(catalog):
+    v = DataVault.attach(catalog)
+    v.deposit(daily([9], loc='sup'))
+    w = DataVault.attach(catalog)
+    assert v.withdraw(kind='run', units='cms', intvl='dy', loc='sup')[0] == 9
+    assert w.withdraw(kind='run', units='cms', intvl='dy', loc='sup')[0] == 1
+
+
+def test_workers_share_one_block(catalog):
+    with multiprocessing.get_context('spawn').Pool(2) as pool:
+        results = pool.map(_worker, [(catalog, float(x)) for x in range(3)])
+    assert results == [(1.0, 0.0), (1.0, 1.0), (1.0, 2.0)]
+    v = DataVault.attach(catalog)
+    assert v.withdraw(kind='run', units='cms', intvl='dy', loc='sup')[0] == 1
+
+
+#
+#  The arrays on the block must keep it mapped after the attached vault
+#  is gone; reading them used to crash the process.
+#
+def test_fork_outlives_the_attached_vault(catalog):
+    v = DataVault.attach(catalog)
+    c = v.fork()
+    del v
+    gc.collect()
+    assert c.withdraw(kind='run', units='cms', intvl='dy',
+                      loc='sup').dataVals == [1.0, 2.0, 3.0]
+
+
+def test_views_outlive_the_attached_vault(catalog):
+    v = DataVault.attach(catalog)
+    view = v.withdraw(kind='run', units='cms', intvl='dy', loc='eri',
+                      lazy=True)
+    series = v.find(loc='sup', series=True)[0]
+    del v
+    gc.collect()
+    assert view.dataVals == [4.0, 5.0]
+    assert series.dataVals == [1.0, 2.0, 3.0]
+
+
+def test_share_an_empty_vault():
+    cat = DataVault().share()
+    try:
+        assert len(DataVault.attach(cat).find()) == 0
+    finally:
+        cat.close()
+        cat.unlink()
@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+import databank_io
+import databank_stats as stats
+from databank import DataVault
+from conftest import daily, data_file
+
+
+@pytest.fixture
+def recording():
+    stats.reset()
+    stats.enable()
+    yield
+    stats.disable()
+    stats.reset()
+
+
+def test_off_by_default_records_nothing():
+    stats.reset()
+    assert stats.clock() is None
+    v = DataVault()
+    v.deposit(daily([1, 2]))
+    v.withdraw(kind='run', units='cfs', intvl='dy', loc='sup')
+    assert stats.results() == {}
+
+
+def test_vault_operations(recording):
+    v = DataVault()
+    v.deposit(daily([1, 2, 3], units='cfs'))
+    v.deposit_many([daily([4], loc='eri')])
+    v.withdraw(kind='run', units='cfs', intvl='dy', loc='sup')
+    res = stats.results()
+    for op in ('vault.deposit', 'vault.normalize', 'vault.merge',
+               'vault.deposit_many', 'vault.withdraw', 'vault.convert'):
+        assert res[op]['calls'] >= 1, op
+    assert res['vault.withdraw']['values'] == 3
+    assert res['vault.withdraw']['bytes'] == 24
+    by_key = stats.results(by_key=True)
+    assert ('vault.withdraw', 'run_dy_su') in by_key
+
+
+def test_io_operations(recording):
+    path = data_file('mn', 'tab_monthly.txt')
+    databank_io.read_file(path)
+    res = stats.results(by_key=True)
+    for op in ('io.read_file', 'io.detect_format', 'io.parse'):
+        assert any(k[0] == op for k in res), op
+
+
+def test_callbacks(recording):
+    seen = []
+    fn = lambda *args: seen.append(args)
+    stats.add_callback(fn)
+    try:
+        DataVault().deposit(daily([1, 2]))
+    finally:
+        stats.remove_callback(fn)
+    assert any(args[0] == 'vault.deposit' and args[4] == 2 for args in seen)
+    n = len(seen)
+    DataVault().deposit(daily([1, 2]))
+    assert len(seen) == n
+
+
+def test_report(recording):
+    DataVault().deposit(daily([1, 2]))
+    out = io.StringIO()
+    stats.report(file=out)
+    assert 'vault.deposit' in out.getvalue()
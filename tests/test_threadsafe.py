@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from databank import DataVault, _RWLock
+from conftest import daily
+
+LOCS = ('sup', 'mic', 'hur', 'eri', 'ont')
+
+
+def test_withdrawals_never_see_half_a_deposit():
+    v = DataVault(cache_size=8, threadsafe=True)
+    for loc in LOCS:
+        v.deposit(daily([0.0] * 50, loc=loc))
+
+    def writer(loc):
+        for k in range(100):
+            v.deposit(daily([float(k)] * 50, loc=loc))
+
+    def reader(loc):
+        torn = 0
+        for k in range(100):
+            ds = v.withdraw(kind='run', units='cms', intvl='dy', loc=loc)
+            torn += len(set(ds.dataVals)) != 1
+            v.withdraw_many(kind='run', units='cms', intvl='dy', loc=LOCS)
+        return torn
+
+    with ThreadPoolExecutor(12) as ex:
+        writes = [ex.submit(writer, loc) for loc in LOCS]
+        reads = [ex.submit(reader, loc) for loc in LOCS]
+        for f in writes:
+            f.result()
+        assert sum(f.result() for f in reads) == 0
+    for loc in LOCS:
+        assert v.withdraw(kind='run', units='cms', intvl='dy',
+                          loc=loc).dataVals == [99.0] * 50
+
+
+def test_concurrent_deposits_to_new_series():
+    v = DataVault(threadsafe=True)
+
+    def add(k):
+        v.deposit(daily([float(k)], first='2000-01-%02d' % (k + 1),
+                        loc=LOCS[k % len(LOCS)]))
+
+    with ThreadPoolExecutor(8) as ex:
+        list(ex.map(add, range(25)))
+    assert len(v.find()) == len(LOCS)
+    assert sum(int((~ds.missingMask()).sum())
+               for ds in v.find(series=True)) == 25
+
+
+def test_rwlock_lets_readers_share_and_writers_wait():
+    lock = _RWLock()
+    lock.acquire_read()
+    lock.acquire_read()
+    done = threading.Event()
+
+    def write():
+        with lock.writing():
+            done.set()
+
+    t = threading.Thread(target=write)
+    t.start()
+    assert not done.wait(0.1)
+    lock.release_read()
+    lock.release_read()
+    t.join(5)
+    assert done.is_set()
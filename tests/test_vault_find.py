@@ -0,0 +1,53 @@
+import pytest
+
+from databank import DataVault
+from conftest import daily
+
+
+@pytest.fixture
+def filled():
+    v = DataVault()
+    for loc in ('sup', 'mhu', 'eri'):
+        v.deposit(daily([1, 2], kind='run', loc=loc))
+        v.deposit(daily([1, 2], kind='nbs', loc=loc))
+    v.deposit(daily([1, 2], kind='evp', loc='sup'))
+    return v
+
+
+def names(keys):
+    return sorted(DataVault._vault_key_name(k) for k in keys)
+
+
+def test_find_everything(filled):
+    assert filled.find() == sorted(filled.vault)
+    assert filled.find(kind='*', intvl='*', loc='*') == sorted(filled.vault)
+
+
+def test_find_one_value(filled):
+    assert names(filled.find(kind='nbs')) == \
+           ['nbs_dy_er', 'nbs_dy_mh', 'nbs_dy_su']
+    assert names(filled.find(loc='lake superior')) == \
+           ['evp_dy_su', 'nbs_dy_su', 'run_dy_su']
+
+
+def test_find_lists_and_intersections(filled):
+    assert names(filled.find(kind=['nbs', 'evp'], loc=['sup', 'eri'])) == \
+           ['evp_dy_su', 'nbs_dy_er', 'nbs_dy_su']
+    assert filled.find(kind='evp', loc='eri') == []
+    assert filled.find(intvl='monthly') == []
+
+
+def test_find_series_returns_stored_objects(filled):
+    found = filled.find(kind='evp', series=True)
+    assert len(found) == 1
+    assert found[0] is filled.vault[filled.find(kind='evp')[0]]
+
+
+def test_find_rejects_bad_codes(filled):
+    with pytest.raises(Exception):
+        filled.find(kind=10000)
+
+
+def test_indexes_follow_deposits(filled):
+    filled.deposit(daily([5], kind='evp', loc='eri'))
+    assert names(filled.find(kind='evp')) == ['evp_dy_er', 'evp_dy_su']
@@ -0,0 +1,56 @@
+from databank import DataVault
+from conftest import daily
+
+
+def withdraw(v, units='cfs', loc='sup'):
+    return v.withdraw(kind='run', units=units, intvl='dy', loc=loc)
+
+
+def test_cache_is_off_by_default():
+    v = DataVault()
+    v.deposit(daily([1, 2]))
+    withdraw(v)
+    withdraw(v)
+    assert v.cacheStats() == {'hits': 0, 'misses': 0, 'entries': 0,
+                              'capacity': 0}
+
+
+def test_repeated_withdrawal_hits_the_cache():
+    v = DataVault(cache_size=4)
+    v.deposit(daily([1, 2]))
+    a = withdraw(v)
+    b = withdraw(v)
+    assert a.dataVals == b.dataVals
+    assert v.cacheStats()['hits'] == 1
+    assert v.cacheStats()['misses'] == 1
+
+
+def test_cached_results_are_copies():
+    v = DataVault(cache_size=4)
+    v.deposit(daily([1, 2]))
+    a = withdraw(v)
+    a.dataArray[0] = -1.0
+    assert withdraw(v).dataArray[0] != -1.0
+
+
+def test_deposit_invalidates_only_that_series():
+    v = DataVault(cache_size=4)
+    v.deposit(daily([1, 2], loc='sup'))
+    v.deposit(daily([1, 2], loc='eri'))
+    withdraw(v, loc='sup')
+    withdraw(v, loc='eri')
+    v.deposit(daily([5], loc='sup'))
+    assert v.cacheStats()['entries'] == 1
+    assert withdraw(v, units='cms', loc='sup')[0] == 5.0
+
+
+def test_least_recently_used_entries_are_dropped():
+    v = DataVault(cache_size=2)
+    v.deposit(daily([1, 2]))
+    for units in ('cms', 'cfs', '10cms'):
+        withdraw(v, units=units)
+    assert v.cacheStats()['entries'] == 2
+    withdraw(v, units='cms')
+    assert v.cacheStats()['hits'] == 0
+    v.clearCache()
+    assert v.cacheStats()['entries'] == 0
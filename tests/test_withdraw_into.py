@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+import databank_util as util
+from databank import DataVault
+from conftest import daily
+
+
+def test_convert_into_matches_convert_values():
+    a = np.array([1.0, np.nan, 3.0, 4.0, 5.0])
+    expected = util.convertValues(a[1:4], oldunits='cms', newunits='cfs')
+    got = util.convertInto(values=a, i=1, j=4, oldunits='cms',
+                           newunits='cfs')
+    np.testing.assert_array_equal(got, expected)
+
+
+def test_convert_into_writes_into_out():
+    a = np.array([1.0, 2.0, 3.0])
+    out = np.empty(2)
+    got = util.convertInto(values=a, i=1, j=3, out=out, oldunits='cms',
+                           newunits='cms')
+    assert got is out
+    np.testing.assert_array_equal(out, [2.0, 3.0])
+    assert a.tolist() == [1.0, 2.0, 3.0]
+
+
+def test_convert_into_per_period_factors():
+    first = util.date_from_entry('2000-02-01')
+    a = np.array([1.0, 1.0])
+    got = util.convertInto(values=a, oldunits='cms', newunits='m3',
+                           intvl='mn', first=first,
+                           last=util.date_from_entry('2000-03-31'))
+    np.testing.assert_array_equal(got, [29*86400.0, 31*86400.0])
+
+
+@pytest.mark.parametrize('intvl, first, newstart, newend, ij', [
+    ('dy', '2000-01-01', '2000-01-03', '2000-01-05', (2, 5)),
+    ('wk', '2000-01-07', '2000-01-20', '2000-01-27', (1, 3)),
+    ('qm', '2000-01-01', '2000-01-09', '2000-02-01', (1, 5)),
+    ('mn', '2000-01-01', '2000-03-15', '2000-03-15', (2, 3)),
+    ('yr', '2000-01-01', '2002-06-01', '2003-01-01', (2, 4)),
+    ('dy', '2000-01-01', '2000-01-05', '2000-01-03', (0, 0)),
+])
+def test_trim_indices(intvl, first, newstart, newend, ij):
+    d = util.date_from_entry
+    assert util.trimIndices(d(first), d(newstart), d(newend), intvl) == ij
+
+
+def test_withdraw_into_caller_array():
+    v = DataVault()
+    v.deposit(daily([1, 2, 3, 4, 5]))
+    out = np.full(10, -1.0)
+    ds = v.withdraw(kind='run', units='cms', intvl='dy', loc='sup',
+                    first='2000-01-02', last='2000-01-04', out=out)
+    assert ds.dataArray.base is out
+    assert out[:4].tolist() == [2.0, 3.0, 4.0, -1.0]
+    assert ds.dataVals == [2.0, 3.0, 4.0]
+
+
+def test_withdraw_into_converts_units():
+    v = DataVault()
+    v.deposit(daily([1, 2, 3]))
+    out = np.empty(3)
+    ds = v.withdraw(kind='run', units='cfs', intvl='dy', loc='sup', out=out)
+    expected = util.convertValues([1, 2, 3], oldunits='cms', newunits='cfs')
+    np.testing.assert_allclose(out, expected)
+    np.testing.assert_allclose(ds.dataArray, expected)
+
+
+def test_withdraw_into_from_the_cache():
+    v = DataVault(cache_size=4)
+    v.deposit(daily([1, 2, 3]))
+    v.withdraw(kind='run', units='cms', intvl='dy', loc='sup')
+    out = np.zeros(3)
+    v.withdraw(kind='run', units='cms', intvl='dy', loc='sup', out=out)
+    assert v.cacheStats()['hits'] == 1
+    assert out.tolist() == [1.0, 2.0, 3.0]
+
+
+def test_stored_values_are_not_changed():
+    v = DataVault()
+    v.deposit(daily([1, 2, 3]))
+    out = np.empty(3)
+    v.withdraw(kind='run', units='cms', intvl='dy', loc='sup', out=out)
+    out[:] = 0.0
+    ds = v.withdraw(kind='run', units='cms', intvl='dy', loc='sup')
+    assert ds.dataVals == [1.0, 2.0, 3.0]
+
+
+@pytest.mark.parametrize('out', [
+    np.empty(2),
+    np.empty(3, dtype=np.float32),
+    np.empty((3, 1)),
+    [0.0, 0.0, 0.0],
+])
+def test_withdraw_rejects_a_bad_out(out):
+    v = DataVault()
+    v.deposit(daily([1, 2, 3]))
+    with pytest.raises(Exception):
+        v.withdraw(kind='run', units='cms', intvl='dy', loc='sup', out=out)
+
+
+def test_lazy_withdrawal_cannot_use_out():
+    v = DataVault()
+    v.deposit(daily([1, 2, 3]))
+    with pytest.raises(Exception):
+        v.withdraw(kind='run', units='cms', intvl='dy', loc='sup',
+                   lazy=True, out=np.empty(3))
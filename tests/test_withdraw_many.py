@@ -0,0 +1,69 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from databank import DataVault
+from conftest import daily
+
+
+@pytest.fixture
+def filled():
+    v = DataVault()
+    v.deposit(daily([1, 2, 3, 4], first='2000-01-01', loc='sup'))
+    v.deposit(daily([10, 20, 30], first='2000-01-03', loc='mhu'))
+    return v
+
+
+def test_union_axis_pads_with_nan(filled):
+    m = filled.withdraw_many(kind='run', units='cms', intvl='dy',
+                             loc=['sup', 'mhu'])
+    assert m.startDate == datetime.date(2000, 1, 1)
+    assert m.endDate == datetime.date(2000, 1, 5)
+    assert m.dataArray.shape == (2, 5)
+    np.testing.assert_array_equal(m.dataArray[0], [1, 2, 3, 4, np.nan])
+    np.testing.assert_array_equal(m.dataArray[1], [np.nan, np.nan, 10, 20, 30])
+    assert m.dates[0] == np.datetime64('2000-01-01')
+    assert len(m.dates) == 5
+
+
+def test_overlap_axis(filled):
+    m = filled.withdraw_many(kind='run', units='cms', intvl='dy',
+                             loc=['sup', 'mhu'], overlap=True)
+    assert (m.startDate, m.endDate) == (datetime.date(2000, 1, 3),
+                                        datetime.date(2000, 1, 4))
+    np.testing.assert_array_equal(m.dataArray, [[3, 4], [10, 20]])
+
+
+def test_explicit_period_and_units(filled):
+    m = filled.withdraw_many(kind='run', units='10cms', intvl='dy',
+                             loc=['sup'], first='1999-12-31',
+                             last='2000-01-02')
+    np.testing.assert_allclose(m.dataArray[0], [np.nan, 0.1, 0.2])
+
+
+def test_rows_match_withdraw(filled):
+    m = filled.withdraw_many(kind='run', units='cfs', intvl='dy',
+                             loc=['sup', 'mhu'])
+    r = m.rowIndex(loc='mhu')
+    assert r == 1
+    row = m.row(r)
+    one = filled.withdraw(kind='run', units='cfs', intvl='dy', loc='mhu')
+    assert row.dataVals[2:] == one.dataVals
+
+
+def test_missing_series_raises(filled):
+    with pytest.raises(Exception):
+        filled.withdraw_many(kind='run', units='cms', intvl='dy',
+                             loc=['sup', 'ont'])
+    with pytest.raises(Exception):
+        filled.withdraw_many(kind='run', units='cms', intvl='mn', loc='sup')
+
+
+def test_no_common_period_raises():
+    v = DataVault()
+    v.deposit(daily([1], first='2000-01-01', loc='sup'))
+    v.deposit(daily([1], first='2001-01-01', loc='mhu'))
+    with pytest.raises(Exception):
+        v.withdraw_many(kind='run', units='cms', intvl='dy',
+                        loc=['sup', 'mhu'], overlap=True)